@@ -0,0 +1,57 @@
+"""
+    Measures the driver-side time per generation and the memory held by the
+    state of the CMA-ES variants for a growing number of parameters. Candidates
+    are evaluated on a sphere function directly through ask and tell, so only the
+    time spent in sampling and updating the distribution is measured. The dense
+    variant is skipped for large numbers of parameters.
+
+    Run from the main directory with:
+
+        PYTHONPATH=src python3 benchmarks/cma_es.py
+"""
+
+import time
+import numpy as np
+
+from octras import Problem
+from octras.algorithms import CMAES
+
+class SphereProblem(Problem):
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+
+    def get_information(self):
+        return {
+            "number_of_parameters": self.dimensions,
+            "initial_values": np.ones((self.dimensions,))
+        }
+
+def state_size(algorithm):
+    return sum([
+        value.nbytes for value in algorithm.__dict__.values()
+        if isinstance(value, np.ndarray)
+    ])
+
+def measure(variant, dimensions, generations = 20):
+    algorithm = CMAES(SphereProblem(dimensions), seed = 0, variant = variant)
+
+    start = time.perf_counter()
+
+    for generation in range(generations):
+        for x, annotations in algorithm.ask(algorithm.L):
+            algorithm.tell(x, np.sum(x**2), annotations = annotations)
+
+    return (time.perf_counter() - start) / generations, state_size(algorithm)
+
+if __name__ == "__main__":
+    print("%16s %12s %12s %20s %16s" % ("Variant", "Parameters", "Candidates", "Time [ms/generation]", "State [kB]"))
+
+    for dimensions in (10, 100, 1000, 5000):
+        for variant in ("full", "separable", "limited_memory"):
+            if variant == "full" and dimensions > 1000:
+                continue
+
+            duration, size = measure(variant, dimensions)
+            candidates = 4 + int(np.floor(3 * np.log(dimensions)))
+
+            print("%16s %12d %12d %20.2f %16.1f" % (variant, dimensions, candidates, duration * 1e3, size / 1e3))
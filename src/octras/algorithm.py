@@ -1,11 +1,50 @@
+import copy
+
 from octras import Evaluator
 
 class Algorithm:
-    #def set_state(self, state):
-    #    raise NotImplementedError()
+    def get_state(self):
+        """
+            Returns a picklable snapshot of the algorithm between two calls to
+            `advance`, including the state of its random number generators. By
+            default, all attributes of the algorithm are copied.
+        """
+        return copy.deepcopy(self.__dict__)
 
-    #def get_state():
-    #    raise NotImplementedError()
+    def set_state(self, state):
+        self.__dict__.update(copy.deepcopy(state))
 
     def advance(self, evaluator: Evaluator):
         raise NotImplementedError()
+
+    def ask(self, count):
+        """
+            Returns a list of at most `count` candidates as tuples of parameters and
+            annotations. Algorithms which implement `ask` and `tell` can be run by
+            the loop in steady state, i.e. without waiting for whole batches.
+        """
+        raise NotImplementedError()
+
+    def tell(self, x, objective, state = None, annotations = None):
+        """
+            Receives the result of a candidate which has been obtained by `ask`.
+        """
+        raise NotImplementedError()
+
+    def converged(self):
+        """
+            Returns whether the algorithm cannot make further progress, for instance
+            because its step size has collapsed. The loop stops in that case.
+        """
+        return False
+
+    def close(self):
+        """
+            Called by the loop once `run` has finished, before the remaining
+            simulations are cancelled. Algorithms which work in the background
+            stop here.
+        """
+        pass
+
+    def supports_ask_tell(self):
+        return type(self).ask != Algorithm.ask and type(self).tell != Algorithm.tell
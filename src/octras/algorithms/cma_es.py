@@ -5,11 +5,74 @@ import logging
 logger = logging.getLogger("octras")
 
 from octras import Evaluator
+from octras.algorithm import Algorithm
+from octras.profiler import section
 
 # https://en.wikipedia.org/wiki/CMA-ES
 
-class CMAES:
-    def __init__(self, problem, candidate_set_size = None, initial_step_size = 0.3, seed = None):
+def kendall_tau(a, b):
+    """
+        Rank correlation (tau-b) between two vectors of values.
+    """
+    iu = np.triu_indices(len(a), 1)
+    da = np.sign(np.subtract.outer(a, a)[iu])
+    db = np.sign(np.subtract.outer(b, b)[iu])
+
+    denominator = np.sqrt(np.sum(da**2) * np.sum(db**2))
+    return np.sum(da * db) / denominator if denominator > 0.0 else 0.0
+
+VARIANTS = ("full", "separable", "limited_memory")
+RESTARTS = ("ipop", "bipop")
+
+class CMAES(Algorithm):
+    """
+        CMA-ES with a selectable representation of the covariance matrix:
+
+        - `full` adapts a dense covariance matrix, which needs O(N^2) memory and an
+          eigendecomposition every few generations.
+        - `separable` only adapts the diagonal of the covariance matrix with
+          increased learning rates (sep-CMA-ES, Ros & Hansen 2008), so time and
+          memory per generation grow linearly with the number of parameters.
+        - `limited_memory` represents the transformation of the samples by
+          `memory` direction vectors (LM-MA-ES, Loshchilov, Glasmachers & Beyer
+          2017), which needs O(memory * N) time and memory per candidate and is
+          meant for hundreds to thousands of parameters.
+
+        With `restarts`, the search is restarted when the step size has collapsed,
+        the covariance matrix is ill-conditioned, the objectives of recent
+        generations are flat within `function_tolerance`, or the median best
+        objective has not improved over the last generations. Restarts begin at
+        a uniform sample within the bounds of the problem if available and at the
+        initial values otherwise.
+
+        - `ipop` doubles the number of candidates with every restart (Auger &
+          Hansen 2005).
+        - `bipop` alternates between such large populations and small populations
+          with random smaller step sizes, choosing the regime which has used fewer
+          evaluations so far (Hansen 2009).
+
+        The algorithm is converged once `maximum_restarts` restarts have been
+        used up.
+
+        With `surrogate = True`, a linear-quadratic model in the style of
+        lq-CMA-ES (Hansen 2019) is fitted to the archive of evaluated candidates
+        in the coordinates of the current distribution. The candidates of a
+        generation are ranked on the model and evaluated in batches of
+        `surrogate_batch`, starting with the most promising ones, until the
+        rank correlation between the refitted model and the recent true
+        objectives reaches `surrogate_tau`. The distribution is then updated
+        with the model values of the remaining candidates. The model is linear,
+        diagonal quadratic or fully quadratic depending on the size of the
+        archive; the full model is only used for up to 40 parameters.
+    """
+
+    def __init__(self, problem, candidate_set_size = None, initial_step_size = 0.3, seed = None, minimum_step_size = 1e-12, variant = "full", memory = None, restarts = None, maximum_restarts = 9, function_tolerance = 1e-12, surrogate = False, surrogate_batch = None, surrogate_tau = 0.85):
+        if not variant in VARIANTS:
+            raise RuntimeError("Unknown CMA-ES variant: %s" % variant)
+
+        if not restarts is None and not restarts in RESTARTS:
+            raise RuntimeError("Unknown CMA-ES restart strategy: %s" % restarts)
+
         problem_information = problem.get_information()
 
         if not "initial_values" in problem_information:
@@ -20,16 +83,61 @@ class CMAES:
 
         number_of_parameters = problem_information["number_of_parameters"]
         self.initial_values = problem_information["initial_values"]
+        self.bounds = problem_information.get("bounds")
 
         # Selection parameters
         L_default = 4 + int(np.floor(3 * np.log(number_of_parameters)))
-        self.L = L_default if candidate_set_size is None else candidate_set_size
+        self.initial_L = L_default if candidate_set_size is None else candidate_set_size
 
         if not candidate_set_size is None and candidate_set_size < L_default:
             logger.warning("Using requested candidate set size %d (recommended is at least %d!)" % (candidate_set_size, L_default))
 
-        # Initialize static parameters
         self.N = number_of_parameters
+        self.variant = variant
+        self.chiN = self.N**0.5 * (1.0 - 1.0 / (4.0 * self.N) + 1.0 / (21.0 * self.N**2))
+
+        if variant == "limited_memory":
+            self.memory = 4 + int(np.floor(3 * np.log(self.N))) if memory is None else memory
+            self.cd = 1.0 / (1.5**np.arange(self.memory) * self.N)
+
+        # Initialize algorithm parameters
+        self.iteration = 0
+        self.mean = None
+        self.initial_step_size = initial_step_size
+        self.sigma = initial_step_size
+
+        self.random = np.random.RandomState(seed)
+        self.minimum_step_size = minimum_step_size
+
+        # Restart parameters
+        self.restarts = restarts
+        self.maximum_restarts = maximum_restarts
+        self.function_tolerance = function_tolerance
+        self.restart = 0
+        self.exhausted = False
+
+        # Evaluations which have been spent in the large and small BIPOP regimes
+        self.large_restarts = 0
+        self.budgets = { "large": 0, "small": 0 }
+        self.regime = "large"
+
+        # Surrogate parameters, the archive is kept over restarts
+        self.surrogate = surrogate
+        self.surrogate_batch = surrogate_batch
+        self.surrogate_tau = surrogate_tau
+
+        self.maximum_model = "full" if self.N <= 40 else "diagonal"
+        self.archive_size = int(1.1 * self._coefficients(self.maximum_model)) + 2 * self.initial_L
+        self.archive_x = []
+        self.archive_objectives = []
+        self.model = None
+
+        self._configure(self.initial_L)
+        self._reset()
+
+    def _configure(self, L):
+        # Strategy parameters which depend on the number of candidates
+        self.L = L
 
         self.mu = self.L / 2.0
         self.weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
@@ -44,61 +152,338 @@ class CMAES:
         self.cmu = min(1.0 - self.c1, 2.0 * (self.mueff - 2.0 + 1.0 / self.mueff) / ((self.N + 2.0)**2 + self.mueff))
         self.damps = 1.0 + 2.0 * max(0, np.sqrt((self.mueff - 1.0) / (self.N + 1.0)) - 1.0) + self.cs
 
+        if self.variant == "separable":
+            # Only N entries are learned, so the learning rates can be larger
+            self.c1 = min(1.0, self.c1 * (self.N + 2.0) / 3.0)
+            self.cmu = min(1.0 - self.c1, self.cmu * (self.N + 2.0) / 3.0)
+
+        elif self.variant == "limited_memory":
+            # The rates are capped for small N, where this variant is not useful anyway
+            self.cs = min(1.0, 2.0 * self.L / self.N)
+            self.cm = np.minimum(1.0, self.L / (4.0**np.arange(self.memory) * self.N))
+
+        # Number of generations over which stagnation is detected
+        self.history_length = 120 + int(np.ceil(30.0 * self.N / self.L))
+
+    def _reset(self):
         # Initialize dynamic parameters
         self.pc = np.zeros((self.N,1))
         self.ps = np.zeros((self.N,1))
-        self.B = np.eye(self.N)
         self.D = np.ones((self.N,))
-        self.C = np.dot(self.B, np.dot(np.diag(self.D**2), self.B.T))
-        self.invsqrtC = np.dot(self.B, np.dot(np.diag(self.D**-1), self.B.T))
+
+        if self.variant == "full":
+            self.B = np.eye(self.N)
+            self.C = np.eye(self.N)
+            self.invsqrtC = np.eye(self.N)
+
+        elif self.variant == "limited_memory":
+            self.M = np.zeros((self.memory, self.N))
+            self.updates = 0
+
         self.eigeneval = 0
         self.counteval = 0
-        self.chiN = self.N**0.5 * (1.0 - 1.0 / (4.0 * self.N) + 1.0 / (21.0 * self.N**2))
+        self.generation_objectives = []
 
-        # Initialize algorithm parameters
-        self.iteration = 0
-        self.mean = None
-        self.sigma = initial_step_size
+        # Results which have been told but not used for an update yet
+        self.told = []
 
-        self.random = np.random.RandomState(seed)
+    def _collapsed(self):
+        if self.variant == "limited_memory":
+            return self.sigma < self.minimum_step_size
 
-    def advance(self, evaluator: Evaluator):
-        if self.iteration == 0:
+        # The step size along the largest principal axis has collapsed
+        return self.sigma * np.max(self.D) < self.minimum_step_size
+
+    def converged(self):
+        if self.restarts is None:
+            return self._collapsed()
+
+        return self.exhausted
+
+    def _restart_reason(self, candidate_objectives):
+        if self._collapsed():
+            return "collapsed step size"
+
+        if self.variant != "limited_memory" and np.max(self.D) > 1e7 * np.min(self.D):
+            return "condition exceeds 1e14"
+
+        length = 10 + int(np.ceil(30.0 * self.N / self.L))
+
+        if len(self.generation_objectives) >= length:
+            window = np.concatenate([self.generation_objectives[-length:], candidate_objectives])
+
+            if np.max(window) - np.min(window) < self.function_tolerance:
+                return "flat objective"
+
+        if len(self.generation_objectives) >= self.history_length:
+            recent = int(np.ceil(0.3 * len(self.generation_objectives)))
+
+            if np.median(self.generation_objectives[-recent:]) >= np.median(self.generation_objectives[:recent]):
+                return "stagnation"
+
+        return None
+
+    def _restart(self, reason):
+        self.restart += 1
+
+        # Evaluations of the finished run count towards the regime it was run in
+        self.budgets[self.regime] += self.counteval
+
+        if self.restart > self.maximum_restarts:
+            logger.info("CMA-ES has used up all %d restarts (%s)" % (self.maximum_restarts, reason))
+            self.exhausted = True
+            return
+
+        if self.restarts == "bipop" and self.budgets["small"] < self.budgets["large"]:
+            # Small population with a random population size and step size
+            u = self.random.uniform()
+            large_L = self.initial_L * 2**self.large_restarts
+
+            self.regime = "small"
+            L = int(np.floor(self.initial_L * (0.5 * large_L / self.initial_L)**(u**2)))
+            self.sigma = self.initial_step_size * 10**(-2.0 * self.random.uniform())
+        else:
+            self.regime = "large"
+            self.large_restarts += 1
+
+            L = self.initial_L * 2**self.large_restarts
+            self.sigma = self.initial_step_size
+
+        logger.info("Restarting CMA-ES (%d/%d, %s) with %d candidates due to %s" % (
+            self.restart, self.maximum_restarts, self.regime, L, reason
+        ))
+
+        self._configure(max(L, 2))
+        self._reset()
+
+        if self.bounds is None:
             self.mean = np.copy(self.initial_values).reshape((self.N, 1))
+        else:
+            bounds = np.array(self.bounds, dtype = float)
+            self.mean = self.random.uniform(bounds[:,0], bounds[:,1]).reshape((self.N, 1))
 
-        self.iteration += 1
-        logger.info("Starting CMA-ES iteration %d." % self.iteration)
+    def _initialize(self):
+        if self.mean is None:
+            self.mean = np.copy(self.initial_values).reshape((self.N, 1))
 
+    def _annotations(self, iteration):
         annotations = {
-            "mean": self.mean,
-            "covariance": self.C, "pc": self.pc, "ps": self.ps,
-            "sigma": self.sigma
+            "mean": self.mean, "ps": self.ps,
+            "sigma": self.sigma, "iteration": iteration,
+            "restart": self.restart
         }
 
-        self.counteval += self.L
+        if self.variant == "full":
+            annotations.update({ "covariance": self.C, "pc": self.pc })
+        elif self.variant == "separable":
+            annotations.update({ "variances": self.D**2, "pc": self.pc })
+        else:
+            annotations["directions"] = self.M[:min(self.updates, self.memory)]
+
+        return annotations
+
+    def _transform(self, Z):
+        # Applies the rank-one transformations of the limited memory variant
+        for j in range(min(self.updates, self.memory)):
+            Z = (1.0 - self.cd[j]) * Z + self.cd[j] * np.outer(np.dot(Z, self.M[j]), self.M[j])
+
+        return Z
+
+    def _inverse_transform(self, Z):
+        # Sherman-Morrison inverse of every rank-one transformation in reverse order
+        for j in reversed(range(min(self.updates, self.memory))):
+            c, v = self.cd[j], self.M[j]
+            Z = (Z - c * np.outer(np.dot(Z, v), v) / (1.0 - c + c * np.dot(v, v))) / (1.0 - c)
+
+        return Z
+
+    def _sample(self, count):
+        self.counteval += count
+        Z = self.random.normal(size = (self.N, count)).T
+
+        if self.variant == "full":
+            steps = np.dot(Z * self.D, self.B.T)
+        elif self.variant == "separable":
+            steps = Z * self.D
+        else:
+            steps = self._transform(Z)
+
+        return self.sigma * steps + self.mean.T
+
+    def _coefficients(self, kind):
+        if kind == "linear":
+            return self.N + 1
+        elif kind == "diagonal":
+            return 2 * self.N + 1
+        else:
+            return (self.N + 1) * (self.N + 2) // 2
+
+    def _whiten(self, X):
+        # Coordinates in which the current distribution is standard normal
+        Z = (np.asarray(X) - self.mean.T) / self.sigma
+
+        if self.variant == "full":
+            return np.dot(Z, self.invsqrtC)
+        elif self.variant == "separable":
+            return Z / self.D
+        else:
+            return self._inverse_transform(Z)
+
+    def _features(self, Z, kind):
+        features = [np.ones((len(Z), 1)), Z]
+
+        if kind == "diagonal":
+            features.append(Z**2)
+        elif kind == "full":
+            rows, columns = np.triu_indices(self.N)
+            features.append(Z[:, rows] * Z[:, columns])
+
+        return np.hstack(features)
 
-        candidate_parameters = self.sigma * np.dot(
-            (self.random.normal(size = (self.N, self.L)) * self.D[:, np.newaxis]).T, self.B
-        ) + self.mean.T
+    def _fit(self):
+        count = len(self.archive_objectives)
+        self.model = None
 
-        candidate_identifiers = [
-            evaluator.submit(parameters, annotations = annotations)
-            for parameters in candidate_parameters
-        ]
+        for kind in ("full", "diagonal", "linear"):
+            if kind == "full" and self.maximum_model != "full":
+                continue
 
-        # Wait for samples
-        evaluator.wait()
+            if count >= int(1.1 * self._coefficients(kind)) + 1:
+                features = self._features(self._whiten(self.archive_x), kind)
+                coefficients = la.lstsq(features, np.array(self.archive_objectives), rcond = None)[0]
+
+                self.model = (kind, coefficients)
+                return
+
+    def _predict(self, X):
+        kind, coefficients = self.model
+        return np.dot(self._features(self._whiten(X), kind), coefficients)
+
+    def _archive(self, X, objectives):
+        self.archive_x.extend(np.copy(X))
+        self.archive_objectives.extend(objectives)
+
+        self.archive_x = self.archive_x[-self.archive_size:]
+        self.archive_objectives = self.archive_objectives[-self.archive_size:]
+
+    def _evaluate(self, evaluator, X, annotations):
+        identifiers = evaluator.submit_many(X, annotations = annotations)
+        objectives, states = evaluator.get_many(identifiers)
+        evaluator.clean(identifiers)
+
+        return np.array(objectives, dtype = float)
+
+    def _advance_surrogate(self, evaluator, annotations, candidate_parameters):
+        with section("cma_es.surrogate"):
+            self._fit()
+
+        if self.model is None:
+            # Not enough data for a model yet
+            candidate_objectives = self._evaluate(evaluator, candidate_parameters, annotations)
+            self._archive(candidate_parameters, candidate_objectives)
+
+            return candidate_objectives
+
+        batch = int(np.ceil(self.L / 10.0)) if self.surrogate_batch is None else self.surrogate_batch
+
+        predictions = self._predict(candidate_parameters)
+        evaluated = np.zeros((self.L,), dtype = bool)
+        objectives = np.zeros((self.L,))
+
+        while not np.all(evaluated):
+            remaining = np.flatnonzero(~evaluated)
+            selection = remaining[np.argsort(predictions[remaining])[:batch]]
+
+            objectives[selection] = self._evaluate(evaluator, candidate_parameters[selection], [
+                dict(annotations, prediction = predictions[index]) for index in selection
+            ])
+
+            evaluated[selection] = True
+            self._archive(candidate_parameters[selection], objectives[selection])
+
+            with section("cma_es.surrogate"):
+                self._fit()
+
+                # Agreement of the refitted model with the most recent true objectives
+                count = max(15, min(int(1.2 * np.sum(evaluated)), int(0.75 * self.L)))
+                count = min(count, len(self.archive_objectives))
+
+                tau = kendall_tau(
+                    self._predict(self.archive_x[-count:]),
+                    np.array(self.archive_objectives[-count:])
+                )
+
+                predictions = self._predict(candidate_parameters)
+
+            if tau >= self.surrogate_tau:
+                break
+
+        logger.info("Evaluated %d/%d candidates on the %s surrogate (tau = %.2f)" % (
+            np.sum(evaluated), self.L, self.model[0], tau
+        ))
+
+        # True objectives are shifted to rank consistently with the model values
+        candidate_objectives = predictions
+        candidate_objectives[evaluated] = objectives[evaluated] - np.min(objectives[evaluated]) + np.min(predictions)
+
+        return candidate_objectives
+
+    def advance(self, evaluator: Evaluator):
+        self._initialize()
+
+        self.iteration += 1
+        logger.info("Starting CMA-ES iteration %d." % self.iteration)
+
+        annotations = self._annotations(self.iteration)
+        candidate_parameters = self._sample(self.L)
+
+        if self.surrogate:
+            candidate_objectives = self._advance_surrogate(evaluator, annotations, candidate_parameters)
+            self._update(candidate_parameters, candidate_objectives)
+            return
+
+        candidate_identifiers = evaluator.submit_many(candidate_parameters, annotations = annotations)
 
         # Obtain fitness
-        candidate_objectives = np.array([
-            evaluator.get(identifier)[0] # We minimize!
-            for identifier in candidate_identifiers
-        ])
+        candidate_objectives, candidate_states = evaluator.get_many(candidate_identifiers) # We minimize!
 
         # Cleanup
-        for identifier in candidate_identifiers:
-            evaluator.clean(identifier)
+        evaluator.clean(candidate_identifiers)
+
+        self._update(candidate_parameters, candidate_objectives)
+
+    def ask(self, count):
+        """
+            Samples candidates from the current distribution. In the steady-state
+            variant, the distribution is updated whenever L results have been told,
+            regardless of the distribution they have been sampled from.
+        """
+        if self.surrogate:
+            raise RuntimeError("The surrogate-assisted CMA-ES cannot be run in steady state.")
+
+        self._initialize()
+
+        annotations = self._annotations(self.iteration + 1)
+        return [(x, annotations) for x in self._sample(count)]
+
+    def tell(self, x, objective, state = None, annotations = None):
+        if not annotations is None and annotations.get("restart", self.restart) != self.restart:
+            # The candidate has been sampled before the last restart
+            return
+
+        self.told.append((np.copy(x), objective))
 
+        if len(self.told) >= self.L:
+            candidate_parameters = np.array([item[0] for item in self.told[:self.L]])
+            candidate_objectives = np.array([item[1] for item in self.told[:self.L]])
+            self.told = self.told[self.L:]
+
+            self.iteration += 1
+            logger.info("Updating CMA-ES in iteration %d." % self.iteration)
+
+            self._update(candidate_parameters, candidate_objectives)
+
+    def _update(self, candidate_parameters, candidate_objectives):
         sorter = np.argsort(candidate_objectives)
 
         candidate_objectives = candidate_objectives[sorter]
@@ -106,39 +491,91 @@ class CMAES:
 
         # Update mean
         previous_mean = self.mean
-        self.mean = np.sum(candidate_parameters[:self.mu] * self.weights[:, np.newaxis], axis = 0).reshape((self.N, 1))
+        self.mean = np.dot(self.weights, candidate_parameters[:self.mu]).reshape((self.N, 1))
+
+        # Selected steps (mu x N) and the step of the mean
+        steps = (candidate_parameters[:self.mu] - previous_mean.T) / self.sigma
+        step = (self.mean - previous_mean) / self.sigma
+
+        if self.variant == "full":
+            self._update_full(steps, step)
+        elif self.variant == "separable":
+            self._update_separable(steps, step)
+        else:
+            self._update_limited_memory(steps)
+
+        if self.restarts is None:
+            if self.variant != "limited_memory" and np.max(self.D) > 1e7 * np.min(self.D):
+                logger.warning("Condition exceeds 1e14")
+
+        elif not self.exhausted:
+            self.generation_objectives.append(candidate_objectives[0])
+            self.generation_objectives = self.generation_objectives[-self.history_length:]
 
+            reason = self._restart_reason(candidate_objectives)
+
+            if not reason is None:
+                self._restart(reason)
+
+    def _update_paths(self, step, whitened_step):
         # Update evolution paths
         psa = (1.0 - self.cs ) * self.ps
-        psb = np.sqrt(self.cs * (2.0 - self.cs) * self.mueff) * np.dot(self.invsqrtC, self.mean - previous_mean) / self.sigma
+        psb = np.sqrt(self.cs * (2.0 - self.cs) * self.mueff) * whitened_step
         self.ps = psa + psb
 
         hsig = la.norm(self.ps) / np.sqrt(1.0 - (1.0 - self.cs)**(2.0 * self.counteval / self.L)) / self.chiN < 1.4 + 2.0 / (self.N + 1.0)
         pca = (1.0 - self.cc) * self.pc
-        pcb = hsig * np.sqrt(self.cc * (2.0 - self.cc) * self.mueff) * (self.mean - previous_mean) / self.sigma
+        pcb = hsig * np.sqrt(self.cc * (2.0 - self.cc) * self.mueff) * step
         self.pc = pca + pcb
 
-        # Adapt covariance matrix
-        artmp = (1.0 / self.sigma) * (candidate_parameters[:self.mu].T - previous_mean)
+        return hsig
 
+    def _adapt_step_size(self):
+        self.sigma = self.sigma * np.exp((self.cs / self.damps) * (la.norm(self.ps) / self.chiN - 1.0))
+
+    def _update_full(self, steps, step):
+        hsig = self._update_paths(step, np.dot(self.invsqrtC, step))
+
+        # Adapt covariance matrix
         Ca = (1.0 - self.c1 - self.cmu) * self.C
         Cb = self.c1 * (np.dot(self.pc, self.pc.T) + (not hsig) * self.cc * (2.0 - self.cc) * self.C)
-        Cc = self.cmu * np.dot(artmp, np.dot(np.diag(self.weights), artmp.T))
-        C = Ca + Cb + Cc
+        Cc = self.cmu * np.dot(steps.T * self.weights, steps)
+        self.C = Ca + Cb + Cc
 
-        # Adapt step size
-        self.sigma = self.sigma * np.exp((self.cs / self.damps) * (la.norm(self.ps) / self.chiN - 1.0))
+        self._adapt_step_size()
 
         if self.counteval - self.eigeneval > self.L / (self.c1 + self.cmu) / self.N / 10.0:
             self.eigeneval = self.counteval
 
-            self.C = np.triu(self.C) + np.triu(self.C, 1).T
-            d, self.B = la.eig(self.C)
+            with section("cma_es.eigendecomposition"):
+                self.C = np.triu(self.C) + np.triu(self.C, 1).T
+                d, self.B = la.eigh(self.C)
 
             self.D = np.sqrt(d)
-            Dm = np.diag(1.0 / np.sqrt(d))
+            self.invsqrtC = np.dot(self.B / self.D, self.B.T)
+
+    def _update_separable(self, steps, step):
+        hsig = self._update_paths(step, step / self.D[:, np.newaxis])
+
+        # Adapt the diagonal of the covariance matrix
+        variances = self.D**2
+
+        Ca = (1.0 - self.c1 - self.cmu) * variances
+        Cb = self.c1 * (self.pc[:, 0]**2 + (not hsig) * self.cc * (2.0 - self.cc) * variances)
+        Cc = self.cmu * np.dot(self.weights, steps**2)
+
+        self._adapt_step_size()
+        self.D = np.sqrt(Ca + Cb + Cc)
+
+    def _update_limited_memory(self, steps):
+        # The samples before the transformation are recovered from the steps
+        z = np.dot(self.weights, self._inverse_transform(steps))
+
+        self.ps = (1.0 - self.cs) * self.ps + np.sqrt(self.mueff * self.cs * (2.0 - self.cs)) * z[:, np.newaxis]
 
-            self.invsqrtC = np.dot(self.B.T, np.dot(Dm, self.B))
+        self.M = (1.0 - self.cm)[:, np.newaxis] * self.M + np.sqrt(
+            self.mueff * self.cm * (2.0 - self.cm)
+        )[:, np.newaxis] * z[np.newaxis, :]
 
-        if np.max(self.D) > 1e7 * np.min(self.D):
-            logger.warning("Condition exceeds 1e14")
+        self.updates += 1
+        self.sigma = self.sigma * np.exp(0.5 * self.cs * (np.dot(self.ps[:, 0], self.ps[:, 0]) / self.N - 1.0))
@@ -1,14 +1,14 @@
 import numpy as np
-import deep_merge
 
 import logging
 logger = logging.getLogger("octras")
 
 from octras import Evaluator
+from octras.algorithm import Algorithm
 
 # https://www.jhuapl.edu/spsa/PDF-SPSA/Spall_Implementation_of_the_Simultaneous.PDF
 
-class FDSA:
+class FDSA(Algorithm):
     def __init__(self, problem, perturbation_factor, gradient_factor, perturbation_exponent = 0.101, gradient_exponent = 0.602, gradient_offset = 0, compute_objective = True):
         self.perturbation_factor = perturbation_factor
         self.perturbation_exponent = perturbation_exponent
@@ -38,7 +38,7 @@ class FDSA:
 
         # Calculate objective
         if self.compute_objective:
-            annotations = { "type": "objective" }
+            annotations = { "type": "objective", "iteration": self.iteration }
             objective_identifier = evaluator.submit(self.parameters, annotations = annotations)
 
         # Update lengths
@@ -48,45 +48,31 @@ class FDSA:
         annotations = {
             "gradient_length" : gradient_length,
             "perturbation_length": perturbation_length,
-            "type": "gradient"
+            "type": "gradient", "iteration": self.iteration
         }
 
-        # I) Calculate gradients
-        gradient = np.zeros((len(self.parameters),))
-        gradient_information = []
+        # I) Calculate gradients from one positive and one negative run per dimension
+        offsets = np.repeat(np.eye(len(self.parameters)), 2, axis = 0) * perturbation_length
+        offsets[1::2] *= -1.0
 
-        # Schedule all necessary runs
-        for d in range(len(self.parameters)):
-            annotations = deep_merge.merge(annotations, { "dimension": d })
+        gradient_parameters = self.parameters + offsets
 
-            positive_parameters = np.copy(self.parameters)
-            positive_parameters[d] += perturbation_length
-            annotations = deep_merge.merge(annotations, { "type": "positive_gradient" })
-            positive_identifier = evaluator.submit(positive_parameters, annotations = annotations)
+        gradient_annotations = [
+            dict(annotations, dimension = d, type = sign)
+            for d in range(len(self.parameters))
+            for sign in ("positive_gradient", "negative_gradient")
+        ]
 
-            negative_parameters = np.copy(self.parameters)
-            negative_parameters[d] -= perturbation_length
-            annotations = deep_merge.merge(annotations, { "sign": "negative_gradient" })
-            negative_identifier = evaluator.submit(negative_parameters, annotations = annotations)
-
-            gradient_information.append((positive_parameters, positive_identifier, negative_parameters, negative_identifier))
-
-        # Wait for gradient run results
-        evaluator.wait()
+        gradient_identifiers = evaluator.submit_many(gradient_parameters, annotations = gradient_annotations)
+        gradient_objectives, gradient_states = evaluator.get_many(gradient_identifiers)
 
+        # The objective is only tracked, so it is not waited for
         if self.compute_objective:
-            evaluator.clean(objective_identifier)
-
-        for d, item in enumerate(gradient_information):
-            positive_parameters, positive_identifier, negative_parameters, negative_identifier = item
-
-            positive_objective, positive_state = evaluator.get(positive_identifier)
-            evaluator.clean(positive_identifier)
+            evaluator.cancel(objective_identifier)
 
-            negative_objective, negative_state = evaluator.get(negative_identifier)
-            evaluator.clean(negative_identifier)
+        evaluator.clean(gradient_identifiers)
 
-            gradient[d] = (positive_objective - negative_objective) / (2.0 * perturbation_length)
+        gradient = (gradient_objectives[0::2] - gradient_objectives[1::2]) / (2.0 * perturbation_length)
 
         # II) Update state
         self.parameters -= gradient_length * gradient
@@ -4,6 +4,7 @@ import logging
 logger = logging.getLogger("octras")
 
 from octras import Evaluator
+from octras.algorithm import Algorithm
 
 def has_duplicates(values):
     for k in range(len(values)):
@@ -12,8 +13,8 @@ def has_duplicates(values):
 
     return False
 
-class NelderMead:
-    def __init__(self, problem, alpha = 1.0, gamma = 2.0, rho = 0.5, sigma = 0.5, seed = 0):
+class NelderMead(Algorithm):
+    def __init__(self, problem, alpha = 1.0, gamma = 2.0, rho = 0.5, sigma = 0.5, seed = 0, minimum_diameter = 1e-10):
         self.alpha = alpha
         self.gamma = gamma
         self.rho = rho
@@ -36,8 +37,19 @@ class NelderMead:
         self.values = None
 
         self.random = np.random.RandomState(seed)
+        self.minimum_diameter = minimum_diameter
+
+    def converged(self):
+        if self.simplex is None:
+            return False
+
+        # Largest distance between two vertices of the simplex
+        differences = self.simplex[:, np.newaxis, :] - self.simplex[np.newaxis, :, :]
+        return np.max(np.sqrt(np.sum(differences**2, axis = 2))) < self.minimum_diameter
 
     def advance(self, evaluator):
+        # The simplex and its values are only changed together once all results
+        # have arrived, so that an interrupted iteration can simply be repeated
         self.iteration += 1
         logger.info("Starting Nelder-Mead iteration %d." % self.iteration)
 
@@ -54,23 +66,14 @@ class NelderMead:
                         k, self.random.randint(0, 2, self.number_of_parameters + 1)
                     ])
 
-                self.simplex = np.array(simplex).T
-                found_duplicates = has_duplicates(self.simplex)
-
-            identifiers = [
-                evaluator.submit(parameters)
-                for parameters in self.simplex
-            ]
+                simplex = np.array(simplex).T
+                found_duplicates = has_duplicates(simplex)
 
-            evaluator.wait()
+            identifiers = evaluator.submit_many(simplex)
+            values, states = evaluator.get_many(identifiers)
+            evaluator.clean(identifiers)
 
-            self.values = np.array([
-                evaluator.get(identifier)[0]
-                for identifier in identifiers
-            ])
-
-            for identifier in identifiers:
-                evaluator.clean(identifier)
+            self.simplex, self.values = simplex, values
 
             logger.info("Initialization finished.")
 
@@ -133,19 +136,10 @@ class NelderMead:
 
         # 6) Shrink
         logger.info("Shrinking simplex ...")
-        self.simplex[1:] = self.simplex[0] + self.sigma * (self.simplex[1:] - self.simplex[0])
-
-        identifiers = [
-            evaluator.submit(parameters)
-            for parameters in self.simplex[1:]
-        ]
+        shrunk = self.simplex[0] + self.sigma * (self.simplex[1:] - self.simplex[0])
 
-        evaluator.wait()
+        identifiers = evaluator.submit_many(shrunk)
+        values, states = evaluator.get_many(identifiers)
+        evaluator.clean(identifiers)
 
-        self.values[1:] = np.array([
-            evaluator.get(identifier)[0]
-            for identifier in identifiers
-        ])
-
-        for identifier in identifiers:
-            evaluator.clean(identifier)
+        self.simplex[1:], self.values[1:] = shrunk, values
@@ -7,6 +7,8 @@ import logging
 logger = logging.getLogger("octras")
 
 from octras import Evaluator
+from octras.algorithm import Algorithm
+from octras.profiler import section
 
 class ApproximateSelectionProblem:
     def __init__(self, v, w, deltas, objectives):
@@ -78,7 +80,7 @@ class AdaptationProblem:
 
         return result.x
 
-class Opdyts:
+class Opdyts(Algorithm):
     def __init__(self, problem, candidate_set_size, number_of_transitions, perturbation_length = 1.0, adaptation_weight = 0.3, seed = 0):
         self.iteration = 0
         self.v, self.w = 0.0, 0.0
@@ -174,7 +176,8 @@ class Opdyts:
         while np.max(candidate_transitions) < self.number_of_transitions:
             # Approximate selection problem
             selection_problem = ApproximateSelectionProblem(self.v, self.w, candidate_deltas, candidate_objectives)
-            alpha = selection_problem.solve()
+            with section("opdyts.selection"):
+                alpha = selection_problem.solve()
 
             transient_performance = selection_problem.get_transient_performance(alpha)
             equilibrium_gap = selection_problem.get_equilibrium_gap(alpha)
@@ -233,6 +236,7 @@ class Opdyts:
         self.adaptation_uniformity_gap.append(np.array(local_adaptation_uniformity_gap))
 
         adaptation_problem = AdaptationProblem(self.adaptation_weight, self.adaptation_selection_performance, self.adaptation_transient_performance, self.adaptation_equilibrium_gap, self.adaptation_uniformity_gap)
-        self.v, self.w = adaptation_problem.solve()
+        with section("opdyts.adaptation"):
+            self.v, self.w = adaptation_problem.solve()
 
         logger.info("Solved Adaptation Problem. v = %f, w = %f", self.v, self.w)
@@ -4,8 +4,9 @@ import logging
 logger = logging.getLogger("octras")
 
 from octras import Evaluator
+from octras.algorithm import Algorithm
 
-class RandomWalk:
+class RandomWalk(Algorithm):
     def __init__(self, problem, parallel = 1, seed = 0):
         self.parallel = parallel
 
@@ -19,16 +20,26 @@ class RandomWalk:
 
         self.bounds = problem_information["bounds"]
 
+    def _sample(self, count):
+        bounds = np.array(self.bounds)
+
+        return bounds[:, 0] + self.random.random_sample(
+            size = (count, len(bounds))
+        ) * (bounds[:, 1] - bounds[:, 0])
+
     def advance(self, evaluator: Evaluator):
         self.iteration += 1
         logger.info("Starting Random Walk iteration %d" % self.iteration)
 
-        parameters = [np.array([
-            bounds[0] + self.random.random() * (bounds[1] - bounds[0]) # TODO: Not demterinistic!
-            for bounds in self.bounds
-        ]) for k in range(self.parallel)]
+        parameters = self._sample(self.parallel)
 
-        identifiers = [evaluator.submit(p) for p in parameters]
+        identifiers = evaluator.submit_many(parameters)
 
         evaluator.wait(identifiers)
-        evaluator.clean()
+        evaluator.clean(identifiers)
+
+    def ask(self, count):
+        return [(x, {}) for x in self._sample(count)]
+
+    def tell(self, x, objective, state = None, annotations = None):
+        pass
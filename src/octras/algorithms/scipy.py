@@ -1,11 +1,13 @@
 import scipy.optimize
+import copy
 
 import logging
 logger = logging.getLogger("octras")
 
 from octras import Evaluator
+from octras.algorithm import Algorithm
 
-class ScipyAlgorithm:
+class ScipyAlgorithm(Algorithm):
     def __init__(self, problem, **arguments):
         self.arguments = arguments
 
@@ -17,6 +19,13 @@ class ScipyAlgorithm:
         self.initial = problem_information["initial_values"]
         self.evaluator = None
 
+    def get_state(self):
+        # The evaluator is only referenced while scipy is running
+        return copy.deepcopy({
+            key: value for key, value in self.__dict__.items()
+            if key != "evaluator"
+        })
+
     def _worker(self, x):
         identifier = self.evaluator.submit(x)
         objective, state = self.evaluator.get(identifier)
@@ -1,5 +1,4 @@
 import numpy as np
-import deep_merge
 
 import logging
 logger = logging.getLogger("octras")
@@ -7,9 +6,49 @@ logger = logging.getLogger("octras")
 # https://www.jhuapl.edu/spsa/PDF-SPSA/Spall_Implementation_of_the_Simultaneous.PDF
 
 from octras import Evaluator
+from octras.algorithm import Algorithm
+
+class SPSA(Algorithm):
+    """
+        Simultaneous perturbation stochastic approximation. Every iteration
+        submits `gradient_samples` independent perturbations at once and averages
+        their gradient estimates, so that the slots of a parallel evaluator are
+        used in one batch.
+
+        With `one_sided = True`, the gradients are estimated from the objective
+        at the current parameters and the positive perturbations only, which
+        needs `gradient_samples + 1` instead of `2 * gradient_samples` runs.
+        Otherwise, the objective at the current parameters is only submitted for
+        tracking if `compute_objective` is set, and the iteration waits for it
+        together with the gradient runs.
+
+        With `second_order = True`, the adaptive second-order variant (2SPSA,
+        Spall 2000) additionally evaluates every perturbation with a second
+        perturbation added, which yields an estimate of the Hessian from the
+        difference of two one-sided gradients. The estimates are averaged over
+        the iterations and regularized to a positive definite matrix as
+        sqrt(H^2 + `hessian_regularization` I), with all eigenvalues raised to at
+        least `hessian_minimum` times the mean absolute eigenvalue. Since every
+        estimate has a rank of at most 2 * `gradient_samples`, the average is
+        singular in the beginning, so for the first `hessian_delay` iterations
+        (by default, as many as needed to sample N directions), the gradient is
+        only divided by its largest eigenvalue. The step is then a
+        Newton-like step with the usual gain sequence, which makes the algorithm
+        robust against badly scaled parameters. The second perturbation is
+        scaled by `hessian_perturbation_factor`, which defaults to
+        `perturbation_factor`, with the same exponent.
+
+        With `blocking`, the objective at the current parameters is evaluated in
+        every iteration of the second-order variant, and a step is rejected
+        once it turns out that it has increased the objective by more than
+        `blocking_tolerance` (Spall 2000). The parameters then return to the
+        last accepted ones. All runs of an iteration are submitted at once.
+    """
+
+    def __init__(self, problem, perturbation_factor, gradient_factor, perturbation_exponent = 0.101, gradient_exponent = 0.602, gradient_offset = 0, compute_objective = True, seed = 0, gradient_samples = 1, one_sided = False, second_order = False, hessian_perturbation_factor = None, hessian_regularization = 1e-6, hessian_minimum = 1e-2, hessian_delay = None, blocking = True, blocking_tolerance = 0.0):
+        if second_order and one_sided:
+            raise RuntimeError("The second-order SPSA needs two-sided perturbations.")
 
-class SPSA:
-    def __init__(self, problem, perturbation_factor, gradient_factor, perturbation_exponent = 0.101, gradient_exponent = 0.602, gradient_offset = 0, compute_objective = True, seed = 0):
         self.perturbation_factor = perturbation_factor
         self.perturbation_exponent = perturbation_exponent
 
@@ -18,6 +57,26 @@ class SPSA:
         self.gradient_offset = gradient_offset
 
         self.compute_objective = compute_objective
+        self.gradient_samples = gradient_samples
+        self.one_sided = one_sided
+
+        self.second_order = second_order
+        self.hessian_perturbation_factor = perturbation_factor if hessian_perturbation_factor is None else hessian_perturbation_factor
+        self.hessian_regularization = hessian_regularization
+        self.hessian_minimum = hessian_minimum
+        self.hessian_delay = hessian_delay
+
+        # Average of all Hessian estimates so far
+        self.hessian = None
+        self.hessian_updates = 0
+
+        self.blocking = second_order and blocking
+        self.blocking_tolerance = blocking_tolerance
+
+        # Last parameters which have not been rejected by blocking
+        self.accepted_parameters = None
+        self.accepted_objective = None
+        self.blocked = 0
 
         self.iteration = 0
 
@@ -32,7 +91,19 @@ class SPSA:
             raise RuntimeError("SPSA expects initial_values in problem information.")
 
         self.number_of_parameters = problem_information["number_of_parameters"]
-        self.parameters = np.array(problem_information["initial_values"])
+        self.parameters = np.array(problem_information["initial_values"], dtype = float)
+
+        if self.hessian_delay is None:
+            self.hessian_delay = int(np.ceil(self.number_of_parameters / self.gradient_samples))
+
+        # Candidates and results of the ask and tell interface
+        self.asked = []
+        self.told = {}
+
+        # Largest number of runs which have been asked for at once, and the last
+        # iteration whose incomplete results have been dropped
+        self.pipeline = 0
+        self.dropped = 0
 
     def advance(self, evaluator: Evaluator):
         self.iteration += 1
@@ -41,11 +112,34 @@ class SPSA:
         if self.parameters is None:
             self.parameters = evaluator.problem.initial
 
-        # Calculate objective
-        if self.compute_objective:
-            annotations = { "type": "objective" }
-            objective_identifier = evaluator.submit(self.parameters, annotations = annotations)
+        candidates = self._candidates(self.compute_objective or self._uses_objective())
+
+        # Schedule all samples of the iteration at once
+        identifiers = evaluator.submit_many(
+            [x for x, annotations in candidates],
+            annotations = [annotations for x, annotations in candidates]
+        )
+
+        required = [
+            (identifier, annotations) for identifier, (x, annotations) in zip(identifiers, candidates)
+            if annotations["type"] != "objective" or self._uses_objective()
+        ]
+
+        required_identifiers = [identifier for identifier, annotations in required]
 
+        # Wait for gradient run results, and for the tracked objective, which
+        # has been submitted in the same batch
+        evaluator.wait(identifiers)
+
+        objectives, states = evaluator.get_many(required_identifiers)
+        evaluator.clean(identifiers)
+
+        self._step({
+            (annotations["type"], annotations.get("sample")): (objective, annotations)
+            for (identifier, annotations), objective in zip(required, objectives)
+        })
+
+    def _perturbation(self, sample = 0):
         # Update step lengths
         gradient_length = self.gradient_factor / (self.iteration + self.gradient_offset)**self.gradient_exponent
         perturbation_length = self.perturbation_factor / self.iteration**self.perturbation_exponent
@@ -57,34 +151,181 @@ class SPSA:
             "gradient_length": gradient_length,
             "perturbation_length": perturbation_length,
             "direction": direction,
-            "type": "gradient"
+            "type": "gradient", "iteration": self.iteration,
+            "sample": sample
         }
 
-        # Schedule samples
-        positive_parameters = np.copy(self.parameters)
-        positive_parameters += direction * perturbation_length
-        annotations = deep_merge.merge(annotations, { "type": "positive_gradient" })
-        positive_identifier = evaluator.submit(positive_parameters, annotations = annotations)
+        if self.second_order:
+            annotations["hessian_perturbation_length"] = self.hessian_perturbation_factor / self.iteration**self.perturbation_exponent
+            annotations["hessian_direction"] = self.random.randint(0, 2, len(self.parameters)) - 0.5
+
+        return annotations
+
+    def _perturb(self, annotations):
+        offset = annotations["direction"] * annotations["perturbation_length"]
+        return self.parameters + offset, self.parameters - offset
+
+    def _candidates(self, objective):
+        # All runs of the current iteration as tuples of parameters and annotations
+        candidates = []
+
+        if objective:
+            candidates.append((np.copy(self.parameters), {
+                "type": "objective", "iteration": self.iteration,
+                "parameters": np.copy(self.parameters)
+            }))
+
+        for sample in range(self.gradient_samples):
+            annotations = self._perturbation(sample)
+            positive_parameters, negative_parameters = self._perturb(annotations)
+
+            candidates.append((positive_parameters, dict(annotations, type = "positive_gradient")))
+
+            if not self.one_sided:
+                candidates.append((negative_parameters, dict(annotations, type = "negative_gradient")))
+
+            if self.second_order:
+                offset = annotations["hessian_direction"] * annotations["hessian_perturbation_length"]
+
+                candidates.append((positive_parameters + offset, dict(annotations, type = "positive_hessian")))
+                candidates.append((negative_parameters + offset, dict(annotations, type = "negative_hessian")))
+
+        return candidates
+
+    def _uses_objective(self):
+        # Whether the objective at the current parameters is needed for the step
+        return self.one_sided or self.blocking
+
+    def _runs(self):
+        # Number of runs of an iteration which are needed for the step
+        runs = self.gradient_samples * (1 if self.one_sided else 2) + (1 if self._uses_objective() else 0)
+        return runs + (2 * self.gradient_samples if self.second_order else 0)
 
-        negative_parameters = np.copy(self.parameters)
-        negative_parameters -= direction * perturbation_length
-        annotations = deep_merge.merge(annotations, { "type": "negative_gradient" })
-        negative_identifier = evaluator.submit(negative_parameters, annotations = annotations)
+    def _estimate_hessian(self, results):
+        H_k = np.zeros((len(self.parameters), len(self.parameters)))
 
-        # Wait for gradient run results
-        evaluator.wait()
+        for sample in range(self.gradient_samples):
+            positive_objective, annotations = results[("positive_gradient", sample)]
+            negative_objective = results[("negative_gradient", sample)][0]
 
-        if self.compute_objective:
-            evaluator.clean(objective_identifier)
+            # One-sided gradients at both perturbations
+            scale = annotations["hessian_perturbation_length"] * annotations["hessian_direction"]
+            positive_gradient = (results[("positive_hessian", sample)][0] - positive_objective) / scale
+            negative_gradient = (results[("negative_hessian", sample)][0] - negative_objective) / scale
 
-        positive_objective, positive_state = evaluator.get(positive_identifier)
-        evaluator.clean(positive_identifier)
+            difference = (positive_gradient - negative_gradient) / (2.0 * annotations["perturbation_length"])
+            estimate = np.outer(difference, annotations["direction"]**-1)
 
-        negative_objective, negative_state = evaluator.get(negative_identifier)
-        evaluator.clean(negative_identifier)
+            H_k += 0.5 * (estimate + estimate.T)
 
-        g_k = (positive_objective - negative_objective) / (2.0 * perturbation_length)
-        g_k *= direction**-1
+        H_k /= self.gradient_samples
+
+        self.hessian_updates += 1
+
+        if self.hessian is None:
+            self.hessian = H_k
+        else:
+            self.hessian += (H_k - self.hessian) / self.hessian_updates
+
+    def _precondition(self, g_k):
+        eigenvalues, eigenvectors = np.linalg.eigh(self.hessian)
+        eigenvalues = np.sqrt(eigenvalues**2 + self.hessian_regularization)
+
+        # The trace of noisy estimates may be close to zero, the mean absolute eigenvalue is not
+        scale = np.mean(eigenvalues)
+
+        if self.hessian_updates <= self.hessian_delay:
+            # Scaled identity which is stable in the direction of the largest curvature
+            return g_k / np.max(eigenvalues)
+
+        # Newton-like step with the regularized, positive definite Hessian
+        eigenvalues = np.maximum(eigenvalues, self.hessian_minimum * scale)
+
+        return np.dot(eigenvectors, np.dot(eigenvectors.T, g_k) / eigenvalues)
+
+    def _block(self, results):
+        # Returns whether the last step is rejected
+        objective, annotations = results[("objective", None)]
+
+        if not self.accepted_objective is None and objective > self.accepted_objective + self.blocking_tolerance:
+            logger.info("Blocking SPSA step with objective %f (accepted %f)" % (objective, self.accepted_objective))
+
+            self.parameters = np.copy(self.accepted_parameters)
+            self.blocked += 1
+            return True
+
+        self.accepted_parameters = np.copy(annotations["parameters"])
+        self.accepted_objective = objective
+        return False
+
+    def _step(self, results):
+        # Results are indexed by type and sample of the run
+        g_k = np.zeros((len(self.parameters),))
+
+        for sample in range(self.gradient_samples):
+            positive_objective, annotations = results[("positive_gradient", sample)]
+
+            if self.one_sided:
+                difference = (positive_objective - results[("objective", None)][0]) / annotations["perturbation_length"]
+            else:
+                difference = (positive_objective - results[("negative_gradient", sample)][0]) / (2.0 * annotations["perturbation_length"])
+
+            g_k += difference * annotations["direction"]**-1
+
+        g_k /= self.gradient_samples
+
+        if self.second_order:
+            # The curvature information is valid even if the step is rejected
+            self._estimate_hessian(results)
+
+            if self.blocking and self._block(results):
+                return
+
+            g_k = self._precondition(g_k)
 
         # Update state
-        self.parameters -= gradient_length * g_k
+        self.parameters -= annotations["gradient_length"] * g_k
+
+    def ask(self, count):
+        """
+            Returns the runs of as many SPSA iterations as needed. The gradient step
+            of an iteration is applied once all of its runs have been told, so in
+            steady state the gradients may have been obtained at slightly older
+            parameters. Iterations which fall further behind than the number of
+            runs asked for at once can span are dropped, since some of their runs
+            have been cancelled or have failed.
+        """
+        self.pipeline = max(self.pipeline, count)
+
+        while len(self.asked) < count:
+            self.iteration += 1
+            self.asked.extend(self._candidates(self._uses_objective()))
+
+        candidates, self.asked = self.asked[:count], self.asked[count:]
+        return candidates
+
+    def tell(self, x, objective, state = None, annotations = None):
+        if annotations is None or not "iteration" in annotations:
+            raise RuntimeError("SPSA expects the annotations of the asked candidates.")
+
+        if annotations["iteration"] <= self.dropped:
+            return
+
+        results = self.told.setdefault(annotations["iteration"], {})
+        results[(annotations["type"], annotations.get("sample"))] = (objective, annotations)
+
+        if len(results) == self._runs():
+            del self.told[annotations["iteration"]]
+            self._step(results)
+
+        # Runs which have been cancelled or have failed are never told, so iterations
+        # which are further behind than the asked runs can span are dropped
+        depth = int(np.ceil(self.pipeline / self._runs())) + 1
+
+        for iteration in [iteration for iteration in self.told if iteration < self.iteration - depth]:
+            del self.told[iteration]
+            self.dropped = max(self.dropped, iteration)
+
+    def close(self):
+        self.asked = []
+        self.told = {}
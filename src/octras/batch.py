@@ -0,0 +1,233 @@
+from octras import Simulator
+
+import os, shutil, shlex, time
+import subprocess as sp
+
+import logging
+logger = logging.getLogger("octras")
+
+# States of SLURM jobs which have left the queue, but are still listed until MinJobAge has passed
+TERMINAL_STATES = set([
+    "BOOT_FAIL", "CANCELLED", "COMPLETED", "DEADLINE", "FAILED",
+    "NODE_FAIL", "OUT_OF_MEMORY", "PREEMPTED", "TIMEOUT"
+])
+
+class BatchSimulator(Simulator):
+    """
+        Runs every simulation as a job of a batch scheduler such as SLURM. The
+        command of a simulation is either a fixed list of arguments or a callable
+        which receives the identifier and the parameters of a simulation and returns
+        the list of arguments. It is wrapped in a job script in the directory of the
+        simulation, which is submitted through the `submit` command. The state of all
+        jobs is requested at once through the `status` command, which is called at
+        most every `status_interval` seconds. It receives a comma-separated list of
+        job identifiers and must print one line with job identifier and state per
+        job. Jobs in one of the `terminal_states`, jobs that are not listed anymore
+        and jobs that are reported as invalid (because the scheduler has already
+        purged them) are finished. Since the exit code of a finished job may only
+        become visible with a delay on shared file systems, it is awaited for
+        `exit_code_timeout` seconds before the simulation is considered failed.
+
+        By default, the response of a finished simulation is its directory. A
+        callable `result` receives the identifier instead and returns the response,
+        so that a simulator which only provides the command line hands the same
+        response to the problem as if it ran the simulation itself, for instance,
+        `BatchSimulator(path, matsim.command, result = matsim.get)`.
+    """
+
+    def __init__(self, working_directory, command,
+            submit = ["sbatch", "--parsable"],
+            status = ["squeue", "--noheader", "--format=%i %T", "--jobs"],
+            cancel = ["scancel"], status_interval = 10.0,
+            terminal_states = TERMINAL_STATES, exit_code_timeout = 60.0, result = None):
+        if not os.path.exists(working_directory):
+            raise RuntimeError("Working directory does not exist: %s" % working_directory)
+
+        self.working_directory = os.path.realpath(working_directory)
+        self.command = command
+        self.result = result
+
+        self.submit_command = submit
+        self.status_command = status
+        self.cancel_command = cancel
+        self.status_interval = status_interval
+        self.terminal_states = terminal_states
+        self.exit_code_timeout = exit_code_timeout
+
+        self.simulations = {}
+        self.last_status = None
+
+    def _simulation_path(self, identifier):
+        return "%s/%s" % (self.working_directory, identifier)
+
+    def run(self, identifier, parameters):
+        if identifier in self.simulations:
+            raise RuntimeError("A simulation with identifier %s already exists." % identifier)
+
+        simulation_path = self._simulation_path(identifier)
+
+        if callable(self.command):
+            arguments = self.command(identifier, parameters)
+        else:
+            arguments = self.command
+
+        os.makedirs(simulation_path, exist_ok = True)
+
+        if os.path.exists("%s/exit_code" % simulation_path):
+            os.remove("%s/exit_code" % simulation_path)
+
+        script_path = "%s/job.sh" % simulation_path
+
+        with open(script_path, "w+") as f:
+            f.write("#!/bin/sh\n")
+            f.write("cd %s\n" % shlex.quote(simulation_path))
+            f.write("%s > simulation_output.log 2> simulation_error.log\n" % " ".join([
+                shlex.quote(str(argument)) for argument in arguments
+            ]))
+            f.write("echo $? > exit_code\n")
+
+        output = sp.run(self.submit_command + [script_path],
+            stdout = sp.PIPE, stderr = sp.PIPE, universal_newlines = True)
+
+        if output.returncode != 0:
+            raise RuntimeError("Could not submit simulation %s: %s" % (identifier, output.stderr))
+
+        # With --parsable, sbatch returns the job identifier and optionally the cluster
+        job = output.stdout.strip().split(";")[0]
+        logger.info("Submitted simulation %s as job %s" % (identifier, job))
+
+        self.simulations[identifier] = { "job": job, "status": "running", "ended": None }
+
+    def _query(self, jobs):
+        # Returns the states of the given jobs which are still active, or None on failure
+        output = sp.run(self.status_command + [",".join(jobs)],
+            stdout = sp.PIPE, stderr = sp.PIPE, universal_newlines = True)
+
+        if output.returncode != 0:
+            if "invalid job id" in output.stderr.lower():
+                if len(jobs) == 1:
+                    # The job has already been purged from the queue
+                    return {}
+
+                # One purged job makes the whole query fail, so the jobs are queried one by one
+                states = {}
+
+                for job in jobs:
+                    job_states = self._query([job])
+
+                    if job_states is None:
+                        return None
+
+                    states.update(job_states)
+
+                return states
+
+            logger.warning("Could not obtain the status of the batch jobs: %s" % output.stderr)
+            return None
+
+        states = {}
+
+        for line in output.stdout.splitlines():
+            fields = line.split()
+
+            if len(fields) > 0:
+                state = fields[1] if len(fields) > 1 else "RUNNING"
+
+                if not state in self.terminal_states:
+                    states[fields[0]] = state
+
+        return states
+
+    def _ping(self):
+        running = {
+            simulation["job"]: identifier
+            for identifier, simulation in self.simulations.items()
+            if simulation["status"] == "running"
+        }
+
+        if len(running) == 0:
+            return
+
+        active = self._query(list(running.keys()))
+
+        if active is None:
+            return
+
+        for job, identifier in running.items():
+            if not job in active:
+                simulation = self.simulations[identifier]
+                exit_code = self._exit_code(identifier)
+
+                if simulation["ended"] is None:
+                    simulation["ended"] = time.time()
+
+                if exit_code is None and time.time() - simulation["ended"] < self.exit_code_timeout:
+                    # The exit code may not be visible yet on a shared file system
+                    continue
+
+                if exit_code == 0:
+                    logger.info("Finished simulation %s" % identifier)
+                    simulation["status"] = "done"
+                else:
+                    del self.simulations[identifier]
+                    raise RuntimeError("Error running simulation {} (job {}, exit code {}). See {}/simulation_error.log".format(
+                        identifier, job, exit_code, self._simulation_path(identifier)
+                    ))
+
+    def _exit_code(self, identifier):
+        path = "%s/exit_code" % self._simulation_path(identifier)
+
+        if os.path.exists(path):
+            with open(path) as f:
+                content = f.read().strip()
+
+            if len(content) > 0:
+                return int(content)
+
+        return None
+
+    def ready(self, identifier):
+        if self.simulations[identifier]["status"] == "running":
+            # Only query the scheduler once for all jobs within the interval
+            if self.last_status is None or time.time() - self.last_status >= self.status_interval:
+                self.last_status = time.time()
+                self._ping()
+
+        return self.simulations[identifier]["status"] == "done"
+
+    def get(self, identifier):
+        if not self.ready(identifier):
+            raise RuntimeError("Simulation %s is not ready to obtain result." % identifier)
+
+        if not self.result is None:
+            return self.result(identifier)
+
+        return self._simulation_path(identifier)
+
+    def clean(self, identifier):
+        del self.simulations[identifier]
+        shutil.rmtree(self._simulation_path(identifier))
+
+    def cancel(self, identifier):
+        simulation = self.simulations[identifier]
+
+        if simulation["status"] == "running":
+            output = sp.run(self.cancel_command + [simulation["job"]],
+                stdout = sp.PIPE, stderr = sp.PIPE, universal_newlines = True)
+
+            if output.returncode != 0:
+                logger.warning("Could not cancel job %s of simulation %s: %s" % (
+                    simulation["job"], identifier, output.stderr
+                ))
+
+        del self.simulations[identifier]
+
+        # The job may still write its last files while it is shutting down
+        shutil.rmtree(self._simulation_path(identifier), ignore_errors = True)
+
+    def restore(self, identifier, parameters):
+        if self._exit_code(identifier) == 0:
+            self.simulations[identifier] = { "job": None, "status": "done", "ended": None }
+            return True
+
+        return False
@@ -0,0 +1,138 @@
+import os, glob, json, pickle, hashlib, tempfile, logging
+import collections
+import numpy as np
+
+logger = logging.getLogger("octras")
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return { str(key): _canonical(item) for key, item in value.items() }
+
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+
+    if isinstance(value, np.ndarray):
+        return _canonical(value.tolist())
+
+    if isinstance(value, np.generic):
+        return _canonical(value.item())
+
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+
+    # Treat 1 and 1.0 as the same value
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    return repr(value)
+
+class ResultCache:
+    """
+        Stores objective, state and information of finished simulations under a
+        stable hash of the parameter vector and the merged simulator parameters. The
+        most recently used entries are kept in memory. If a path is given, all entries
+        are additionally written to disk so that they survive restarts. Once the
+        files exceed `maximum_size` bytes, the least recently used ones are removed.
+    """
+
+    def __init__(self, path = None, capacity = 1024, maximum_size = None):
+        self.path = path
+        self.capacity = capacity
+        self.maximum_size = maximum_size
+
+        self.memory = collections.OrderedDict()
+        self.files = collections.OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if not path is None:
+            os.makedirs(path, exist_ok = True)
+
+            for file_path in sorted(glob.glob("%s/*.pickle" % path), key = os.path.getmtime):
+                key = os.path.basename(file_path)[:-len(".pickle")]
+                self.files[key] = os.path.getsize(file_path)
+                self.size += self.files[key]
+
+            logger.info("Found %d cached results in %s" % (len(self.files), path))
+
+    def key(self, x, parameters):
+        content = json.dumps(dict(
+            x = np.asarray(x, dtype = float).tolist(),
+            parameters = _canonical(parameters)
+        ), sort_keys = True)
+
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _file_path(self, key):
+        return "%s/%s.pickle" % (self.path, key)
+
+    def get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+
+            if key in self.files:
+                self.files.move_to_end(key)
+
+            self.hits += 1
+            return self.memory[key]
+
+        if key in self.files:
+            try:
+                with open(self._file_path(key), "rb") as f:
+                    entry = pickle.load(f)
+
+                os.utime(self._file_path(key))
+                self.files.move_to_end(key)
+
+                self._remember(key, entry)
+                self.hits += 1
+                return entry
+
+            except (OSError, pickle.UnpicklingError, EOFError):
+                logger.warning("Removing unreadable cache entry %s" % key)
+                self._remove_file(key)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+
+        if not self.path is None:
+            # Write atomically so that a crash never leaves a partial entry behind
+            handle, temporary_path = tempfile.mkstemp(dir = self.path, suffix = ".tmp")
+
+            with os.fdopen(handle, "wb") as f:
+                pickle.dump(entry, f)
+
+            os.replace(temporary_path, self._file_path(key))
+
+            if key in self.files:
+                self.size -= self.files[key]
+
+            self.files[key] = os.path.getsize(self._file_path(key))
+            self.files.move_to_end(key)
+            self.size += self.files[key]
+
+            self._evict()
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last = False)
+
+    def _remove_file(self, key):
+        self.size -= self.files.pop(key)
+
+        if os.path.exists(self._file_path(key)):
+            os.remove(self._file_path(key))
+
+    def _evict(self):
+        if not self.maximum_size is None:
+            # Keep at least the most recent entry, even if it exceeds the limit
+            while self.size > self.maximum_size and len(self.files) > 1:
+                self._remove_file(next(iter(self.files)))
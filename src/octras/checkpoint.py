@@ -0,0 +1,46 @@
+import os, pickle, tempfile, logging
+
+logger = logging.getLogger("octras")
+
+class Checkpoint:
+    """
+        Periodically stores the state of the loop, the evaluator and the algorithm
+        in one file so that an interrupted optimization can be resumed by passing
+        the same checkpoint to `Loop.run` again. The file is replaced atomically, so
+        a crash while writing never destroys the previous checkpoint.
+    """
+
+    def __init__(self, path, interval = 1):
+        self.path = path
+        self.interval = interval
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def save(self, loop, evaluator, algorithm):
+        state = dict(
+            loop = loop.get_state(),
+            evaluator = evaluator.get_state(),
+            algorithm = algorithm.get_state()
+        )
+
+        directory = os.path.dirname(os.path.realpath(self.path))
+        handle, temporary_path = tempfile.mkstemp(dir = directory, suffix = ".tmp")
+
+        with os.fdopen(handle, "wb") as f:
+            pickle.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temporary_path, self.path)
+        logger.info("Saved checkpoint to %s" % self.path)
+
+    def restore(self, loop, evaluator, algorithm):
+        with open(self.path, "rb") as f:
+            state = pickle.load(f)
+
+        loop.set_state(state["loop"])
+        evaluator.set_state(state["evaluator"])
+        algorithm.set_state(state["algorithm"])
+
+        logger.info("Restored checkpoint from %s" % self.path)
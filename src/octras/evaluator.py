@@ -1,28 +1,76 @@
-import uuid, time, logging, deep_merge
+import uuid, time, logging, queue, deep_merge
+import asyncio, concurrent.futures, threading
+import numpy as np
 
 from .simulator import Simulator
 from .problem import Problem
+from .scheduler import FIFOScheduler
+from .record import SimulationRecord
+from .trace import Trace, DEFAULT_CAPACITY
+from .profiler import section
 
 logger = logging.getLogger("octras")
 
+# Longest time for which a thread blocks on the completion events for asyncio
+ASYNC_BLOCK_TIMEOUT = 1.0
+
+class Interrupted(RuntimeError):
+    """
+        Is raised while waiting for simulations once the `interrupt` callable of
+        the evaluator returns True.
+    """
+    pass
+
 class Evaluator:
-    def __init__(self, problem : Problem, simulator : Simulator, interval = 0.0, parallel = 1, follow_trace = True):
+    def __init__(self, problem : Problem, simulator : Simulator, interval = 0.0, parallel = 1, follow_trace = True, cache = None, scheduler = None, trace_capacity = DEFAULT_CAPACITY, trace_policy = "drop", keep_results = False, workers = None):
         self.problem = problem
         self.simulator = simulator
         self.interval = interval
         self.parallel = parallel
+        self.cache = cache
 
         self.simulations = {}
 
-        self.pending = []
-        self.running = []
-        self.finished = []
+        # Pending simulations are ordered by the scheduler, dictionaries are used
+        # as ordered sets for constant time removal
+        self.pending = FIFOScheduler() if scheduler is None else scheduler
+        self.running = {}
+        self.finished = {}
+
+        # Slot indices of the running simulations for the timing instrumentation
+        self.occupied = set()
+
+        # With workers, parameterize and evaluate run in a thread pool so that the
+        # simulator slots are refilled while outputs are still being evaluated. The
+        # pool is created on demand and shut down by close.
+        self.workers = workers
+        self.executor = None
+        self.preparing = []
+        self.evaluating = {}
+
+        self.identifier_prefix = uuid.uuid4().hex[:12]
+        self.identifier_count = 0
 
         self.current_evaluations = 0
         self.current_cost = 0
 
+        # The trace is bounded by default, pass trace_capacity = None to keep all
+        # simulations until they are fetched
         self.follow_trace = follow_trace
-        self.trace = []
+        self.trace = Trace(trace_capacity, trace_policy)
+
+        # By default, the simulator responses are dropped once they are evaluated
+        self.keep_results = keep_results
+
+        # Futures which are resolved once a simulation finishes
+        self.futures = {}
+        self.driver = None
+
+        # Callable which is asked while waiting whether to give up, see Interrupted
+        self.interrupt = None
+
+        # Callable which receives the identifier of every submitted simulation
+        self.on_submit = None
 
         problem_information = problem.get_information()
 
@@ -30,14 +78,25 @@ class Evaluator:
             raise RuntimeError("Problem information does not provide number_of_parameters.")
 
         self.number_of_parameters = problem_information["number_of_parameters"]
+        self.number_of_states = problem_information.get("number_of_states")
 
-    def _create_identifier(self):
-        identifier = str(uuid.uuid4())
+        # Simulators that push completion events let us block instead of polling
+        self.completions = queue.Queue()
+        self.signalled = set()
+
+        if simulator.pushes_events:
+            simulator.attach(self.completions.put)
 
-        while identifier in self.simulations:
-            identifier = str(uuid.uuid4())
+        simulator.observe(self._observe)
 
-        return identifier
+    def _create_identifier(self):
+        self.identifier_count += 1
+        return "%s-%d" % (self.identifier_prefix, self.identifier_count)
+
+    def _reserve_trace(self, count):
+        # Checked before anything is changed, since a finished simulation cannot be rejected anymore
+        if self.follow_trace and self.trace.rejects():
+            self.trace.reserve(len(self._unfinished()) + count)
 
     def submit(self, x, simulator_parameters = {}, annotations = {}, transient = False):
         if len(x) != self.number_of_parameters:
@@ -45,9 +104,141 @@ class Evaluator:
                 len(x), self.number_of_parameters
             ))
 
+        self._reserve_trace(1)
+
+        if self.workers is None:
+            # Parameterized first so that nothing is left behind if the problem fails
+            response = self._parameterize(x)
+            simulation = self._create(x, annotations, transient)
+            self._prepare(simulation, response, simulator_parameters)
+        else:
+            simulation = self._create(x, annotations, transient)
+            self._defer(self._executor().submit(self._parameterize, x), [(simulation, simulator_parameters)], False)
+
+        return simulation.identifier
+
+    def submit_many(self, X, simulator_parameters = {}, annotations = {}, transient = False):
+        """
+            Submits all rows of the two-dimensional array X at once. The annotations
+            are either one dictionary for all candidates or a list with one dictionary
+            per candidate.
+        """
+        X = np.asarray(X)
+
+        if X.ndim != 2 or X.shape[1] != self.number_of_parameters:
+            raise RuntimeError("Invalid shape of candidates: %s (expected (n, %d))" % (
+                str(X.shape), self.number_of_parameters
+            ))
+
+        if isinstance(annotations, dict):
+            annotations = [annotations] * len(X)
+
+        if len(annotations) != len(X):
+            raise RuntimeError("Invalid number of annotations: %d (expected %d)" % (
+                len(annotations), len(X)
+            ))
+
+        self._reserve_trace(len(X))
+
+        # Parameterized first so that nothing is left behind if the problem fails
+        responses = self._parameterize_batch(X) if self.workers is None else None
+
+        simulations = [
+            self._create(x, candidate_annotations, transient)
+            for x, candidate_annotations in zip(X, annotations)
+        ]
+
+        items = [(simulation, simulator_parameters) for simulation in simulations]
+
+        if self.workers is None:
+            self._prepare_batch(items, responses)
+        else:
+            self._defer(self._executor().submit(self._parameterize_batch, X), items, True)
+
+        return [simulation.identifier for simulation in simulations]
+
+    def _parameterize(self, x):
+        with section("problem.parameterize"):
+            return self.problem.parameterize(x)
+
+    def _parameterize_batch(self, X):
+        with section("problem.parameterize_batch"):
+            return self.problem.parameterize_batch(X)
+
+    def _create(self, x, annotations, transient):
         identifier = self._create_identifier()
-        response = self.problem.parameterize(x)
 
+        simulation = SimulationRecord(
+            identifier = identifier, x = x,
+            annotations = annotations, transient = transient,
+            status = "parameterizing",
+            timings = { "submitted": time.time() }, events = []
+        )
+
+        self.simulations[identifier] = simulation
+
+        if not self.on_submit is None:
+            self.on_submit(identifier)
+
+        return simulation
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+
+        return self.executor
+
+    def close(self):
+        """
+            Shuts down the thread pool of the workers. Parameterizations and
+            evaluations which have already been started are completed in the
+            background, and the pool is created again once it is needed.
+        """
+        if not self.executor is None:
+            self.executor.shutdown(wait = False)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *arguments):
+        self.close()
+
+    def _fail(self, simulation, error):
+        # The error is raised again whenever the simulation is awaited
+        simulation.status = "failed"
+        simulation.error = error
+
+        for future in self.futures.pop(simulation.identifier, []):
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def _raise_failed(self, identifiers):
+        for identifier in identifiers:
+            simulation = self.simulations[identifier]
+
+            if simulation.status == "failed":
+                raise simulation.error
+
+    def _defer(self, future, items, batch):
+        self.preparing.append((future, items, batch))
+        future.add_done_callback(lambda future: self.completions.put(None))
+
+    def _prepare_batch(self, items, responses):
+        if len(responses) != len(items):
+            raise RuntimeError("Problem returned %d parameterizations for %d candidates" % (
+                len(responses), len(items)
+            ))
+
+        # Simulations that have been cancelled meanwhile are dropped
+        return [
+            self._prepare(simulation, response, simulator_parameters)
+            if simulation.status != "cancelled" else False
+            for (simulation, simulator_parameters), response in zip(items, responses)
+        ]
+
+    def _prepare(self, simulation, response, simulator_parameters):
+        # Returns whether the simulation has been finished from the cache
         if isinstance(response, tuple):
             parameters, cost = response
         else:
@@ -55,134 +246,648 @@ class Evaluator:
 
         parameters = deep_merge.merge(parameters, simulator_parameters)
 
-        self.simulations[identifier] = {
-            "identifier": identifier,
-            "parameters": parameters, "x": x,
-            "cost": cost, "annotations": annotations,
-            "status": "pending", "transient": transient
-        }
+        # Transient simulations may be restarted from, so they always need to run
+        cache_key, cached = None, None
+
+        if not self.cache is None and not simulation.transient:
+            cache_key = self.cache.key(simulation.x, parameters)
+            cached = self.cache.get(cache_key)
+
+        simulation.parameters = parameters
+        simulation.cost = cost
+        simulation.cache_key = cache_key
+        simulation.cached = not cached is None
+        simulation.attached = cached is None
+
+        if cached is None:
+            simulation.status = "pending"
+            self.pending.push(simulation)
+            return False
+
+        logger.info("Using cached result for simulation %s" % simulation.identifier)
+        self._finish(simulation, cached["objective"], cached["state"], cached["information"])
+
+        return True
+
+    def _ping(self, full = True):
+        """
+            Advances all simulations and returns the identifiers of those which have
+            finished. Errors of the problem are raised once the bookkeeping is
+            complete, and the affected simulations are marked as failed.
+        """
+        finished = []
+        errors = []
+
+        while True:
+            try:
+                self.signalled.add(self.completions.get_nowait())
+            except queue.Empty:
+                break
+
+        if len(self.preparing) > 0:
+            preparing, self.preparing = self.preparing, []
+
+            for future, items, batch in preparing:
+                if future.done():
+                    try:
+                        responses = future.result() if batch else [future.result()]
+                        prepared = self._prepare_batch(items, responses)
+
+                    except Exception as error:
+                        # Only the simulations of this parameterization are affected
+                        for simulation, simulator_parameters in items:
+                            if simulation.status == "parameterizing":
+                                self._fail(simulation, error)
+
+                        errors.append(error)
+                        continue
+
+                    for (simulation, simulator_parameters), cached in zip(items, prepared):
+                        if cached:
+                            finished.append(simulation.identifier)
+                else:
+                    self.preparing.append((future, items, batch))
 
-        self.pending.append(identifier)
-        return identifier
+        if not self.simulator.pushes_events or full:
+            candidates = list(self.running)
+        else:
+            candidates = [
+                identifier for identifier in self.running
+                if identifier in self.signalled
+            ]
+
+        self.signalled.clear()
+
+        for identifier in candidates:
+            with section("simulator.ready"):
+                ready = self.simulator.ready(identifier)
 
-    def _ping(self):
-        for identifier in self.running:
-            if self.simulator.ready(identifier):
+            if ready:
                 simulation = self.simulations[identifier]
+                self.pending.finished(simulation)
+
+                with section("simulator.get"):
+                    result = self.simulator.get(identifier)
+
+                del self.running[identifier]
 
-                simulation["result"] = self.simulator.get(identifier)
-                response = self.problem.evaluate(simulation["x"], simulation["result"])
+                simulation.timings["simulated"] = time.time()
+                self.occupied.discard(simulation.slot)
 
-                information = None
-                state = None
+                if self.keep_results:
+                    simulation.result = result
 
-                if isinstance(response, tuple):
-                    objective = response[0]
+                if self.simulator.evaluates or self.workers is None:
+                    try:
+                        if self.simulator.evaluates:
+                            # The simulator has already applied the objective function
+                            response = self._process_response(result)
+                        else:
+                            response = self._process_response(self._evaluate(simulation, result))
 
-                    if len(response) > 1:
-                        state = response[1]
+                    except Exception as error:
+                        self._fail(simulation, error)
+                        errors.append(error)
+                        continue
 
-                    if len(response) > 2:
-                        information = response[2]
+                    self._finish(simulation, *response)
+                    finished.append(identifier)
                 else:
-                    objective = response
+                    # The slot is free now, the objective is filled in later
+                    simulation.status = "evaluating"
 
-                if not state is None:
-                    problem_information = self.problem.get_information()
+                    future = self._executor().submit(self._evaluate, simulation, result)
+                    future.add_done_callback(lambda future: self.completions.put(None))
+                    self.evaluating[identifier] = future
 
-                    if not "number_of_states" in problem_information:
-                        raise RuntimeError("Problem return state, but problem information does not provide number_of_states")
+        for identifier, future in list(self.evaluating.items()):
+            if future.done():
+                del self.evaluating[identifier]
+                simulation = self.simulations[identifier]
 
-                    number_of_states = problem_information["number_of_states"]
+                try:
+                    response = self._process_response(future.result())
 
-                    if not len(state) == number_of_states:
-                        raise RuntimeError("Wrong number of states provided: %d (expected %d)" % (
-                            len(state), number_of_states
-                        ))
+                except Exception as error:
+                    self._fail(simulation, error)
+                    errors.append(error)
+                    continue
 
-                self.current_evaluations += 1
-                self.current_cost += simulation["cost"]
+                self._finish(simulation, *response)
+                finished.append(identifier)
 
-                simulation["objective"] = objective
-                simulation["state"] = state
-                simulation["status"] = "finished"
-                simulation["information"] = information
+        while len(self.running) < self.parallel and len(self.pending) > 0:
+            simulation = self.simulations[self.pending.pop()]
+            simulation.status = "running"
+            self.pending.started(simulation)
 
-                simulation["evaluator_evaluations"] = self.current_evaluations
-                simulation["evaluator_cost"] = self.current_cost
+            simulation.slot = self._occupy()
+            simulation.timings["started"] = time.time()
 
-                self.running.remove(identifier)
-                self.finished.append(identifier)
+            with section("simulator.run"):
+                if self.simulator.evaluates:
+                    self.simulator.run(simulation.identifier, simulation.parameters, simulation.x)
+                else:
+                    self.simulator.run(simulation.identifier, simulation.parameters)
 
-                if self.follow_trace:
-                    self.trace.append(simulation)
+            self.running[simulation.identifier] = True
 
-        while len(self.running) < self.parallel and len(self.pending) > 0:
-            simulation = self.simulations[self.pending.pop(0)]
-            simulation["status"] = "running"
+        if len(errors) > 0:
+            raise errors[0]
+
+        return finished
+
+    def _occupy(self):
+        slot = 0
+
+        while slot in self.occupied:
+            slot += 1
+
+        self.occupied.add(slot)
+        return slot
+
+    def _evaluate(self, simulation, result):
+        simulation.timings["evaluation_started"] = time.time()
+
+        with section("problem.evaluate"):
+            response = self.problem.evaluate(simulation.x, result)
+
+        simulation.timings["evaluated"] = time.time()
+
+        return response
+
+    def _observe(self, identifier, event, details):
+        # May be called from other threads, so the record is only appended to
+        simulation = self.simulations.get(identifier)
+
+        if not simulation is None and not simulation.events is None:
+            simulation.events.append((time.time(), event, details))
+
+    def _process_response(self, response):
+        information = None
+        state = None
+
+        if isinstance(response, tuple):
+            objective = response[0]
+
+            if len(response) > 1:
+                state = response[1]
+
+            if len(response) > 2:
+                information = response[2]
+        else:
+            objective = response
+
+        if not state is None:
+            if self.number_of_states is None:
+                raise RuntimeError("Problem return state, but problem information does not provide number_of_states")
+
+            if not len(state) == self.number_of_states:
+                raise RuntimeError("Wrong number of states provided: %d (expected %d)" % (
+                    len(state), self.number_of_states
+                ))
+
+        return objective, state, information
+
+    def _finish(self, simulation, objective, state, information):
+        identifier = simulation.identifier
+
+        if not self.cache is None and not simulation.cache_key is None and not simulation.cached:
+            self.cache.put(simulation.cache_key, dict(
+                objective = objective, state = state, information = information
+            ))
+
+        self.current_evaluations += 1
+
+        if not simulation.cached:
+            self.current_cost += simulation.cost
+
+        simulation.objective = objective
+        simulation.state = state
+        simulation.status = "finished"
+        simulation.information = information
+
+        simulation.evaluator_evaluations = self.current_evaluations
+        simulation.evaluator_cost = self.current_cost
+        simulation.timings["finished"] = time.time()
+
+        self.finished[identifier] = True
 
-            self.simulator.run(simulation["identifier"], simulation["parameters"])
-            self.running.append(simulation["identifier"])
+        if self.follow_trace:
+            self.trace.append(simulation)
+
+        for future in self.futures.pop(identifier, []):
+            if future.set_running_or_notify_cancel():
+                future.set_result((objective, state))
 
     def wait(self, identifiers = None):
         if identifiers is None:
-            identifiers = [
-                identifier for identifier, simulation in self.simulations.items()
-                if simulation["status"] != "finished"
-            ]
+            identifiers = self._unfinished()
 
         if isinstance(identifiers, str):
             identifiers = [identifiers]
 
         waiting = set(identifiers)
-
         initial_count = len(waiting)
+
+        self._raise_failed(waiting)
+
+        waiting = set([
+            identifier for identifier in waiting
+            if self.simulations[identifier].status != "finished"
+        ])
+
         current_count = 0
+        full = True
 
         while len(waiting) > 0:
-            self._ping()
-
-            for identifier in set(waiting):
-                if self.simulations[identifier]["status"] == "finished":
-                    waiting.remove(identifier)
+            try:
+                waiting.difference_update(self._ping(full))
+            finally:
+                self._raise_failed(waiting)
 
             if current_count != len(waiting):
                 current_count = len(waiting)
                 logger.info("Waiting for samples. %d/%d finished ..." % (initial_count - current_count, initial_count))
 
             if len(waiting) > 0:
-                time.sleep(self.interval)
+                if not self.interrupt is None and self.interrupt():
+                    raise Interrupted("Interrupted while waiting for %d simulations" % len(waiting))
+
+                with section("evaluator.block"):
+                    full = self._block()
+
+    def wait_any(self, identifiers = None):
+        """
+            Waits until at least one of the given simulations, by default of all
+            unfinished ones, is finished and returns all of them which are finished
+            in the order in which they finished.
+        """
+        if identifiers is None:
+            identifiers = self._unfinished()
+
+        if isinstance(identifiers, str):
+            identifiers = [identifiers]
+
+        if len(identifiers) == 0:
+            return []
+
+        full = True
+
+        while True:
+            try:
+                self._ping(full)
+            finally:
+                self._raise_failed(identifiers)
+
+            finished = [
+                identifier for identifier in identifiers
+                if self.simulations[identifier].status == "finished"
+            ]
+
+            if len(finished) > 0:
+                return sorted(finished, key = lambda identifier: self.simulations[identifier].evaluator_evaluations)
+
+            if not self.interrupt is None and self.interrupt():
+                raise Interrupted("Interrupted while waiting for %d simulations" % len(identifiers))
+
+            with section("evaluator.block"):
+                full = self._block()
+
+    def _preparing(self):
+        return [
+            simulation.identifier
+            for future, items, batch in self.preparing
+            for simulation, simulator_parameters in items
+            if simulation.status != "cancelled"
+        ]
+
+    def _unfinished(self):
+        return list(self.running) + list(self.pending) + list(self.evaluating) + self._preparing()
+
+    def _polling(self):
+        # Without any events to wait for, we only sleep until the next pass
+        return not self.simulator.pushes_events and len(self.preparing) + len(self.evaluating) == 0
+
+    def _block_timeout(self):
+        return self.simulator.heartbeat if self.simulator.pushes_events else self.interval
+
+    def _block(self):
+        # Returns whether all running simulations need to be checked afterwards
+        if self._polling():
+            time.sleep(self.interval)
+            return True
+
+        try:
+            self.signalled.add(self.completions.get(timeout = self._block_timeout()))
+            return not self.simulator.pushes_events
+        except queue.Empty:
+            return True
 
     def get(self, identifiers):
         if isinstance(identifiers, str):
             self.wait([identifiers])
-            return self.simulations[identifiers]["objective"], self.simulations[identifiers]["state"]
+            return self.simulations[identifiers].objective, self.simulations[identifiers].state
 
         else:
             self.wait(identifiers)
 
             return [
-                (self.simulations[identifier]["objective"], self.simulations[identifier]["state"])
+                (self.simulations[identifier].objective, self.simulations[identifier].state)
                 for identifier in identifiers
             ]
 
+    def get_many(self, identifiers):
+        """
+            Waits for the given simulations and returns their objectives as an array
+            along with their states, which are stacked into an array if all
+            simulations provide one.
+        """
+        self.wait(identifiers)
+
+        objectives = np.array([
+            self.simulations[identifier].objective for identifier in identifiers
+        ])
+
+        states = [self.simulations[identifier].state for identifier in identifiers]
+
+        if len(states) > 0 and not any([state is None for state in states]):
+            states = np.array(states)
+
+        return objectives, states
+
     def ready(self, identifier):
         self._ping()
-        return self.simulations[identifier]["status"] == "finished"
+        return self.simulations[identifier].status == "finished"
 
     def clean(self, identifiers = None):
         if identifiers is None:
-            identifiers = self.finished[:]
+            identifiers = list(self.finished)
         elif isinstance(identifiers, str):
             identifiers = [identifiers]
 
         self.wait(identifiers)
 
         for identifier in identifiers:
-            del self.simulations[identifier]
-            self.simulator.clean(identifier)
-            self.finished.remove(identifier)
+            simulation = self.simulations.pop(identifier)
+
+            if simulation.attached:
+                with section("simulator.clean"):
+                    self.simulator.clean(identifier)
+
+            del self.finished[identifier]
+
+    def cancel(self, identifiers = None):
+        """
+            Stops the given simulations, by default all unfinished ones, and removes
+            them from the evaluator. Running simulations are cancelled in the
+            simulator, finished ones are cleaned. Cancelled simulations count neither
+            as evaluations nor towards the cost.
+        """
+        if identifiers is None:
+            identifiers = self._unfinished()
+        elif isinstance(identifiers, str):
+            identifiers = [identifiers]
+
+        for identifier in identifiers:
+            simulation = self.simulations.pop(identifier)
+
+            if simulation.status == "pending":
+                self.pending.remove(identifier)
+
+            elif simulation.status == "running":
+                del self.running[identifier]
+                self.occupied.discard(simulation.slot)
+                self.pending.cancelled(simulation)
+                with section("simulator.cancel"):
+                    self.simulator.cancel(identifier)
+
+            elif simulation.status == "evaluating":
+                # The output has already been obtained, only the objective is dropped
+                future = self.evaluating.pop(identifier)
+
+                if future.cancel():
+                    self.simulator.clean(identifier)
+                else:
+                    # The problem may still be reading the output
+                    future.add_done_callback(lambda future, identifier = identifier: self.simulator.clean(identifier))
+
+            elif simulation.status == "finished":
+                if simulation.attached:
+                    self.simulator.clean(identifier)
+
+                del self.finished[identifier]
+
+            elif simulation.status == "failed":
+                if simulation.attached:
+                    self.simulator.clean(identifier)
+
+            if simulation.status != "finished":
+                logger.info("Cancelled simulation %s" % identifier)
+
+            # Parameterizing simulations are dropped once their parameters arrive
+            simulation.status = "cancelled"
+
+            for future in self.futures.pop(identifier, []):
+                future.cancel()
+
+    def future(self, identifier):
+        """
+            Returns a concurrent.futures.Future which resolves to (objective, state)
+            once the simulation is finished. The future is resolved whenever the
+            evaluator is advanced, i.e. through wait, get, ready or the asynchronous
+            methods below.
+        """
+        future = concurrent.futures.Future()
+        simulation = self.simulations[identifier]
+
+        if simulation.status == "finished":
+            future.set_running_or_notify_cancel()
+            future.set_result((simulation.objective, simulation.state))
+        else:
+            self.futures.setdefault(identifier, []).append(future)
+
+        return future
+
+    def submit_future(self, x, simulator_parameters = {}, annotations = {}, transient = False):
+        identifier = self.submit(x, simulator_parameters, annotations, transient)
+        return self.future(identifier)
+
+    async def _block_async(self):
+        if self._polling():
+            await asyncio.sleep(self.interval)
+            return True
+
+        # The queue is read in a thread which cannot be interrupted, so it only
+        # blocks for a bounded time and returns events which it has obtained after
+        # the waiting task has been cancelled
+        timeout = self._block_timeout()
+        timeout = ASYNC_BLOCK_TIMEOUT if timeout is None else min(timeout, ASYNC_BLOCK_TIMEOUT)
+
+        lock = threading.Lock()
+        state = dict(cancelled = False, delivered = False, event = None)
+
+        def take():
+            event = self.completions.get(True, timeout)
+
+            with lock:
+                if state["cancelled"]:
+                    self.completions.put(event)
+                else:
+                    state["delivered"], state["event"] = True, event
+
+            return event
+
+        try:
+            self.signalled.add(await asyncio.get_running_loop().run_in_executor(None, take))
+            return not self.simulator.pushes_events
+
+        except queue.Empty:
+            return True
+
+        except asyncio.CancelledError:
+            with lock:
+                state["cancelled"] = True
+
+                if state["delivered"]:
+                    self.completions.put(state["event"])
+
+            raise
+
+    async def _drive(self):
+        full = True
+
+        try:
+            while len(self.futures) > 0:
+                self._ping(full)
+
+                if len(self.futures) > 0:
+                    with section("evaluator.block"):
+                        full = await self._block_async()
+
+        except Exception as exception:
+            for futures in self.futures.values():
+                for future in futures:
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(exception)
+
+            self.futures.clear()
+
+    def _await(self, identifier):
+        future = asyncio.wrap_future(self.future(identifier))
+
+        # Only one driver advances the evaluator, all coroutines wait for their futures
+        if self.driver is None or self.driver.done():
+            self.driver = asyncio.get_running_loop().create_task(self._drive())
+
+        return future
+
+    async def get_async(self, identifiers):
+        if isinstance(identifiers, str):
+            return await self._await(identifiers)
+
+        return await self.gather(identifiers)
+
+    async def wait_async(self, identifiers = None):
+        if identifiers is None:
+            identifiers = self._unfinished()
+
+        if isinstance(identifiers, str):
+            identifiers = [identifiers]
+
+        await self.gather(identifiers)
+
+    async def gather(self, identifiers):
+        return list(await asyncio.gather(*[
+            self._await(identifier) for identifier in identifiers
+        ]))
+
+    async def as_completed(self, identifiers):
+        """
+            Asynchronously iterates the given identifiers in the order in which the
+            simulations finish.
+        """
+        futures = { self._await(identifier): identifier for identifier in identifiers }
+        pending = set(futures.keys())
+
+        while len(pending) > 0:
+            done, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+
+            for future in done:
+                future.result() # Propagates errors of the simulations
+
+            for identifier in sorted([futures[future] for future in done],
+                    key = lambda identifier: self.simulations[identifier].evaluator_evaluations):
+                yield identifier
+
+    def get_state(self):
+        """
+            Returns a picklable snapshot of the bookkeeping of the evaluator, including
+            the pending and running simulations.
+        """
+        return dict(
+            simulations = self.simulations,
+            pending = list(self.pending), running = list(self.running) + list(self.evaluating),
+            preparing = [
+                (simulation.identifier, simulator_parameters)
+                for future, items, batch in self.preparing
+                for simulation, simulator_parameters in items
+                if simulation.status != "cancelled"
+            ],
+            finished = list(self.finished), trace = self.trace,
+            current_evaluations = self.current_evaluations,
+            current_cost = self.current_cost,
+            identifier_prefix = self.identifier_prefix,
+            identifier_count = self.identifier_count
+        )
+
+    def set_state(self, state):
+        """
+            Restores the evaluator from a snapshot. The simulator is asked to reattach
+            to the simulations that have been running or finished. Running simulations
+            which cannot be reattached are started again.
+        """
+        if len(self.simulations) > 0:
+            raise RuntimeError("The state can only be restored into an empty evaluator.")
+
+        self.simulations = state["simulations"]
+        self.trace = state["trace"]
+        self.current_evaluations = state["current_evaluations"]
+        self.current_cost = state["current_cost"]
+        self.identifier_prefix = state["identifier_prefix"]
+        self.identifier_count = state["identifier_count"]
+
+        for identifier in state["finished"]:
+            simulation = self.simulations[identifier]
+
+            if simulation.attached:
+                simulation.attached = self.simulator.restore(identifier, simulation.parameters)
+
+            self.finished[identifier] = True
+
+        for identifier in state["running"]:
+            simulation = self.simulations[identifier]
+
+            if self.simulator.restore(identifier, simulation.parameters):
+                simulation.status = "running"
+                simulation.slot = self._occupy()
+                self.running[identifier] = True
+            else:
+                logger.info("Restarting simulation %s" % identifier)
+                simulation.status = "pending"
+                self.pending.push(simulation)
+
+        for identifier in state["pending"]:
+            self.pending.push(self.simulations[identifier])
+
+        for identifier, simulator_parameters in state["preparing"]:
+            simulation = self.simulations[identifier]
+            self._prepare(simulation, self._parameterize(simulation.x), simulator_parameters)
 
     def fetch_trace(self):
-        trace, self.trace = self.trace[:], []
-        return trace
+        """
+            Iterates over the simulations that finished since the trace has been
+            fetched for the last time and removes them from the trace.
+        """
+        while len(self.trace) > 0:
+            yield self.trace.popleft()
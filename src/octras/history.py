@@ -0,0 +1,246 @@
+import hashlib, pickle, logging
+import numpy as np
+
+logger = logging.getLogger("octras")
+
+COLUMNS = ("objective", "cost", "evaluator_evaluations", "evaluator_cost")
+
+def _digest(value):
+    if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+        content = b"array:" + value.dtype.str.encode("utf-8") + repr(value.shape).encode("utf-8") + np.ascontiguousarray(value).tobytes()
+    else:
+        content = b"pickle:" + pickle.dumps(value, protocol = pickle.HIGHEST_PROTOCOL)
+
+    return hashlib.sha1(content).hexdigest()
+
+class History:
+    """
+        Columnar store of finished simulations which can be passed as a tracker to
+        the loop. Parameters, objectives, costs and evaluator counters are kept in
+        numpy arrays. Annotation values are stored once per distinct content as
+        blobs, so that, for instance, the covariance matrix which CMA-ES attaches
+        to all candidates of a generation is only stored once. Rows can be selected
+        by annotation values, e.g. `history.rows(type = "objective")` or
+        `history.rows(iteration = 3)`.
+    """
+
+    def __init__(self, capacity = 1024):
+        self.size = 0
+        self.capacity = capacity
+
+        self.identifiers = []
+        self.states = []
+        self.columns = { name: np.zeros((capacity,)) for name in COLUMNS }
+        self.transient = np.zeros((capacity,), dtype = bool)
+        self.x = None
+
+        # Every annotation key has a column of blob indices, -1 if not present
+        self.annotations = {}
+        self.blobs = []
+        self.blob_indices = {}
+
+    def _grow(self):
+        self.capacity *= 2
+
+        def grow(array):
+            result = np.full((self.capacity,) + array.shape[1:], -1 if array.dtype == np.int64 else 0, dtype = array.dtype)
+            result[:len(array)] = array
+            return result
+
+        self.columns = { name: grow(array) for name, array in self.columns.items() }
+        self.annotations = { key: grow(array) for key, array in self.annotations.items() }
+        self.transient = grow(self.transient)
+
+        if not self.x is None:
+            self.x = grow(self.x)
+
+    def _blob(self, value):
+        digest = _digest(value)
+
+        if not digest in self.blob_indices:
+            self.blob_indices[digest] = len(self.blobs)
+            self.blobs.append(value)
+
+        return self.blob_indices[digest]
+
+    def notify(self, simulation):
+        if self.size == self.capacity:
+            self._grow()
+
+        index = self.size
+        x = np.asarray(simulation["x"], dtype = float)
+
+        if self.x is None:
+            self.x = np.zeros((self.capacity, len(x)))
+
+        self.x[index] = x
+
+        for name in COLUMNS:
+            value = simulation.get(name)
+            self.columns[name][index] = np.nan if value is None else value
+
+        self.transient[index] = bool(simulation.get("transient"))
+        self.identifiers.append(simulation["identifier"])
+        self.states.append(simulation.get("state"))
+
+        for key, value in (simulation.get("annotations") or {}).items():
+            if not key in self.annotations:
+                self.annotations[key] = np.full((self.capacity,), -1, dtype = np.int64)
+
+            self.annotations[key][index] = self._blob(value)
+
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name):
+        if name == "x":
+            return self.x[:self.size] if not self.x is None else np.zeros((0, 0))
+
+        if name == "transient":
+            return self.transient[:self.size]
+
+        return self.columns[name][:self.size]
+
+    def state(self, rows = None):
+        """
+            Returns the states of the given rows, stacked into an array if all of
+            them are present.
+        """
+        states = self.states if rows is None else [self.states[row] for row in rows]
+
+        if len(states) > 0 and not any([state is None for state in states]):
+            return np.array(states)
+
+        return states
+
+    def annotation(self, key, rows = None):
+        """
+            Returns the values of an annotation for the given rows (all by default),
+            or None where the annotation is not present.
+        """
+        indices = self.annotations[key][:self.size] if key in self.annotations else np.full((self.size,), -1)
+
+        if not rows is None:
+            indices = indices[rows]
+
+        return [None if index < 0 else self.blobs[index] for index in indices]
+
+    def mask(self, include_transient = True, **criteria):
+        mask = np.ones((self.size,), dtype = bool)
+
+        if not include_transient:
+            mask &= ~self.column("transient")
+
+        for key, value in criteria.items():
+            index = self.blob_indices.get(_digest(value))
+
+            if index is None or not key in self.annotations:
+                return np.zeros((self.size,), dtype = bool)
+
+            mask &= self.annotations[key][:self.size] == index
+
+        return mask
+
+    def rows(self, include_transient = True, **criteria):
+        return np.flatnonzero(self.mask(include_transient, **criteria))
+
+    def best_so_far(self, include_transient = False):
+        """
+            Returns the best objective after every simulation.
+        """
+        objectives = np.copy(self.column("objective"))
+
+        if not include_transient:
+            objectives[self.column("transient")] = np.inf
+
+        return np.minimum.accumulate(objectives) if len(objectives) > 0 else objectives
+
+    def best(self, include_transient = False):
+        rows = self.rows(include_transient)
+
+        if len(rows) == 0:
+            return None, None
+
+        row = rows[np.argmin(self.column("objective")[rows])]
+        return self.column("objective")[row], self.column("x")[row]
+
+    def save(self, path):
+        """
+            Writes the history into a numpy archive. Every blob is stored as a
+            separate entry so that it is only unpickled when requested.
+        """
+        content = { name: self.column(name) for name in COLUMNS + ("x", "transient") }
+        content["identifiers"] = np.array(self.identifiers, dtype = str)
+
+        content["annotation_keys"] = np.array(list(self.annotations.keys()), dtype = str)
+
+        for index, key in enumerate(self.annotations.keys()):
+            content["annotation_%d" % index] = self.annotations[key][:self.size]
+
+        content["states"] = np.frombuffer(pickle.dumps(self.states), dtype = np.uint8)
+        content["blob_count"] = np.array(len(self.blobs))
+
+        digests = [None] * len(self.blobs)
+
+        for digest, index in self.blob_indices.items():
+            digests[index] = digest
+
+        content["blob_digests"] = np.array(digests, dtype = str)
+
+        for index, blob in enumerate(self.blobs):
+            content["blob_%d" % index] = np.frombuffer(pickle.dumps(blob), dtype = np.uint8)
+
+        with open(path, "wb") as f:
+            np.savez(f, **content)
+
+    @classmethod
+    def load(cls, path):
+        archive = np.load(path)
+        size = len(archive["objective"])
+
+        history = cls(max(1, size))
+        history.size = size
+
+        for name in COLUMNS:
+            history.columns[name][:size] = archive[name]
+
+        history.transient[:size] = archive["transient"]
+        history.x = np.zeros((history.capacity,) + archive["x"].shape[1:])
+        history.x[:size] = archive["x"]
+
+        history.identifiers = [str(identifier) for identifier in archive["identifiers"]]
+        history.states = pickle.loads(archive["states"].tobytes())
+
+        for index, key in enumerate(archive["annotation_keys"]):
+            history.annotations[str(key)] = np.array(archive["annotation_%d" % index], dtype = np.int64)
+
+        history.blobs = _LazyBlobs(archive, int(archive["blob_count"]))
+        history.blob_indices = {
+            str(digest): index for index, digest in enumerate(archive["blob_digests"])
+        }
+
+        return history
+
+class _LazyBlobs:
+    def __init__(self, archive, count):
+        self.archive = archive
+        self.count = count
+        self.cache = {}
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (self[index] for index in range(self.count))
+
+    def append(self, value):
+        self.cache[self.count] = value
+        self.count += 1
+
+    def __getitem__(self, index):
+        if not index in self.cache:
+            self.cache[index] = pickle.loads(self.archive["blob_%d" % index].tobytes())
+
+        return self.cache[index]
@@ -1,17 +1,80 @@
 import numpy as np
-import logging
+import logging, time, threading
+
+from .evaluator import Interrupted
+from .profiler import section
 
 logger = logging.getLogger("octras")
 
 class Loop:
-    def __init__(self, maximum_cost = np.inf, maximum_evaluations = np.inf, threshold = 0.0):
+    """
+        Runs an algorithm until one of the stopping criteria is met:
+
+        - the cost or the number of evaluations exceeds its maximum,
+        - the best objective falls below `threshold`,
+        - `maximum_time` seconds have passed since `run` was called. With the
+          `deadline_policy` "cancel", the running simulations are cancelled,
+          with "drain" they are finished and tracked, but nothing new is started,
+        - the best objective has not improved by more than `stagnation_tolerance`
+          (relative) within the last `stagnation_window` evaluations,
+        - the algorithm reports through `converged` that it cannot make progress.
+    """
+
+    def __init__(self, maximum_cost = np.inf, maximum_evaluations = np.inf, threshold = 0.0, maximum_time = np.inf, deadline_policy = "cancel", stagnation_window = None, stagnation_tolerance = 1e-6):
+        if not deadline_policy in ("cancel", "drain"):
+            raise RuntimeError("Unknown deadline policy: %s" % deadline_policy)
+
         self.maximum_cost = maximum_cost
         self.maximum_evaluations = maximum_evaluations
         self.threshold = threshold
 
+        self.maximum_time = maximum_time
+        self.deadline_policy = deadline_policy
+        self.start_time = None
+
+        self.stagnation_window = stagnation_window
+        self.stagnation_tolerance = stagnation_tolerance
+
+        # Best objective and evaluation count at the last significant improvement
+        self.reference_objective = None
+        self.reference_evaluations = None
+
         self.objective = None
         self.x = None
 
+        self.initial_evaluations = None
+        self.initial_cost = None
+        self.advances = 0
+
+        # Candidates which have been asked in steady state and are not told yet
+        self.outstanding = {}
+
+        # Unfinished simulations which have been submitted while running
+        self.submitted = {}
+
+    def get_state(self):
+        return dict(
+            objective = self.objective, x = self.x,
+            initial_evaluations = self.initial_evaluations,
+            initial_cost = self.initial_cost,
+            advances = self.advances,
+            outstanding = dict(self.outstanding),
+            submitted = dict(self.submitted),
+            reference_objective = self.reference_objective,
+            reference_evaluations = self.reference_evaluations
+        )
+
+    def set_state(self, state):
+        self.objective = state["objective"]
+        self.x = state["x"]
+        self.initial_evaluations = state["initial_evaluations"]
+        self.initial_cost = state["initial_cost"]
+        self.advances = state["advances"]
+        self.outstanding = dict(state.get("outstanding", {}))
+        self.submitted = dict(state.get("submitted", {}))
+        self.reference_objective = state.get("reference_objective")
+        self.reference_evaluations = state.get("reference_evaluations", self.initial_evaluations)
+
     def _process(self, simulation):
         self.cost = simulation["evaluator_cost"]
         self.evaluations = simulation["evaluator_evaluations"]
@@ -25,35 +88,177 @@ class Loop:
                     self.objective, str(simulation["x"])
                 ))
 
-    def run(self, evaluator, algorithm, tracker = None):
-        initial_evaluations = evaluator.current_evaluations
-        initial_cost = evaluator.current_cost
+                if self.reference_objective is None or self.objective < self.reference_objective - self.stagnation_tolerance * abs(self.reference_objective):
+                    self.reference_objective = self.objective
+                    self.reference_evaluations = self.evaluations
+
+    def _stop_reason(self, evaluator):
+        if evaluator.current_cost - self.initial_cost > self.maximum_cost:
+            return "Stopping because of cost limit is reached."
+
+        if evaluator.current_evaluations - self.initial_evaluations > self.maximum_evaluations:
+            return "Stopping because of run limit is reached."
 
-        while True:
-            if evaluator.current_cost - initial_cost > self.maximum_cost:
-                logger.warn("Stopping because of cost limit is reached.")
-                break
+        if not self.objective is None and self.objective < self.threshold:
+            return "Stopping because of objective is minized."
 
-            if evaluator.current_evaluations - initial_evaluations > self.maximum_evaluations:
-                logger.warn("Stopping because of run limit is reached.")
-                break
+        if self._deadline_reached():
+            return "Stopping because of time limit is reached."
 
-            if not self.objective is None and self.objective < self.threshold:
-                logger.info("Stopping because of objective is minized.")
-                break
+        if not self.stagnation_window is None and evaluator.current_evaluations - self.reference_evaluations >= self.stagnation_window:
+            return "Stopping because of objective has not improved for %d evaluations." % self.stagnation_window
 
-            algorithm.advance(evaluator)
+        return None
 
-            trace = evaluator.fetch_trace()
+    def _deadline_reached(self):
+        return time.time() - self.start_time >= self.maximum_time
 
-            for item in trace:
-                self._process(item)
+    def _process_trace(self, evaluator, tracker):
+        for item in evaluator.fetch_trace():
+            self.submitted.pop(item["identifier"], None)
+            self._process(item)
 
-                if not tracker is None:
+            if not tracker is None:
+                with section("tracker.notify"):
                     tracker.notify(item)
 
-            if not self.objective is None:
-                logger.info("Best objective found: %f" % self.objective)
-                logger.info("  at %s" % str(self.x))
+    def _submitted(self, identifiers):
+        return [identifier for identifier in identifiers if identifier in self.submitted]
+
+    def _interrupt(self, evaluator, tracker):
+        # Follows the trace while the algorithm waits so that a stopping criterion
+        # can fire in the middle of an iteration
+        self._process_trace(evaluator, tracker)
+        return not self._stop_reason(evaluator) is None
+
+    def _advance_steady_state(self, evaluator, algorithm):
+        # Fill up the free slots of the evaluator with new candidates
+        free = evaluator.parallel - len(self.outstanding)
+
+        if free > 0:
+            with section("algorithm.ask"):
+                candidates = algorithm.ask(free)
+
+            for x, annotations in candidates:
+                identifier = evaluator.submit(x, annotations = annotations)
+                self.outstanding[identifier] = (x, annotations)
+
+        if len(self.outstanding) == 0:
+            raise RuntimeError("The algorithm did not provide any candidates.")
+
+        for identifier in evaluator.wait_any(list(self.outstanding)):
+            x, annotations = self.outstanding.pop(identifier)
+            objective, state = evaluator.get(identifier)
+            evaluator.clean(identifier)
+
+            with section("algorithm.tell"):
+                algorithm.tell(x, objective, state, annotations)
+
+    def _stop(self, evaluator, tracker):
+        if self.deadline_policy == "drain" and self._deadline_reached():
+            # Nothing new is started, including simulations whose parameters are
+            # still prepared by the workers, but the running ones are tracked
+            evaluator.cancel(self._submitted(list(evaluator.pending) + evaluator._preparing()))
+            evaluator.wait(self._submitted(evaluator._unfinished()))
+            self._process_trace(evaluator, tracker)
+
+        # Simulations which are still running are not needed anymore, but those
+        # which have been submitted by others are left alone
+        evaluator.cancel(self._submitted(evaluator._unfinished()))
+        self.outstanding.clear()
+        self.submitted.clear()
+
+    def run(self, evaluator, algorithm, tracker = None, checkpoint = None, profiler = None, steady_state = False):
+        """
+            Runs the algorithm until a stopping criterion is met. With `steady_state`
+            the algorithm is driven through `ask` and `tell`: all slots of the
+            evaluator are kept busy and every result is told as soon as it is
+            available instead of waiting for whole iterations. At the end, the
+            unfinished simulations which have been submitted during the run are
+            cancelled, while those submitted by others are left alone.
+        """
+        if not profiler is None:
+            with profiler:
+                return self.run(evaluator, algorithm, tracker, checkpoint, steady_state = steady_state)
+
+        if steady_state and not algorithm.supports_ask_tell():
+            raise RuntimeError("The algorithm does not support ask and tell.")
+
+        if not checkpoint is None and checkpoint.exists():
+            checkpoint.restore(self, evaluator, algorithm)
+        else:
+            self.initial_evaluations = evaluator.current_evaluations
+            self.initial_cost = evaluator.current_cost
+            self.reference_evaluations = evaluator.current_evaluations
+
+        # The time limit applies to every call of run, also after a restore
+        self.start_time = time.time()
+
+        evaluator.interrupt = lambda: self._interrupt(evaluator, tracker)
+        evaluator.on_submit = lambda identifier: self.submitted.__setitem__(identifier, True)
+
+        # Wake up the evaluator at the deadline if it is blocked in waiting for events
+        alarm = None
+
+        if np.isfinite(self.maximum_time):
+            alarm = threading.Timer(self.maximum_time, evaluator.completions.put, args = (None,))
+            alarm.daemon = True
+            alarm.start()
+
+        # Algorithms which do not derive from Algorithm may only implement advance
+        converged = getattr(algorithm, "converged", None)
+        close = getattr(algorithm, "close", None)
+
+        try:
+            try:
+                while True:
+                    reason = self._stop_reason(evaluator)
+
+                    if reason is None and not converged is None and converged():
+                        reason = "Stopping because the algorithm has converged."
+
+                    if not reason is None:
+                        logger.warning(reason)
+                        break
+
+                    try:
+                        if steady_state:
+                            self._advance_steady_state(evaluator, algorithm)
+                        else:
+                            with section("algorithm.advance"):
+                                algorithm.advance(evaluator)
+
+                    except Interrupted:
+                        # The algorithm is left in the middle of the iteration
+                        logger.warning("Interrupting the current iteration.")
+                        continue
+
+                    self._process_trace(evaluator, tracker)
+                    self.advances += 1
+
+                    if not checkpoint is None and self.advances % checkpoint.interval == 0:
+                        with section("checkpoint.save"):
+                            checkpoint.save(self, evaluator, algorithm)
+
+                    if not self.objective is None:
+                        logger.info("Best objective found: %f" % self.objective)
+                        logger.info("  at %s" % str(self.x))
+
+            finally:
+                evaluator.interrupt = None
+                evaluator.on_submit = None
+
+                if not alarm is None:
+                    alarm.cancel()
+
+                # Nothing is submitted by the algorithm anymore after this point
+                if not close is None:
+                    close()
+
+            self._stop(evaluator, tracker)
+
+        finally:
+            # The workers of the evaluator are started again once they are needed
+            evaluator.close()
 
         return self.x
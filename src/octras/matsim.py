@@ -1,6 +1,7 @@
 from octras import Simulator
+from octras.profiler import section
 
-import os, shutil
+import os, shutil, threading, signal, atexit
 import subprocess as sp
 import pandas as pd
 import numpy as np
@@ -12,6 +13,41 @@ import deep_merge
 
 logger = logging.getLogger("octras")
 
+# Process groups of the running JVMs. Since they run in their own sessions, they
+# do not receive signals sent to the driver, so they are terminated when it exits.
+_process_groups = set()
+_signals_installed = False
+
+def _terminate_process_groups():
+    for process_group in list(_process_groups):
+        try:
+            os.killpg(process_group, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+        _process_groups.discard(process_group)
+
+def _handle_signal(signum, frame):
+    _terminate_process_groups()
+
+    # Continue with the default behaviour of the signal
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+def _install_cleanup():
+    global _signals_installed
+
+    # Signal handlers can only be installed from the main thread, and handlers
+    # of the application are left alone
+    if not _signals_installed and threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGHUP):
+            if signal.getsignal(signum) == signal.SIG_DFL:
+                signal.signal(signum, _handle_signal)
+
+        _signals_installed = True
+
+atexit.register(_terminate_process_groups)
+
 class ConvergenceHandler:
     def may_terminate(self, path, iteration):
         pass
@@ -24,13 +60,16 @@ class MATSimSimulator(Simulator):
         Defines a wrapper around a standard MATSim simulation
     """
 
-    def __init__(self, working_directory, parameters, convergence_handler = None):
+    pushes_events = True
+
+    def __init__(self, working_directory, parameters, convergence_handler = None, heartbeat = 10.0):
         if not os.path.exists(working_directory):
             raise RuntimeError("Working directory does not exist: %s" % working_directory)
 
         self.working_directory = os.path.realpath(working_directory)
         self.parameters = parameters
         self.convergence_handler = convergence_handler
+        self.heartbeat = heartbeat
 
         if not "memory" in self.parameters:
             self.parameters["memory"] = "10G"
@@ -50,6 +89,41 @@ class MATSimSimulator(Simulator):
         if identifier in self.simulations:
             raise RuntimeError("A simulation with identifier %s already exists." % identifier)
 
+        arguments, iterations = self._prepare(identifier, parameters)
+        simulation_path = "%s/%s" % (self.working_directory, identifier)
+
+        stdout = open("%s/simulation_output.log" % simulation_path, "w+")
+        stderr = open("%s/simulation_error.log" % simulation_path, "w+")
+
+        logger.info("Starting simulation %s:" % identifier)
+        logger.info(" ".join(arguments))
+
+        # The JVM gets its own process group so that it can be cancelled as a whole
+        _install_cleanup()
+        process = sp.Popen(arguments, stdout = stdout, stderr = stderr, start_new_session = True)
+        _process_groups.add(process.pid)
+
+        self.simulations[identifier] = {
+            "process": process,
+            "arguments": arguments, "status": "running", "progress": -1,
+            "iterations": iterations,
+            "convergence_sequence_may": -1,
+            "convergence_sequence_do": -1
+        }
+
+        # Push a completion event as soon as the process exits
+        threading.Thread(target = self._watch, args = (identifier, process), daemon = True).start()
+
+    def command(self, identifier, parameters):
+        """
+            Prepares the directory of a simulation and returns the command line to run
+            it, for instance, to submit it through the BatchSimulator. Pass `get` as
+            its `result` so that the problem receives the same output path as for
+            simulations that are run by this simulator.
+        """
+        return self._prepare(identifier, parameters)[0]
+
+    def _prepare(self, identifier, parameters):
         # Prepare the working space
         simulation_path = "%s/%s" % (self.working_directory, identifier)
 
@@ -162,21 +236,31 @@ class MATSimSimulator(Simulator):
             arguments += ["--config:%s" % key, str(value)]
 
         arguments = [str(a) for a in arguments]
+        return arguments, iterations
 
-        stdout = open("%s/simulation_output.log" % simulation_path, "w+")
-        stderr = open("%s/simulation_error.log" % simulation_path, "w+")
+    def _watch(self, identifier, process):
+        process.wait()
+        _process_groups.discard(process.pid)
+        self.notify(identifier)
 
-        logger.info("Starting simulation %s:" % identifier)
-        logger.info(" ".join(arguments))
+    def restore(self, identifier, parameters):
+        simulation_path = "%s/%s" % (self.working_directory, identifier)
+
+        # MATSim writes the final plans only once the simulation has finished
+        if len(glob.glob("%s/output/*output_plans.xml.gz" % simulation_path)) == 0:
+            return False
+
+        logger.info("Reattaching to finished simulation %s" % identifier)
 
         self.simulations[identifier] = {
-            "process": sp.Popen(arguments, stdout = stdout, stderr = stderr),
-            "arguments": arguments, "status": "running", "progress": -1,
-            "iterations": iterations,
+            "process": None, "arguments": None,
+            "status": "done", "progress": -1, "iterations": None,
             "convergence_sequence_may": -1,
             "convergence_sequence_do": -1
         }
 
+        return True
+
     def _handle_convergence(self, identifier):
         simulation_path = "%s/%s/output" % (self.working_directory, identifier)
         terminate = False
@@ -216,8 +300,13 @@ class MATSimSimulator(Simulator):
 
         return terminate
 
-    def _ping(self):
-        for identifier, simulation in self.simulations.items():
+    def _ping(self, identifiers = None):
+        if identifiers is None:
+            identifiers = list(self.simulations.keys())
+
+        for identifier in identifiers:
+            simulation = self.simulations[identifier]
+
             if simulation["status"] == "running":
                 return_code = simulation["process"].poll()
 
@@ -232,6 +321,7 @@ class MATSimSimulator(Simulator):
 
                     if iteration > simulation["progress"]:
                         simulation["progress"] = iteration
+                        self.report(identifier, "iteration", iteration = int(iteration))
 
                         logger.info("Running simulation {} ... ({}/{} iterations)".format(
                             identifier, iteration, "?" if simulation["iterations"] is None else simulation["iterations"]
@@ -251,7 +341,8 @@ class MATSimSimulator(Simulator):
 
         if len(stopwatch_paths) > 0 and os.path.isfile(stopwatch_paths[0]):
             try:
-                df = pd.read_csv(stopwatch_paths[0], sep = "\t")
+                with section("matsim.read_stopwatch"):
+                    df = pd.read_csv(stopwatch_paths[0], sep = "\t")
 
                 if len(df) > 0:
                     return df["Iteration"].max()
@@ -261,11 +352,13 @@ class MATSimSimulator(Simulator):
         return -1
 
     def ready(self, identifier):
-        self._ping()
+        self._ping([identifier])
         return self.simulations[identifier]["status"] == "done"
 
     def get(self, identifier):
-        if not self.ready(identifier):
+        # Simulations which have only been prepared through `command` are run and
+        # tracked by another simulator, which decides whether they are ready
+        if identifier in self.simulations and not self.ready(identifier):
             raise RuntimeError("Simulation %s is not ready to obtain result." % identifier)
 
         simulation_path = "%s/%s" % (self.working_directory, identifier)
@@ -274,3 +367,27 @@ class MATSimSimulator(Simulator):
     def clean(self, identifier):
         simulation_path = "%s/%s" % (self.working_directory, identifier)
         shutil.rmtree(simulation_path)
+
+        if identifier in self.simulations:
+            del self.simulations[identifier]
+
+    def cancel(self, identifier, timeout = 10.0):
+        process = self.simulations[identifier]["process"]
+
+        if not process is None and process.poll() is None:
+            logger.info("Terminating simulation %s" % identifier)
+
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait(timeout)
+            except ProcessLookupError:
+                pass
+            except sp.TimeoutExpired:
+                logger.warning("Killing simulation %s" % identifier)
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+
+        if not process is None:
+            _process_groups.discard(process.pid)
+
+        self.clean(identifier)
@@ -0,0 +1,126 @@
+import concurrent.futures
+import multiprocessing.shared_memory as shared_memory
+import multiprocessing.resource_tracker as resource_tracker
+import numpy as np
+
+import logging
+logger = logging.getLogger("octras")
+
+from octras import Simulator
+
+class SharedArray:
+    """
+        Describes a numpy array which has been placed in shared memory by a worker.
+    """
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+def _share(value, threshold):
+    if isinstance(value, np.ndarray) and value.nbytes >= threshold and not value.dtype.hasobject:
+        memory = shared_memory.SharedMemory(create = True, size = max(1, value.nbytes))
+        np.ndarray(value.shape, value.dtype, buffer = memory.buf)[...] = value
+
+        descriptor = SharedArray(memory.name, value.shape, value.dtype.str)
+        memory.close()
+
+        return descriptor
+
+    if isinstance(value, dict):
+        return { key: _share(item, threshold) for key, item in value.items() }
+
+    if isinstance(value, (list, tuple)):
+        return type(value)([_share(item, threshold) for item in value])
+
+    return value
+
+def _unshare(value):
+    if isinstance(value, SharedArray):
+        memory = shared_memory.SharedMemory(name = value.name)
+
+        try:
+            return np.ndarray(value.shape, value.dtype, buffer = memory.buf).copy()
+        finally:
+            memory.close()
+            memory.unlink()
+
+    if isinstance(value, dict):
+        return { key: _unshare(item) for key, item in value.items() }
+
+    if isinstance(value, (list, tuple)):
+        return type(value)([_unshare(item) for item in value])
+
+    return value
+
+def _execute(function, parameters, threshold):
+    return _share(function(parameters), threshold)
+
+def _release(future):
+    if not future.cancelled() and future.exception() is None:
+        _unshare(future.result())
+
+class ProcessPoolSimulator(Simulator):
+    """
+        Runs a picklable Python function, which receives the simulator parameters
+        and returns the simulation result, in a pool of worker processes. Numpy
+        arrays of at least `threshold` bytes in the result are passed back through
+        shared memory instead of being pickled.
+    """
+
+    pushes_events = True
+
+    def __init__(self, function, processes = None, threshold = 65536):
+        self.function = function
+        self.threshold = threshold
+
+        # Workers need to share the resource tracker of this process, otherwise they
+        # would clean up the shared memory of results that they have passed back
+        resource_tracker.ensure_running()
+        self.executor = concurrent.futures.ProcessPoolExecutor(processes)
+        self.futures = {}
+        self.results = {}
+
+    def run(self, identifier, parameters):
+        if identifier in self.futures:
+            raise RuntimeError("A simulation with identifier %s already exists." % identifier)
+
+        future = self.executor.submit(_execute, self.function, parameters, self.threshold)
+        self.futures[identifier] = future
+
+        future.add_done_callback(lambda future: self.notify(identifier))
+
+    def ready(self, identifier):
+        return self.futures[identifier].done()
+
+    def get(self, identifier):
+        if not self.ready(identifier):
+            raise RuntimeError("Simulation %s is not ready to obtain result." % identifier)
+
+        if not identifier in self.results:
+            self.results[identifier] = _unshare(self.futures[identifier].result())
+
+        return self.results[identifier]
+
+    def clean(self, identifier):
+        future = self.futures.pop(identifier)
+
+        if not identifier in self.results:
+            # Release the shared memory of results which have never been obtained
+            if future.done() and future.exception() is None:
+                _unshare(future.result())
+        else:
+            del self.results[identifier]
+
+    def cancel(self, identifier):
+        future = self.futures.pop(identifier)
+        self.results.pop(identifier, None)
+
+        # A function that has already started cannot be interrupted in the pool, so
+        # only its shared memory is released once it is done
+        if not future.cancel():
+            future.add_done_callback(_release)
+
+    def shutdown(self):
+        self.executor.shutdown()
@@ -0,0 +1,426 @@
+import threading, collections
+import numpy as np
+
+import logging
+logger = logging.getLogger("octras")
+
+from .algorithm import Algorithm
+from .evaluator import Interrupted
+from .scheduler import Scheduler
+
+class PortfolioScheduler(Scheduler):
+    """
+        Holds one queue of pending simulations per algorithm instance of a
+        portfolio, identified by the `instance` annotation. The next simulation is
+        taken from the instance which has the fewest running simulations relative
+        to its weight, so that instances with higher weights obtain more slots.
+    """
+
+    def __init__(self):
+        self.queues = collections.OrderedDict()
+        self.running = collections.Counter()
+        self.weights = {}
+        self.instances = {}
+
+    def _instance(self, simulation):
+        return simulation["annotations"].get("instance")
+
+    def push(self, simulation):
+        instance = self._instance(simulation)
+        self.instances[simulation["identifier"]] = instance
+        self.queues.setdefault(instance, collections.deque()).append(simulation["identifier"])
+
+    def pop(self):
+        candidates = [instance for instance, queue in self.queues.items() if len(queue) > 0]
+
+        instance = min(candidates, key = lambda instance:
+            (self.running[instance] + 1) / self.weights.get(instance, 1.0)
+        )
+
+        return self.queues[instance].popleft()
+
+    def __len__(self):
+        return sum([len(queue) for queue in self.queues.values()])
+
+    def __iter__(self):
+        return iter([identifier for queue in self.queues.values() for identifier in queue])
+
+    def remove(self, identifier):
+        self.queues[self.instances.pop(identifier)].remove(identifier)
+
+    def started(self, simulation):
+        self.running[self.instances[simulation["identifier"]]] += 1
+
+    def finished(self, simulation):
+        self.running[self.instances.pop(simulation["identifier"])] -= 1
+
+    def cancelled(self, simulation):
+        self.finished(simulation)
+
+class ScopedEvaluator:
+    """
+        View on a shared evaluator for one algorithm instance of a portfolio. The
+        simulations are annotated with the instance, and waiting, cleaning and
+        cancelling without identifiers only concern the simulations of this
+        instance. The evaluator itself is only advanced by the portfolio, and it
+        is only accessed while the portfolio is advanced, so that instances pause
+        once the loop has taken over again.
+    """
+
+    def __init__(self, portfolio, evaluator, instance):
+        self.portfolio = portfolio
+        self.evaluator = evaluator
+        self.instance = instance
+        self.identifiers = {}
+
+    def __getattr__(self, name):
+        # Problem, counters and other attributes of the shared evaluator
+        return getattr(self.evaluator, name)
+
+    def _annotate(self, annotations):
+        return dict(annotations, instance = self.instance)
+
+    def _wake(self):
+        self.evaluator.completions.put(None)
+
+    def submit(self, x, simulator_parameters = {}, annotations = {}, transient = False):
+        with self.portfolio.condition:
+            self.portfolio._barrier()
+            identifier = self.evaluator.submit(x, simulator_parameters, self._annotate(annotations), transient)
+            self.identifiers[identifier] = True
+
+        self._wake()
+        return identifier
+
+    def submit_many(self, X, simulator_parameters = {}, annotations = {}, transient = False):
+        if isinstance(annotations, dict):
+            annotations = self._annotate(annotations)
+        else:
+            annotations = [self._annotate(item) for item in annotations]
+
+        with self.portfolio.condition:
+            self.portfolio._barrier()
+            identifiers = self.evaluator.submit_many(X, simulator_parameters, annotations, transient)
+
+            for identifier in identifiers:
+                self.identifiers[identifier] = True
+
+        self._wake()
+        return identifiers
+
+    def _status(self, identifier):
+        simulation = self.evaluator.simulations.get(identifier)
+        return "cancelled" if simulation is None else simulation.status
+
+    def _unfinished(self):
+        return [
+            identifier for identifier in self.identifiers
+            if self._status(identifier) != "finished"
+        ]
+
+    def _finished(self, identifiers):
+        # Must be called while holding the lock
+        for identifier in identifiers:
+            status = self._status(identifier)
+
+            if status == "cancelled":
+                raise Interrupted("Simulation %s has been cancelled" % identifier)
+
+            if status != "finished":
+                return False
+
+        return True
+
+    def wait(self, identifiers = None):
+        if isinstance(identifiers, str):
+            identifiers = [identifiers]
+
+        with self.portfolio.condition:
+            self.portfolio._barrier()
+
+            if identifiers is None:
+                identifiers = self._unfinished()
+
+            while not self._finished(identifiers):
+                # The timeout lets threads notice simulations cancelled from outside
+                self.portfolio.condition.wait(1.0)
+                self.portfolio._barrier()
+
+    def wait_any(self, identifiers = None):
+        if isinstance(identifiers, str):
+            identifiers = [identifiers]
+
+        with self.portfolio.condition:
+            self.portfolio._barrier()
+
+            if identifiers is None:
+                identifiers = self._unfinished()
+
+            while len(identifiers) > 0:
+                finished = [
+                    identifier for identifier in identifiers
+                    if self._finished([identifier])
+                ]
+
+                if len(finished) > 0:
+                    return sorted(finished, key = lambda identifier: self.evaluator.simulations[identifier].evaluator_evaluations)
+
+                self.portfolio.condition.wait(1.0)
+                self.portfolio._barrier()
+
+            return []
+
+    def get(self, identifiers):
+        self.wait(identifiers)
+
+        with self.portfolio.condition:
+            self.portfolio._barrier()
+            return self.evaluator.get(identifiers)
+
+    def get_many(self, identifiers):
+        self.wait(identifiers)
+
+        with self.portfolio.condition:
+            self.portfolio._barrier()
+            return self.evaluator.get_many(identifiers)
+
+    def ready(self, identifier):
+        with self.portfolio.condition:
+            self.portfolio._barrier()
+            return self._finished([identifier])
+
+    def clean(self, identifiers = None):
+        if isinstance(identifiers, str):
+            identifiers = [identifiers]
+
+        if identifiers is None:
+            with self.portfolio.condition:
+                self.portfolio._barrier()
+                identifiers = [
+                    identifier for identifier in self.identifiers
+                    if self._status(identifier) == "finished"
+                ]
+
+        self.wait(identifiers)
+
+        with self.portfolio.condition:
+            self.portfolio._barrier()
+            self.evaluator.clean(identifiers)
+
+            for identifier in identifiers:
+                self.identifiers.pop(identifier, None)
+
+    def cancel(self, identifiers = None):
+        if isinstance(identifiers, str):
+            identifiers = [identifiers]
+
+        with self.portfolio.condition:
+            self.portfolio._barrier()
+
+            if identifiers is None:
+                identifiers = self._unfinished()
+
+            self.evaluator.cancel(identifiers)
+
+            for identifier in identifiers:
+                self.identifiers.pop(identifier, None)
+
+class Portfolio(Algorithm):
+    """
+        Runs several algorithm instances at once against one evaluator. Every
+        instance advances in its own thread against a ScopedEvaluator, so that it
+        only waits for its own simulations, while the portfolio advances the
+        shared evaluator. Slots which are freed by one instance are filled with the
+        pending candidates of the others.
+
+        With `allocation = "rank"`, the instances are ranked by the best objective
+        they have found so far and receive slots proportionally to
+        `len(algorithms) - rank`. Instances without results yet are ranked first.
+        With `allocation = "equal"`, all instances are treated alike. An instance
+        stops once it has converged.
+
+        One call of `advance` returns as soon as any instance has finished an
+        iteration, so the loop checks its stopping criteria in between. The
+        other instances are paused until the next call. The loop closes the
+        portfolio at the end of `run`, which stops all instances in the middle of
+        their iterations. They are started again by the next call of `advance`.
+    """
+
+    def __init__(self, algorithms, allocation = "rank"):
+        if not allocation in ("rank", "equal"):
+            raise RuntimeError("Unknown allocation policy: %s" % allocation)
+
+        self.algorithms = algorithms
+        self.allocation = allocation
+
+        self.condition = threading.Condition()
+        self.scheduler = PortfolioScheduler()
+        self.evaluator = None
+        self.original_scheduler = None
+        self.threads = None
+        self.stopping = False
+        self.driving = False
+        self.errors = []
+
+        self.iterations = [0] * len(algorithms)
+        self.best = [None] * len(algorithms)
+
+    def get_state(self):
+        raise RuntimeError("Portfolios do not support checkpoints.")
+
+    def converged(self):
+        return all([self._converged(algorithm) for algorithm in self.algorithms])
+
+    def _converged(self, algorithm):
+        # Algorithms which do not derive from Algorithm may only implement advance
+        converged = getattr(algorithm, "converged", None)
+        return not converged is None and converged()
+
+    def _start(self, evaluator):
+        if len(evaluator.pending) > 0 or len(evaluator.running) > 0:
+            raise RuntimeError("The portfolio needs an evaluator without pending or running simulations.")
+
+        self.evaluator = evaluator
+        self.original_scheduler = evaluator.pending
+        evaluator.pending = self.scheduler
+        self._update_weights()
+
+        self.threads = [
+            threading.Thread(target = self._run, args = (instance, ScopedEvaluator(self, evaluator, instance)), daemon = True)
+            for instance in range(len(self.algorithms))
+        ]
+
+        for thread in self.threads:
+            thread.start()
+
+    def _barrier(self):
+        # Must be called while holding the lock
+        while True:
+            if self.stopping:
+                raise Interrupted("The portfolio has been stopped")
+
+            if self.driving:
+                return
+
+            self.condition.wait()
+
+    def _run(self, instance, evaluator):
+        algorithm = self.algorithms[instance]
+
+        try:
+            while True:
+                with self.condition:
+                    # New iterations are only started while the portfolio is advanced
+                    self._barrier()
+
+                    if self._converged(algorithm):
+                        break
+
+                algorithm.advance(evaluator)
+
+                with self.condition:
+                    self.iterations[instance] += 1
+
+                evaluator.completions.put(None)
+
+        except Interrupted:
+            pass
+
+        except Exception as e:
+            with self.condition:
+                self.errors.append(e)
+
+            evaluator.completions.put(None)
+
+        logger.info("Portfolio instance %d stopped after %d iterations" % (instance, self.iterations[instance]))
+
+    def _update_weights(self):
+        if self.allocation == "equal":
+            self.scheduler.weights = { instance: 1.0 for instance in range(len(self.algorithms)) }
+        else:
+            keys = [-np.inf if best is None else best for best in self.best]
+            order = np.argsort(keys, kind = "stable")
+
+            self.scheduler.weights = {
+                int(instance): float(len(self.algorithms) - rank)
+                for rank, instance in enumerate(order)
+            }
+
+    def _track(self, evaluator, identifiers):
+        for identifier in identifiers:
+            simulation = evaluator.simulations[identifier]
+            instance = simulation.annotations.get("instance")
+
+            if not instance is None and not simulation.transient:
+                if self.best[instance] is None or simulation.objective < self.best[instance]:
+                    self.best[instance] = simulation.objective
+
+        self._update_weights()
+
+    def advance(self, evaluator):
+        if self.threads is None:
+            self._start(evaluator)
+
+        with self.condition:
+            self.driving = True
+            initial_iterations = sum(self.iterations)
+            self.condition.notify_all()
+
+        full = True
+
+        try:
+            while True:
+                with self.condition:
+                    self._track(evaluator, evaluator._ping(full))
+                    self.condition.notify_all()
+
+                    if len(self.errors) > 0:
+                        raise self.errors[0]
+
+                    if sum(self.iterations) > initial_iterations:
+                        break
+
+                    if not any([thread.is_alive() for thread in self.threads]):
+                        break
+
+                    if not evaluator.interrupt is None and evaluator.interrupt():
+                        raise Interrupted("Interrupted while advancing the portfolio")
+
+                full = evaluator._block()
+
+        except Interrupted:
+            raise
+
+        except Exception:
+            self.close()
+            raise
+
+        finally:
+            with self.condition:
+                self.driving = False
+
+    def close(self):
+        """
+            Stops all instances and restores the scheduler of the evaluator. Called
+            by the loop once `run` has finished.
+        """
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+
+        if not self.threads is None:
+            for thread in self.threads:
+                thread.join()
+
+        with self.condition:
+            if not self.evaluator is None:
+                for identifier in self.scheduler:
+                    self.original_scheduler.push(self.evaluator.simulations[identifier])
+
+                self.evaluator.pending = self.original_scheduler
+                self.evaluator = None
+
+            # The instances are started again by the next call of advance
+            self.scheduler = PortfolioScheduler()
+            self.threads = None
+            self.stopping = False
@@ -21,6 +21,15 @@ class Problem:
         """
         raise NotImplementedError()
 
+    def parameterize_batch(self, X):
+        """
+            This method receives a two-dimensional array in which each row is a vector
+            of numeric parameters. It returns a list with one response per row in the
+            format of `parameterize`. Problems that can prepare many simulations at
+            once more efficiently may override it.
+        """
+        return [self.parameterize(x) for x in X]
+
     def evaluate(self, x, response):
         """
             This method represents the objective function. It receives the numeric
@@ -0,0 +1,197 @@
+import time, threading, collections, sys, io
+import cProfile, pstats
+
+import logging
+logger = logging.getLogger("octras")
+
+# The profiler which currently receives the timings of all sections
+_active = None
+
+class _NullSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *arguments):
+        return False
+
+_null_section = _NullSection()
+
+def section(name):
+    """
+        Returns a context manager which measures the enclosed code as the given
+        call site if a profiler is active and does nothing otherwise.
+    """
+    if _active is None:
+        return _null_section
+
+    return _Section(_active, name)
+
+class _Section:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *arguments):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class Profiler:
+    """
+        Opt-in instrumentation of an optimization. While the profiler is active,
+        either as a context manager or by passing it to `Loop.run`, the time spent
+        in the algorithm, the problem, the simulator, the trackers and in expensive
+        internal steps of the algorithms is accumulated per call site. Sections may
+        be nested, for instance all calls of the evaluator happen within
+        `algorithm.advance`. The time in `evaluator.block` is spent waiting for the
+        simulator, all other time is overhead of the driver process.
+
+        Optionally, a cProfile session records the whole driver process, and a
+        sampler records the stack of the driver thread every `sampling_interval`
+        seconds.
+    """
+
+    def __init__(self, cprofile = False, sampling_interval = None):
+        self.lock = threading.Lock()
+        self.counters = {}
+
+        self.depth = 0
+        self.previous = None
+        self.wall_time = 0.0
+        self.start_time = None
+
+        self.profile = cProfile.Profile() if cprofile else None
+
+        self.sampling_interval = sampling_interval
+        self.samples = collections.Counter()
+        self.leaf_samples = collections.Counter()
+        self.sample_count = 0
+        self.sampler = None
+        self.stopping = None
+
+    def record(self, name, duration):
+        with self.lock:
+            counter = self.counters.get(name)
+
+            if counter is None:
+                self.counters[name] = [1, duration, duration]
+            else:
+                counter[0] += 1
+                counter[1] += duration
+                counter[2] = max(counter[2], duration)
+
+    def section(self, name):
+        return _Section(self, name)
+
+    def __enter__(self):
+        global _active
+        self.depth += 1
+
+        if self.depth == 1:
+            self.previous, _active = _active, self
+            self.start_time = time.perf_counter()
+
+            if not self.profile is None:
+                self.profile.enable()
+
+            if not self.sampling_interval is None:
+                self.stopping = threading.Event()
+                self.sampler = threading.Thread(target = self._sample, args = (threading.get_ident(),), daemon = True)
+                self.sampler.start()
+
+        return self
+
+    def __exit__(self, *arguments):
+        global _active
+        self.depth -= 1
+
+        if self.depth == 0:
+            if not self.sampler is None:
+                self.stopping.set()
+                self.sampler.join()
+                self.sampler = None
+
+            if not self.profile is None:
+                self.profile.disable()
+
+            self.wall_time += time.perf_counter() - self.start_time
+            _active = self.previous
+
+        return False
+
+    def _sample(self, thread):
+        while not self.stopping.wait(self.sampling_interval):
+            frame = sys._current_frames().get(thread)
+
+            if frame is None:
+                continue
+
+            stack = []
+
+            while not frame is None:
+                code = frame.f_code
+                stack.append("%s (%s:%d)" % (code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+
+            with self.lock:
+                self.sample_count += 1
+                self.leaf_samples[stack[0]] += 1
+                self.samples.update(set(stack))
+
+    def summary(self):
+        """
+            Returns a dictionary with the number of calls, the total time, the
+            mean time and the maximum time per call site.
+        """
+        with self.lock:
+            return {
+                name: dict(calls = calls, total = total, mean = total / calls, maximum = maximum)
+                for name, (calls, total, maximum) in self.counters.items()
+            }
+
+    def stats(self):
+        if self.profile is None:
+            raise RuntimeError("The profiler has been created without cProfile.")
+
+        return pstats.Stats(self.profile)
+
+    def report(self, limit = 20):
+        summary = self.summary()
+        wall_time = self.wall_time
+
+        if self.depth > 0:
+            wall_time += time.perf_counter() - self.start_time
+
+        lines = ["Profile over %.3fs" % wall_time]
+        lines.append("%-40s %10s %12s %12s %12s %8s" % ("Call site", "Calls", "Total [s]", "Mean [ms]", "Max [ms]", "Share"))
+
+        for name, counter in sorted(summary.items(), key = lambda item: -item[1]["total"]):
+            lines.append("%-40s %10d %12.3f %12.3f %12.3f %7.1f%%" % (
+                name, counter["calls"], counter["total"],
+                1e3 * counter["mean"], 1e3 * counter["maximum"],
+                100.0 * counter["total"] / wall_time if wall_time > 0.0 else 0.0
+            ))
+
+        if self.sample_count > 0:
+            lines.append("")
+            lines.append("Sampled %d stacks of the driver thread, most frequent functions:" % self.sample_count)
+
+            for function, count in self.leaf_samples.most_common(limit):
+                lines.append("%7.1f%% self %7.1f%% total  %s" % (
+                    100.0 * count / self.sample_count,
+                    100.0 * self.samples[function] / self.sample_count, function
+                ))
+
+        if not self.profile is None:
+            output = io.StringIO()
+            pstats.Stats(self.profile, stream = output).sort_stats("cumulative").print_stats(limit)
+
+            lines.append("")
+            lines.append(output.getvalue())
+
+        return "\n".join(lines)
@@ -0,0 +1,47 @@
+class SimulationRecord:
+    """
+        Compact record of a simulation in the evaluator. The fields can be accessed
+        as attributes or, as for the dictionaries used previously, by key.
+    """
+
+    __slots__ = (
+        "identifier", "parameters", "x", "cost", "annotations",
+        "status", "transient", "cache_key", "cached", "attached",
+        "result", "objective", "state", "information", "error",
+        "evaluator_evaluations", "evaluator_cost",
+        "timings", "slot", "events"
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.pop(name, None))
+
+        if len(fields) > 0:
+            raise RuntimeError("Unknown fields for simulation record: %s" % ", ".join(fields.keys()))
+
+    def __getitem__(self, key):
+        if not key in self.__slots__:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if not key in self.__slots__:
+            raise KeyError(key)
+
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default = None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def to_dict(self):
+        return { name: getattr(self, name) for name in self.__slots__ }
+
+    def __repr__(self):
+        return "SimulationRecord(%s, %s)" % (self.identifier, self.status)
@@ -0,0 +1,374 @@
+import multiprocessing.connection as connection
+import threading, collections, traceback, importlib, argparse, os, time
+import secrets, socket, ipaddress
+
+import logging
+logger = logging.getLogger("octras")
+
+from octras import Simulator
+
+class RemoteSimulator(Simulator):
+    """
+        Dispatches simulations to worker agents which connect to a socket that is
+        opened by this simulator in the process of the optimization. Every worker
+        announces a number of slots and each simulation is sent to the worker with
+        the most free slots. Simulations which cannot be placed are queued until a
+        slot becomes free. If a worker disconnects, its simulations are sent to the
+        remaining workers again.
+
+        With `evaluate = True`, the workers apply `Problem.evaluate` on their host
+        and only the objective and state are transferred back. Otherwise, the
+        results of the simulators on the workers are transferred as they are.
+
+        Messages are pickled, so everybody who knows the `authkey` can execute
+        code in the process of the optimization. Without an explicit key, a
+        random one is generated and logged, which is only allowed when listening
+        on a loopback address. Workers on other hosts need an explicit key, which
+        the command line of the worker reads from OCTRAS_AUTHKEY.
+    """
+
+    pushes_events = True
+
+    def __init__(self, address = ("localhost", 0), authkey = None, evaluate = False):
+        self.evaluates = evaluate
+
+        if authkey is None:
+            if not _is_loopback(address[0]):
+                raise RuntimeError("An explicit authkey is required to listen on %s" % address[0])
+
+            authkey = secrets.token_hex(16).encode("utf-8")
+            logger.info("Generated authkey for workers: OCTRAS_AUTHKEY=%s" % authkey.decode("utf-8"))
+
+        self.authkey = authkey
+
+        self.server = connection.Listener(address, authkey = authkey)
+        self.address = self.server.address
+        logger.info("Waiting for workers on %s:%d" % self.address)
+
+        self.lock = threading.Lock()
+        self.workers = {}
+        self.worker_count = 0
+
+        self.simulations = {}
+        self.queue = collections.deque()
+
+        self.thread = threading.Thread(target = self._accept, daemon = True)
+        self.thread.start()
+
+    def _accept(self):
+        while True:
+            server = self.server
+
+            if server is None:
+                return
+
+            try:
+                worker_connection = server.accept()
+                message = worker_connection.recv()
+            except (OSError, EOFError, connection.AuthenticationError) as e:
+                if self.server is None:
+                    return
+
+                logger.warning("Could not accept worker: %s" % e)
+                continue
+
+            if message[0] != "hello" or message[2] != self.evaluates:
+                logger.warning("Rejecting worker which does not match the simulator (evaluate = %s)" % self.evaluates)
+                worker_connection.close()
+                continue
+
+            with self.lock:
+                self.worker_count += 1
+                worker = "worker%d" % self.worker_count
+
+                self.workers[worker] = dict(
+                    connection = worker_connection, slots = message[1],
+                    running = set(), processed = 0, name = message[3]
+                )
+
+                logger.info("Worker %s connected from %s with %d slots" % (worker, message[3], message[1]))
+                self._dispatch()
+
+            threading.Thread(target = self._receive, args = (worker,), daemon = True).start()
+
+    def _receive(self, worker):
+        worker_connection = self.workers[worker]["connection"]
+
+        while True:
+            try:
+                message = worker_connection.recv()
+            except (OSError, EOFError):
+                break
+
+            if message[0] == "event":
+                self.report(message[1], message[2], **message[3])
+                continue
+
+            with self.lock:
+                identifier = message[1]
+                self.workers[worker]["running"].discard(identifier)
+                self.workers[worker]["processed"] += 1
+
+                if identifier in self.simulations:
+                    simulation = self.simulations[identifier]
+
+                    if message[0] == "done":
+                        simulation["status"] = "done"
+                        simulation["result"] = message[2]
+                    else:
+                        simulation["status"] = "error"
+                        simulation["error"] = message[2]
+
+                self._dispatch()
+
+            self.notify(identifier)
+
+        with self.lock:
+            if worker in self.workers:
+                lost = self.workers.pop(worker)["running"]
+
+                logger.warning("Worker %s disconnected, %d simulations are dispatched again" % (worker, len(lost)))
+
+                for identifier in lost:
+                    if identifier in self.simulations:
+                        self.simulations[identifier]["status"] = "queued"
+                        self.queue.appendleft(identifier)
+
+                self._dispatch()
+
+    def _dispatch(self):
+        # Must be called while holding the lock
+        while len(self.queue) > 0 and len(self.workers) > 0:
+            worker = max(self.workers, key = lambda worker: self.workers[worker]["slots"] - len(self.workers[worker]["running"]))
+            information = self.workers[worker]
+
+            if information["slots"] - len(information["running"]) <= 0:
+                break
+
+            identifier = self.queue.popleft()
+            simulation = self.simulations[identifier]
+
+            try:
+                information["connection"].send(("run", identifier, simulation["parameters"], simulation["x"]))
+            except (OSError, ValueError):
+                # The receiving thread of the worker takes care of the disconnect
+                self.queue.appendleft(identifier)
+                information["slots"] = 0
+                continue
+
+            information["running"].add(identifier)
+            simulation["status"] = "running"
+            simulation["worker"] = worker
+
+    def run(self, identifier, parameters, x = None):
+        with self.lock:
+            if identifier in self.simulations:
+                raise RuntimeError("A simulation with identifier %s already exists." % identifier)
+
+            self.simulations[identifier] = dict(parameters = parameters, x = x, status = "queued")
+            self.queue.append(identifier)
+            self._dispatch()
+
+    def ready(self, identifier):
+        with self.lock:
+            simulation = self.simulations[identifier]
+
+            if simulation["status"] == "error":
+                del self.simulations[identifier]
+                raise RuntimeError("Error running simulation %s on %s:\n%s" % (identifier, simulation["worker"], simulation["error"]))
+
+            return simulation["status"] == "done"
+
+    def get(self, identifier):
+        if not self.ready(identifier):
+            raise RuntimeError("Simulation %s is not ready to obtain result." % identifier)
+
+        return self.simulations[identifier]["result"]
+
+    def clean(self, identifier):
+        with self.lock:
+            del self.simulations[identifier]
+
+    def cancel(self, identifier):
+        with self.lock:
+            simulation = self.simulations.pop(identifier)
+
+            if simulation["status"] == "queued":
+                self.queue.remove(identifier)
+
+            elif simulation["status"] == "running" and simulation["worker"] in self.workers:
+                information = self.workers[simulation["worker"]]
+                information["running"].discard(identifier)
+
+                try:
+                    information["connection"].send(("cancel", identifier))
+                except (OSError, ValueError):
+                    pass
+
+                self._dispatch()
+
+    def wait_for_workers(self, count = 1, timeout = None):
+        """
+            Blocks until at least `count` workers are connected. Returns whether
+            this was the case before the timeout.
+        """
+        start_time = time.time()
+
+        while timeout is None or time.time() - start_time < timeout:
+            if len(self.workers) >= count:
+                return True
+
+            time.sleep(0.01)
+
+        return False
+
+    def shutdown(self):
+        with self.lock:
+            for information in self.workers.values():
+                try:
+                    information["connection"].send(("stop",))
+                except (OSError, ValueError):
+                    pass
+
+            server, self.server = self.server, None
+            server.close()
+
+class Worker:
+    """
+        Connects to a `RemoteSimulator` and runs the simulations it receives with a
+        local simulator. If a problem is given, its `evaluate` method is applied on
+        this host and only the response is sent back. The simulator may run up to
+        `slots` simulations at once. The worker stops when the simulator shuts down
+        or the connection is lost.
+    """
+
+    def __init__(self, simulator, problem = None, slots = 1, interval = 0.1):
+        self.simulator = simulator
+        self.problem = problem
+        self.slots = slots
+        self.interval = interval
+
+        self.connection = None
+        self.running = {}
+
+        # Progress of the simulations is forwarded to the dispatcher
+        simulator.observe(self._observe)
+
+    def _observe(self, identifier, event, details):
+        if not self.connection is None:
+            self.connection.send(("event", identifier, event, details))
+
+    def connect(self, address, authkey):
+        self.connection = connection.Client(tuple(address), authkey = authkey)
+        self.connection.send(("hello", self.slots, not self.problem is None, os.uname().nodename))
+
+    def _finish(self, identifier):
+        x = self.running.pop(identifier)
+
+        try:
+            result = self.simulator.get(identifier)
+
+            if not self.problem is None:
+                result = self.problem.evaluate(x, result)
+
+            self.simulator.clean(identifier)
+            self.connection.send(("done", identifier, result))
+
+        except Exception:
+            logger.error("Error processing simulation %s" % identifier)
+            self.connection.send(("error", identifier, traceback.format_exc()))
+
+    def serve(self):
+        if self.connection is None:
+            raise RuntimeError("The worker is not connected.")
+
+        try:
+            while True:
+                for identifier in list(self.running):
+                    try:
+                        ready = self.simulator.ready(identifier)
+                    except Exception:
+                        del self.running[identifier]
+                        self.connection.send(("error", identifier, traceback.format_exc()))
+                        continue
+
+                    if ready:
+                        self._finish(identifier)
+
+                if not self.connection.poll(self.interval if len(self.running) > 0 else None):
+                    continue
+
+                message = self.connection.recv()
+
+                if message[0] == "stop":
+                    break
+
+                if message[0] == "cancel":
+                    if message[1] in self.running:
+                        del self.running[message[1]]
+                        self.simulator.cancel(message[1])
+
+                    continue
+
+                identifier, parameters, x = message[1:]
+
+                try:
+                    self.simulator.run(identifier, parameters)
+                    self.running[identifier] = x
+                except Exception:
+                    self.connection.send(("error", identifier, traceback.format_exc()))
+
+        except (EOFError, OSError):
+            logger.warning("Lost connection to the dispatcher")
+
+        finally:
+            self.connection.close()
+            self.connection = None
+
+def _is_loopback(host):
+    if host in ("", "0.0.0.0", "::"):
+        return False
+
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        pass
+
+    try:
+        return all([
+            ipaddress.ip_address(information[4][0]).is_loopback
+            for information in socket.getaddrinfo(host, None)
+        ])
+    except (socket.gaierror, ValueError):
+        return False
+
+def _load(specification):
+    module, attribute = specification.split(":")
+    return getattr(importlib.import_module(module), attribute)()
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Runs simulations for a remote octras evaluator.")
+    parser.add_argument("address", help = "Address of the dispatcher as host:port")
+    parser.add_argument("--simulator", required = True, help = "Factory of the simulator as module:callable")
+    parser.add_argument("--problem", default = None, help = "Factory of the problem as module:callable to evaluate on this host")
+    parser.add_argument("--slots", type = int, default = 1)
+    parser.add_argument("--interval", type = float, default = 0.1)
+    arguments = parser.parse_args(arguments)
+
+    host, port = arguments.address.rsplit(":", 1)
+
+    if not "OCTRAS_AUTHKEY" in os.environ:
+        parser.error("The authkey of the dispatcher must be given in OCTRAS_AUTHKEY")
+
+    authkey = os.environ["OCTRAS_AUTHKEY"].encode("utf-8")
+
+    simulator = _load(arguments.simulator)
+    problem = None if arguments.problem is None else _load(arguments.problem)
+
+    worker = Worker(simulator, problem, slots = arguments.slots, interval = arguments.interval)
+    worker.connect((host, int(port)), authkey)
+    worker.serve()
+
+if __name__ == "__main__":
+    logging.basicConfig(level = logging.INFO)
+    main()
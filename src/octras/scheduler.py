@@ -0,0 +1,177 @@
+import time, heapq, collections, logging
+
+logger = logging.getLogger("octras")
+
+class Scheduler:
+    """
+        A scheduler holds the pending simulations of an evaluator and decides in
+        which order they are started. The evaluator calls `started` and `finished`
+        so that schedulers can learn from past runs.
+    """
+
+    def push(self, simulation):
+        raise NotImplementedError()
+
+    def pop(self):
+        raise NotImplementedError()
+
+    def __len__(self):
+        raise NotImplementedError()
+
+    def __iter__(self):
+        raise NotImplementedError()
+
+    def remove(self, identifier):
+        raise NotImplementedError()
+
+    def started(self, simulation):
+        pass
+
+    def finished(self, simulation):
+        pass
+
+    def cancelled(self, simulation):
+        pass
+
+class FIFOScheduler(Scheduler):
+    """
+        Starts simulations in the order of submission.
+    """
+
+    def __init__(self):
+        self.queue = collections.deque()
+
+    def push(self, simulation):
+        self.queue.append(simulation["identifier"])
+
+    def pop(self):
+        return self.queue.popleft()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __iter__(self):
+        return iter(self.queue)
+
+    def remove(self, identifier):
+        self.queue.remove(identifier)
+
+class RuntimeModel:
+    """
+        Learns the runtime of a simulation as an affine function of its cost
+        by least squares. As long as there is not enough data, the runtime is
+        estimated proportionally to the cost.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.sum_cost = 0.0
+        self.sum_runtime = 0.0
+        self.sum_cost_cost = 0.0
+        self.sum_cost_runtime = 0.0
+
+        # Increased with every observation so that users can update their estimates
+        self.version = 0
+
+    def update(self, cost, runtime):
+        self.count += 1
+        self.sum_cost += cost
+        self.sum_runtime += runtime
+        self.sum_cost_cost += cost**2
+        self.sum_cost_runtime += cost * runtime
+        self.version += 1
+
+    def estimate(self, cost):
+        if self.count == 0 or self.sum_cost == 0.0:
+            return cost
+
+        denominator = self.count * self.sum_cost_cost - self.sum_cost**2
+
+        if self.count < 2 or denominator <= 1e-12 * self.count * self.sum_cost_cost:
+            return cost * self.sum_runtime / self.sum_cost
+
+        slope = (self.count * self.sum_cost_runtime - self.sum_cost * self.sum_runtime) / denominator
+        offset = (self.sum_runtime - slope * self.sum_cost) / self.count
+
+        return max(0.0, offset + slope * cost)
+
+class PriorityScheduler(Scheduler):
+    """
+        Starts simulations by their `priority` annotation (higher first) and then
+        by their estimated runtime. With `order = "longest"` the longest simulations
+        are started first, which shortens the makespan of a batch of simulations that
+        is waited for as a whole. With `order = "shortest"` cheap simulations, for
+        instance low-fidelity runs, are started first. The runtime is estimated from
+        the cost returned by `Problem.parameterize` using a model which is learned
+        from the finished simulations.
+    """
+
+    def __init__(self, order = "longest", model = None):
+        if not order in ("longest", "shortest"):
+            raise RuntimeError("Unknown scheduling order: %s" % order)
+
+        self.order = order
+        self.model = RuntimeModel() if model is None else model
+
+        self.heap = []
+        self.simulations = {}
+        self.sequence = 0
+        self.version = self.model.version
+
+        self.start_times = {}
+
+    def _key(self, simulation, sequence):
+        priority = simulation["annotations"].get("priority", 0)
+        runtime = self.model.estimate(simulation["cost"])
+
+        if self.order == "longest":
+            runtime = -runtime
+
+        return (-priority, runtime, sequence)
+
+    def push(self, simulation):
+        self.sequence += 1
+        self.simulations[simulation["identifier"]] = (simulation, self.sequence)
+        heapq.heappush(self.heap, self._key(simulation, self.sequence) + (simulation["identifier"],))
+
+    def pop(self):
+        if self.version != self.model.version:
+            # The runtime model has changed, so the pending simulations are reordered
+            self.version = self.model.version
+
+            self.heap = [
+                self._key(simulation, sequence) + (identifier,)
+                for identifier, (simulation, sequence) in self.simulations.items()
+            ]
+
+            heapq.heapify(self.heap)
+
+        identifier = heapq.heappop(self.heap)[-1]
+        del self.simulations[identifier]
+
+        return identifier
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __iter__(self):
+        return iter([item[-1] for item in sorted(self.heap)])
+
+    def remove(self, identifier):
+        del self.simulations[identifier]
+
+        self.heap = [item for item in self.heap if item[-1] != identifier]
+        heapq.heapify(self.heap)
+
+    def started(self, simulation):
+        self.start_times[simulation["identifier"]] = time.time()
+
+    def finished(self, simulation):
+        start_time = self.start_times.pop(simulation["identifier"], None)
+
+        if not start_time is None:
+            self.model.update(simulation["cost"], time.time() - start_time)
+
+    def cancelled(self, simulation):
+        # The runtime of an aborted simulation tells nothing about its cost
+        self.start_times.pop(simulation["identifier"], None)
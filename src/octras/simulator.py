@@ -1,8 +1,32 @@
 class Simulator:
+    """
+        This is the basic interface for a simulator in octras. A simulator starts
+        runs in `run` and is asked repeatedly through `ready` whether a run has
+        finished.
+
+        Simulators that are able to detect the completion of a run by themselves
+        (for instance, because a process exits) should set `pushes_events` and
+        call `notify` with the identifier of the run once it may have changed its
+        status. The evaluator then only calls `ready` for these runs and blocks in
+        between instead of polling. If `heartbeat` is set, all running simulations
+        are checked at least every `heartbeat` seconds nevertheless.
+
+        Simulators that apply `Problem.evaluate` themselves, for instance on a
+        remote host, should set `evaluates`. They then receive the numeric
+        parameters as a third argument of `run` and `get` returns the response of
+        the objective function instead of the simulation output.
+    """
+
+    pushes_events = False
+    evaluates = False
+    heartbeat = None
+    listener = None
+    observer = None
+
     def run(self, identifier, parameters):
         raise NotImplementedError()
 
-    def ready(self, identifier, parameters):
+    def ready(self, identifier):
         raise NotImplementedError()
 
     def get(self, identifier):
@@ -10,3 +34,45 @@ class Simulator:
 
     def clean(self, identifier):
         raise NotImplementedError()
+
+    def cancel(self, identifier):
+        """
+            Stops a running simulation and releases all its resources. The identifier
+            is not used afterwards. By default, the simulation is only cleaned, which
+            is sufficient for simulators that run synchronously.
+        """
+        self.clean(identifier)
+
+    def restore(self, identifier, parameters):
+        """
+            Is called when an evaluator is restored from a checkpoint for every
+            simulation that was running or finished. If the simulator can reattach to
+            the finished output of the simulation, it should return True and report the
+            simulation as ready. Otherwise, the simulation is run again.
+        """
+        return False
+
+    def attach(self, listener):
+        """
+            Registers a callable which receives the identifiers passed to `notify`.
+        """
+        self.listener = listener
+
+    def notify(self, identifier):
+        if not self.listener is None:
+            self.listener(identifier)
+
+    def observe(self, observer):
+        """
+            Registers a callable which receives the progress events passed to
+            `report` as (identifier, event, details).
+        """
+        self.observer = observer
+
+    def report(self, identifier, event, **details):
+        """
+            Reports progress of a running simulation, for instance a finished
+            iteration, which is recorded with a timestamp in the simulation record.
+        """
+        if not self.observer is None:
+            self.observer(identifier, event, details)
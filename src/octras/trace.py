@@ -0,0 +1,65 @@
+import collections, logging
+
+logger = logging.getLogger("octras")
+
+# Number of simulations which are buffered by default until the oldest ones
+# are dropped. Each item is a small record without the simulator response.
+DEFAULT_CAPACITY = 10000
+
+class Trace:
+    """
+        Buffers the finished simulations until they are fetched from the evaluator.
+        By default, at most `DEFAULT_CAPACITY` simulations are buffered, which
+        bounds the memory of long runs in which the trace is never fetched. With a
+        capacity of None, the buffer grows without limit. Otherwise, the policy
+        decides what happens once it is full: with "drop" the oldest simulations are
+        discarded as in a ring buffer, with "raise" an error is raised so that the
+        consumer is forced to keep up with the evaluator. The evaluator raises the
+        error already when a simulation is submitted which could not be buffered
+        once all unfinished simulations have finished, so no result is lost.
+    """
+
+    def __init__(self, capacity = DEFAULT_CAPACITY, policy = "drop"):
+        if not policy in ("drop", "raise"):
+            raise RuntimeError("Unknown trace policy: %s" % policy)
+
+        self.capacity = capacity
+        self.policy = policy
+        self.items = collections.deque()
+        self.dropped = 0
+
+    def _raise(self):
+        raise RuntimeError("Trace capacity of %d simulations is exceeded. Fetch the trace more often." % self.capacity)
+
+    def rejects(self):
+        """
+            Returns whether simulations may be rejected because the trace is full.
+        """
+        return not self.capacity is None and self.policy == "raise"
+
+    def reserve(self, count):
+        """
+            Raises with the "raise" policy if `count` further simulations do not fit
+            into the trace.
+        """
+        if self.rejects() and len(self.items) + count > self.capacity:
+            self._raise()
+
+    def append(self, item):
+        if not self.capacity is None and len(self.items) >= self.capacity:
+            if self.policy == "raise":
+                self._raise()
+
+            if self.dropped == 0:
+                logger.warning("Trace capacity of %d simulations is exceeded. Dropping the oldest simulations." % self.capacity)
+
+            self.items.popleft()
+            self.dropped += 1
+
+        self.items.append(item)
+
+    def popleft(self):
+        return self.items.popleft()
+
+    def __len__(self):
+        return len(self.items)
@@ -1,9 +1,16 @@
 import logging
 import pickle
+import os, struct, time, zlib, json
 
 logger = logging.getLogger("octras")
 
 class PickleTracker:
+    """
+        Writes the whole history of simulations into one pickle file after every
+        simulation. As this becomes slow for long runs, StreamTracker should be
+        preferred.
+    """
+
     def __init__(self, output_path):
         self.output_path = output_path
         self.history = []
@@ -34,3 +41,286 @@ class LogTracker:
                 logger.info("Found new best objective (%f) at %s" % (
                     self.best_objective, str(simulation["x"])
                 ))
+
+# Every frame of a stream consists of the length and the CRC32 checksum of the
+# pickled record, followed by the record itself
+STREAM_MAGIC = b"OCTRAS-STREAM-1\n"
+FRAME_HEADER = struct.Struct("<QI")
+
+def _read_frames(f, offset):
+    """
+        Reads all complete frames from the given offset and returns the records and
+        the offset after the last valid frame. A partially written or corrupted frame
+        ends the stream.
+    """
+    records = []
+
+    if offset == 0:
+        if f.read(len(STREAM_MAGIC)) != STREAM_MAGIC:
+            return records, 0
+
+        offset = len(STREAM_MAGIC)
+
+    f.seek(offset)
+
+    while True:
+        header = f.read(FRAME_HEADER.size)
+
+        if len(header) < FRAME_HEADER.size:
+            break
+
+        length, checksum = FRAME_HEADER.unpack(header)
+        payload = f.read(length)
+
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+
+        records.append(pickle.loads(payload))
+        offset += FRAME_HEADER.size + length
+
+    return records, offset
+
+class StreamTracker:
+    """
+        Appends every finished simulation as one frame to a binary log, so that
+        the cost of tracking does not grow with the length of the run. Numpy arrays
+        are stored natively through pickle. The file is flushed after every frame,
+        so a StreamReader can follow a live run, and synchronized to disk at most
+        every `sync_interval` seconds (every frame with 0, never with None). If the
+        file exists, new frames are appended after the last complete one, so a
+        frame which was only partially written in a crash is discarded.
+    """
+
+    def __init__(self, output_path, sync_interval = 1.0):
+        self.output_path = output_path
+        self.sync_interval = sync_interval
+        self.best_objective = None
+
+        offset = 0
+
+        if os.path.exists(output_path):
+            with open(output_path, "rb") as f:
+                records, offset = _read_frames(f, 0)
+
+            if offset == 0 and os.path.getsize(output_path) >= len(STREAM_MAGIC):
+                raise RuntimeError("Existing file is not a simulation stream: %s" % output_path)
+
+            logger.info("Appending to %d tracked simulations in %s" % (len(records), output_path))
+
+        if offset == 0:
+            with open(output_path, "wb") as f:
+                f.write(STREAM_MAGIC)
+
+            offset = len(STREAM_MAGIC)
+
+        self.file = open(output_path, "r+b")
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+        self.last_sync = time.time()
+
+    def notify(self, simulation):
+        if self.best_objective is None or simulation["objective"] < self.best_objective:
+            self.best_objective = simulation["objective"]
+            logger.info("New best objective: %f" % self.best_objective)
+
+        if hasattr(simulation, "to_dict"):
+            simulation = simulation.to_dict()
+
+        payload = pickle.dumps(simulation, protocol = pickle.HIGHEST_PROTOCOL)
+
+        self.file.write(FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.file.flush()
+
+        if not self.sync_interval is None and time.time() - self.last_sync >= self.sync_interval:
+            os.fsync(self.file.fileno())
+            self.last_sync = time.time()
+
+    def close(self):
+        if not self.file is None:
+            if not self.sync_interval is None:
+                os.fsync(self.file.fileno())
+
+            self.file.close()
+            self.file = None
+
+class StreamReader:
+    """
+        Reads the simulations written by a StreamTracker. Every call to `read`
+        returns the simulations which have been appended since the previous call,
+        so the reader can tail a running optimization.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, "rb") as f:
+            records, self.offset = _read_frames(f, self.offset)
+
+        return records
+
+    def follow(self, interval = 1.0):
+        """
+            Yields the simulations of a live run as they are appended.
+        """
+        while True:
+            for record in self.read():
+                yield record
+
+            time.sleep(interval)
+
+class ChromeTraceTracker:
+    """
+        Collects the timings of the finished simulations and exports them as a
+        Chrome trace (Trace Event Format), which can be opened in Perfetto or
+        chrome://tracing. Every slot of the evaluator is shown as one thread with
+        the simulations which ran in it and their progress events. Waiting in the
+        queue and the evaluation of the objective are shown as asynchronous spans.
+        The trace is written by `write`, for instance after the loop has finished.
+    """
+
+    def __init__(self, output_path = None):
+        self.output_path = output_path
+        self.simulations = []
+
+    def notify(self, simulation):
+        if simulation.get("timings") is None:
+            return
+
+        self.simulations.append(dict(
+            identifier = simulation["identifier"], slot = simulation["slot"],
+            timings = dict(simulation["timings"]), events = list(simulation["events"] or []),
+            objective = simulation["objective"], cached = simulation.get("cached"),
+            type = (simulation.get("annotations") or {}).get("type")
+        ))
+
+    def summary(self):
+        """
+            Returns the utilization of the slots, i.e. the fraction of the time
+            between the first start and the last end of a simulation in which the
+            slots were running simulations, along with the mean times spent in the
+            queue, the simulator and the evaluation.
+        """
+        simulated = [
+            simulation for simulation in self.simulations
+            if "started" in simulation["timings"] and "simulated" in simulation["timings"]
+        ]
+
+        if len(simulated) == 0:
+            return dict(simulations = 0, slots = 0, span = 0.0, utilization = 0.0)
+
+        start = min(simulation["timings"]["started"] for simulation in simulated)
+        end = max(simulation["timings"]["simulated"] for simulation in simulated)
+        slots = max(simulation["slot"] for simulation in simulated) + 1
+
+        busy = [0.0] * slots
+        queued, running, evaluating = [], [], []
+
+        for simulation in simulated:
+            timings = simulation["timings"]
+
+            busy[simulation["slot"]] += timings["simulated"] - timings["started"]
+            queued.append(timings["started"] - timings["submitted"])
+            running.append(timings["simulated"] - timings["started"])
+
+            if "evaluated" in timings:
+                evaluating.append(timings["evaluated"] - timings["evaluation_started"])
+
+        span = end - start
+
+        return dict(
+            simulations = len(simulated), slots = slots, span = span,
+            utilization = sum(busy) / (slots * span) if span > 0.0 else 1.0,
+            slot_utilization = [value / span if span > 0.0 else 1.0 for value in busy],
+            mean_queue_time = sum(queued) / len(queued),
+            mean_simulation_time = sum(running) / len(running),
+            mean_evaluation_time = sum(evaluating) / len(evaluating) if len(evaluating) > 0 else 0.0
+        )
+
+    def events(self):
+        def microseconds(timestamp):
+            return (timestamp - origin) * 1e6
+
+        if len(self.simulations) == 0:
+            return []
+
+        origin = min(simulation["timings"]["submitted"] for simulation in self.simulations)
+
+        events = [
+            dict(name = "process_name", ph = "M", pid = 1, args = dict(name = "Slots")),
+            dict(name = "process_name", ph = "M", pid = 2, args = dict(name = "Evaluator"))
+        ]
+
+        for slot in sorted(set(simulation["slot"] for simulation in self.simulations if not simulation["slot"] is None)):
+            events.append(dict(name = "thread_name", ph = "M", pid = 1, tid = slot, args = dict(name = "Slot %d" % slot)))
+
+        for simulation in self.simulations:
+            timings = simulation["timings"]
+            identifier = simulation["identifier"]
+
+            args = dict(identifier = identifier, objective = simulation["objective"], type = simulation["type"])
+
+            if "started" in timings:
+                events.append(dict(
+                    name = "queued", cat = "queue", ph = "b", pid = 2, tid = 0, id = identifier,
+                    ts = microseconds(timings["submitted"])
+                ))
+
+                events.append(dict(
+                    name = "queued", cat = "queue", ph = "e", pid = 2, tid = 0, id = identifier,
+                    ts = microseconds(timings["started"])
+                ))
+
+            if "started" in timings and "simulated" in timings:
+                events.append(dict(
+                    name = identifier, cat = "simulation", ph = "X", pid = 1, tid = simulation["slot"],
+                    ts = microseconds(timings["started"]),
+                    dur = microseconds(timings["simulated"]) - microseconds(timings["started"]),
+                    args = args
+                ))
+
+                for timestamp, event, details in simulation["events"]:
+                    events.append(dict(
+                        name = event, cat = "progress", ph = "i", s = "t", pid = 1, tid = simulation["slot"],
+                        ts = microseconds(timestamp), args = dict(details, identifier = identifier)
+                    ))
+
+            if "evaluation_started" in timings and "evaluated" in timings:
+                events.append(dict(
+                    name = "evaluate", cat = "evaluation", ph = "b", pid = 2, tid = 0, id = identifier,
+                    ts = microseconds(timings["evaluation_started"]), args = args
+                ))
+
+                events.append(dict(
+                    name = "evaluate", cat = "evaluation", ph = "e", pid = 2, tid = 0, id = identifier,
+                    ts = microseconds(timings["evaluated"])
+                ))
+
+            if simulation["cached"]:
+                events.append(dict(
+                    name = "cached", cat = "cache", ph = "i", s = "p", pid = 2, tid = 0,
+                    ts = microseconds(timings["finished"]), args = args
+                ))
+
+        return events
+
+    def write(self, output_path = None):
+        output_path = self.output_path if output_path is None else output_path
+        summary = self.summary()
+
+        logger.info("Slot utilization: %.1f%% of %d slots over %.1fs" % (
+            100.0 * summary["utilization"], summary["slots"], summary["span"]
+        ))
+
+        with open(output_path, "w+") as f:
+            json.dump(dict(
+                traceEvents = self.events(), displayTimeUnit = "ms",
+                otherData = summary
+            ), f, default = float)
+
+        return summary
@@ -1,5 +1,6 @@
 from ..cases.quadratic import QuadraticSimulator, QuadraticProblem
 from ..cases.traffic import TrafficSimulator, TrafficProblem
+from ..cases.delayed import DelayedQuadraticSimulator
 
 from octras.algorithms import CMAES
 from octras import Loop, Evaluator
@@ -43,3 +44,117 @@ def test_cmaes_traffic():
             evaluator = evaluator,
             algorithm = algorithm
         ) == pytest.approx((510.0, 412.0), 1.0)
+
+def test_cmaes_steady_state():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+
+    evaluator = Evaluator(
+        simulator = DelayedQuadraticSimulator(delay = 0.001),
+        problem = problem, parallel = 4
+    )
+
+    for seed in (1000, 2000):
+        algorithm = CMAES(problem,
+            initial_step_size = 0.1,
+            seed = seed
+        )
+
+        assert Loop(threshold = 1e-4).run(
+            evaluator = evaluator,
+            algorithm = algorithm,
+            steady_state = True
+        ) == pytest.approx((2.0, 1.0), 1e-2)
+
+@pytest.mark.parametrize("variant", ["full", "separable", "limited_memory"])
+def test_cmaes_variants(variant):
+    u = [float(k % 5) for k in range(20)]
+    problem = QuadraticProblem(u, [0.0] * 20)
+
+    evaluator = Evaluator(
+        simulator = QuadraticSimulator(),
+        problem = problem
+    )
+
+    algorithm = CMAES(problem,
+        initial_step_size = 1.0,
+        seed = 1000,
+        variant = variant
+    )
+
+    assert Loop(threshold = 1e-4, maximum_evaluations = 50000).run(
+        evaluator = evaluator,
+        algorithm = algorithm
+    ) == pytest.approx(u, abs = 1e-2)
+
+@pytest.mark.parametrize("restarts", ["ipop", "bipop"])
+def test_cmaes_restarts(restarts):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+
+    evaluator = Evaluator(
+        simulator = QuadraticSimulator(),
+        problem = problem
+    )
+
+    algorithm = CMAES(problem,
+        initial_step_size = 0.1, seed = 1000,
+        minimum_step_size = 1e-6, restarts = restarts, maximum_restarts = 3
+    )
+
+    # Every restart converges again until all restarts are used up
+    assert Loop(threshold = -1.0, maximum_evaluations = 100000).run(
+        evaluator = evaluator,
+        algorithm = algorithm
+    ) == pytest.approx((2.0, 1.0), 1e-3)
+
+    assert algorithm.converged()
+    assert evaluator.current_evaluations < 100000
+
+    if restarts == "ipop":
+        assert algorithm.L == algorithm.initial_L * 8
+    else:
+        assert algorithm.budgets["small"] > 0
+
+def test_cmaes_surrogate():
+    problem = QuadraticProblem([2.0, 1.0, 0.0, 1.0, 2.0], [0.0] * 5)
+    evaluations = {}
+
+    for surrogate in (False, True):
+        evaluator = Evaluator(
+            simulator = QuadraticSimulator(),
+            problem = problem
+        )
+
+        algorithm = CMAES(problem,
+            initial_step_size = 0.5,
+            seed = 1000,
+            surrogate = surrogate
+        )
+
+        assert Loop(threshold = 1e-6).run(
+            evaluator = evaluator,
+            algorithm = algorithm
+        ) == pytest.approx((2.0, 1.0, 0.0, 1.0, 2.0), abs = 1e-2)
+
+        evaluations[surrogate] = evaluator.current_evaluations
+
+    assert algorithm.model[0] == "full"
+    assert evaluations[True] < 0.5 * evaluations[False]
+
+def test_cmaes_surrogate_traffic():
+    problem = TrafficProblem()
+
+    evaluator = Evaluator(
+        simulator = TrafficSimulator(),
+        problem = problem
+    )
+
+    algorithm = CMAES(problem,
+        initial_step_size = 10.0,
+        seed = 1000,
+        surrogate = True
+    )
+
+    assert Loop(threshold = 1e-2).run(
+        evaluator = evaluator,
+        algorithm = algorithm
+    ) == pytest.approx((510.0, 412.0), 1.0)
@@ -36,3 +36,22 @@ def test_nelder_mead_traffic():
         evaluator = evaluator,
         algorithm = algorithm
     ) == pytest.approx((510.0, 412.0), 1.0)
+
+def test_nelder_mead_interrupted():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+
+    evaluator = Evaluator(
+        simulator = QuadraticSimulator(),
+        problem = problem
+    )
+
+    algorithm = NelderMead(problem)
+
+    # The loop stops while the initial simplex is evaluated
+    Loop(maximum_evaluations = 1).run(evaluator = evaluator, algorithm = algorithm)
+    assert algorithm.simplex is None and algorithm.values is None
+
+    assert Loop(threshold = 1e-4).run(
+        evaluator = evaluator,
+        algorithm = algorithm
+    ) == pytest.approx((2.0, 1.0), 1e-2)
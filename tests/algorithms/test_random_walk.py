@@ -1,5 +1,6 @@
 from ..cases.quadratic import QuadraticSimulator, QuadraticProblem
 from ..cases.traffic import TrafficSimulator, TrafficProblem
+from ..cases.delayed import DelayedQuadraticSimulator
 
 from octras.algorithms import RandomWalk
 from octras import Loop, Evaluator
@@ -39,3 +40,25 @@ def test_random_walk_traffic():
         evaluator = evaluator,
         algorithm = algorithm
     ) == pytest.approx((510.0, 412.0), 10.0)
+
+def test_random_walk_steady_state():
+    problem = QuadraticProblem([2.0, 1.0])
+    simulator = DelayedQuadraticSimulator(delay = 0.001)
+
+    evaluator = Evaluator(
+        simulator = simulator,
+        problem = problem, parallel = 4
+    )
+
+    algorithm = RandomWalk(problem,
+        seed = 1000
+    )
+
+    assert Loop(maximum_evaluations = 40).run(
+        evaluator = evaluator,
+        algorithm = algorithm,
+        steady_state = True
+    ) is not None
+
+    # The remaining candidates are cancelled once the limit is reached
+    assert len(evaluator.simulations) == 0
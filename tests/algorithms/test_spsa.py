@@ -1,10 +1,20 @@
 from ..cases.quadratic import QuadraticSimulator, QuadraticProblem
 from ..cases.traffic import TrafficSimulator, TrafficProblem
+from ..cases.delayed import DelayedQuadraticSimulator
 
 from octras.algorithms import SPSA
 from octras import Loop, Evaluator
 
 import pytest
+import numpy as np
+
+class ScaledQuadraticProblem(QuadraticProblem):
+    def __init__(self, u, initial, scales):
+        super().__init__(u, initial)
+        self.scales = np.sqrt(scales)
+
+    def parameterize(self, x):
+        return dict(x = np.asarray(x) * self.scales, u = np.asarray(self.u) * self.scales)
 
 def test_spsa_quadratic():
     problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
@@ -45,3 +55,182 @@ def test_spsa_traffic():
             evaluator = evaluator,
             algorithm = algorithm
         ) == pytest.approx((510.0, 412.0), 1.0)
+
+def test_spsa_steady_state():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+
+    evaluator = Evaluator(
+        simulator = DelayedQuadraticSimulator(delay = 0.001),
+        problem = problem, parallel = 3
+    )
+
+    algorithm = SPSA(problem,
+        perturbation_factor = 2e-2,
+        gradient_factor = 0.2,
+        seed = 1000
+    )
+
+    assert Loop(threshold = 1e-4).run(
+        evaluator = evaluator,
+        algorithm = algorithm,
+        steady_state = True
+    ) == pytest.approx((2.0, 1.0), 1e-2)
+
+@pytest.mark.parametrize("one_sided", [False, True])
+def test_spsa_gradient_samples(one_sided):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+
+    evaluator = Evaluator(
+        simulator = DelayedQuadraticSimulator(delay = 0.001),
+        problem = problem, parallel = 9
+    )
+
+    algorithm = SPSA(problem,
+        perturbation_factor = 2e-2,
+        gradient_factor = 0.2,
+        seed = 1000,
+        gradient_samples = 4,
+        one_sided = one_sided
+    )
+
+    assert Loop(threshold = 1e-4).run(
+        evaluator = evaluator,
+        algorithm = algorithm
+    ) == pytest.approx((2.0, 1.0), 1e-2)
+
+    # One-sided estimates reuse the objective run instead of negative perturbations
+    runs_per_iteration = 5 if one_sided else 9
+    assert evaluator.current_evaluations <= algorithm.iteration * runs_per_iteration
+
+def test_spsa_dropped_runs():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+
+    algorithm = SPSA(problem,
+        perturbation_factor = 2e-2,
+        gradient_factor = 0.2,
+        seed = 1000
+    )
+
+    for k in range(100):
+        candidates = algorithm.ask(4)
+
+        # Every other run is lost, so none of the iterations complete
+        for x, annotations in candidates[::2]:
+            algorithm.tell(x, np.sum((np.asarray(x) - [2.0, 1.0])**2), None, annotations)
+
+    assert len(algorithm.told) <= 4
+
+    algorithm.close()
+    assert len(algorithm.told) == 0
+
+class SlowObjectiveSimulator(DelayedQuadraticSimulator):
+    def __init__(self):
+        super().__init__(delay = 0.001)
+        self.runs = 0
+
+    def run(self, identifier, parameters):
+        # The objective is the first of the three runs of every iteration
+        self.delay = 0.02 if self.runs % 3 == 0 else 0.001
+        self.runs += 1
+
+        super().run(identifier, parameters)
+
+def test_spsa_tracked_objective():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    simulator = SlowObjectiveSimulator()
+
+    evaluator = Evaluator(simulator = simulator, problem = problem, parallel = 3)
+
+    algorithm = SPSA(problem,
+        perturbation_factor = 2e-2,
+        gradient_factor = 0.2,
+        seed = 1000
+    )
+
+    for k in range(5):
+        algorithm.advance(evaluator)
+
+    # The objective runs are finished rather than cancelled
+    assert simulator.runs == 15
+    assert simulator.cancelled == []
+
+def test_spsa_gradient_samples_steady_state():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+
+    evaluator = Evaluator(
+        simulator = DelayedQuadraticSimulator(delay = 0.001),
+        problem = problem, parallel = 5
+    )
+
+    algorithm = SPSA(problem,
+        perturbation_factor = 2e-2,
+        gradient_factor = 0.2,
+        seed = 1000,
+        gradient_samples = 4,
+        one_sided = True
+    )
+
+    assert Loop(threshold = 1e-4).run(
+        evaluator = evaluator,
+        algorithm = algorithm,
+        steady_state = True
+    ) == pytest.approx((2.0, 1.0), 1e-2)
+
+def test_spsa_second_order():
+    evaluations = {}
+
+    for second_order in (False, True):
+        problem = ScaledQuadraticProblem([2.0, 1.0], [0.0, 0.0], [1.0, 100.0])
+
+        evaluator = Evaluator(
+            simulator = DelayedQuadraticSimulator(delay = 0.001),
+            problem = problem, parallel = 16
+        )
+
+        algorithm = SPSA(problem,
+            perturbation_factor = 2e-2,
+            gradient_factor = 1.0 if second_order else 0.01,
+            seed = 3000,
+            gradient_samples = 4,
+            second_order = second_order
+        )
+
+        result = Loop(threshold = 1e-4, maximum_evaluations = 5000).run(
+            evaluator = evaluator,
+            algorithm = algorithm
+        )
+
+        evaluations[second_order] = evaluator.current_evaluations
+
+    # The badly scaled problem is only solved within the budget with the Hessian
+    assert result == pytest.approx((2.0, 1.0), 1e-2)
+    assert evaluations[True] < 5000 < evaluations[False]
+
+    assert algorithm.hessian[1, 1] == pytest.approx(200.0, 1e-2)
+
+def test_spsa_second_order_dimensions():
+    u = [float(k % 3) - 1.0 for k in range(10)]
+    errors = {}
+
+    for second_order in (False, True):
+        problem = ScaledQuadraticProblem(u, [0.0] * 10, np.logspace(0, 2, 10))
+        evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+
+        algorithm = SPSA(problem,
+            perturbation_factor = 2e-2,
+            gradient_factor = 1.0 if second_order else 0.005,
+            seed = 1000,
+            second_order = second_order
+        )
+
+        Loop(maximum_evaluations = 5000).run(
+            evaluator = evaluator,
+            algorithm = algorithm
+        )
+
+        parameters = problem.parameterize(algorithm.parameters)
+        errors[second_order] = np.sum((parameters["x"] - parameters["u"])**2)
+
+    # The singular Hessian of the first iterations does not lead to divergence
+    assert errors[True] < 0.5 < errors[False]
+    assert algorithm.blocked > 0
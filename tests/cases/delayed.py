@@ -0,0 +1,38 @@
+from .generic import GenericTestSimulator
+
+import threading
+
+class DelayedQuadraticSimulator(GenericTestSimulator):
+    pushes_events = True
+
+    def __init__(self, delay = 0.05):
+        super().__init__()
+
+        self.delay = delay
+        self.ready_calls = 0
+
+        self.timers = {}
+        self.cancelled = []
+
+    def run(self, identifier, parameters):
+        value = sum([(x - u)**2 for u, x in zip(parameters["u"], parameters["x"])])
+
+        self.timers[identifier] = threading.Timer(self.delay, self._finish, args = (identifier, value))
+        self.timers[identifier].start()
+
+    def _finish(self, identifier, value):
+        self.results[identifier] = value
+        self.notify(identifier)
+
+    def cancel(self, identifier):
+        self.timers.pop(identifier).cancel()
+        self.results.pop(identifier, None)
+        self.cancelled.append(identifier)
+
+    def clean(self, identifier):
+        del self.timers[identifier]
+        super().clean(identifier)
+
+    def ready(self, identifier):
+        self.ready_calls += 1
+        return identifier in self.results
@@ -0,0 +1,76 @@
+"""
+    Stand-in for a batch scheduler like SLURM, which runs jobs as local processes.
+
+        python fake_scheduler.py STATE_PATH submit SCRIPT   (prints "job;fake")
+        python fake_scheduler.py STATE_PATH status JOB,JOB  (prints "job RUNNING")
+        python fake_scheduler.py STATE_PATH cancel JOB
+
+    The following files in STATE_PATH change the behaviour of the status query:
+
+        completed   Finished jobs are still listed as COMPLETED
+        purged      Queries including finished jobs fail with an invalid job id
+        delayed     The exit code of a job only appears after the next query
+"""
+
+import sys, os, glob, signal
+import subprocess as sp
+
+state_path, command = sys.argv[1], sys.argv[2]
+
+def job_path(job, suffix):
+    return os.path.join(state_path, "%s.%s" % (job, suffix))
+
+if command == "submit":
+    job = len(glob.glob(job_path("*", "pid"))) + 1
+
+    process = sp.Popen(["sh", "-c", "sh \"$0\"; touch \"$1\"", sys.argv[3], job_path(job, "done")],
+        stdout = sp.DEVNULL, stderr = sp.DEVNULL, start_new_session = True)
+
+    with open(job_path(job, "pid"), "w+") as f:
+        f.write(str(process.pid))
+
+    with open(job_path(job, "path"), "w+") as f:
+        f.write(os.path.dirname(sys.argv[3]))
+
+    print("%d;fake" % job)
+
+elif command == "status":
+    with open(os.path.join(state_path, "queries"), "a+") as f:
+        f.write(sys.argv[3] + "\n")
+
+    def flag(name):
+        return os.path.exists(os.path.join(state_path, name))
+
+    jobs = sys.argv[3].split(",")
+    done = [job for job in jobs if os.path.exists(job_path(job, "done"))]
+
+    if flag("purged") and len(done) > 0:
+        sys.stderr.write("slurm_load_jobs error: Invalid job id specified\n")
+        sys.exit(1)
+
+    if flag("delayed"):
+        for job in done:
+            with open(job_path(job, "path")) as f:
+                exit_code_path = os.path.join(f.read(), "exit_code")
+
+            if os.path.exists(job_path(job, "hidden")):
+                os.rename(job_path(job, "hidden"), exit_code_path)
+            elif os.path.exists(exit_code_path) and not os.path.exists(job_path(job, "shown")):
+                os.rename(exit_code_path, job_path(job, "hidden"))
+                open(job_path(job, "shown"), "w+").close()
+
+    for job in jobs:
+        if job in done:
+            if flag("completed"):
+                print("%s COMPLETED" % job)
+
+        elif os.path.exists(job_path(job, "pid")):
+            print("%s RUNNING" % job)
+
+elif command == "cancel":
+    for job in sys.argv[3:]:
+        if not os.path.exists(job_path(job, "done")):
+            with open(job_path(job, "pid")) as f:
+                os.killpg(int(f.read()), signal.SIGTERM)
+
+            open(job_path(job, "done"), "w+").close()
@@ -0,0 +1,133 @@
+import pytest, os, sys, stat
+
+from .cases.quadratic import QuadraticProblem
+
+from octras import Evaluator
+from octras.batch import BatchSimulator
+from octras.matsim import MATSimSimulator
+
+class BatchQuadraticProblem(QuadraticProblem):
+    def evaluate(self, x, response):
+        with open("%s/simulation_output.log" % response) as f:
+            return float(f.read())
+
+def quadratic_command(identifier, parameters):
+    return [sys.executable, "-c", "print(%s)" % repr(float(sum([
+        (x - u)**2 for x, u in zip(parameters["x"], parameters["u"])
+    ])))]
+
+def create_simulator(tmp_path, command = quadratic_command, flags = [], exit_code_timeout = 60.0):
+    scheduler = [sys.executable, os.path.join(os.path.dirname(__file__), "cases", "fake_scheduler.py"), str(tmp_path / "scheduler")]
+    os.mkdir(tmp_path / "scheduler")
+    os.mkdir(tmp_path / "simulations")
+
+    for flag in flags:
+        open(tmp_path / "scheduler" / flag, "w+").close()
+
+    return BatchSimulator(tmp_path / "simulations", command,
+        submit = scheduler + ["submit"], status = scheduler + ["status"], cancel = scheduler + ["cancel"],
+        status_interval = 0.05, exit_code_timeout = exit_code_timeout
+    )
+
+def test_batch_simulator(tmp_path):
+    simulator = create_simulator(tmp_path)
+    evaluator = Evaluator(problem = BatchQuadraticProblem([2.0, 1.0]), simulator = simulator, parallel = 4, interval = 0.01)
+
+    identifiers = evaluator.submit_many([[float(k), 0.0] for k in range(8)])
+    objectives, states = evaluator.get_many(identifiers)
+
+    assert objectives == pytest.approx([(k - 2.0)**2 + 1.0 for k in range(8)])
+
+    # One status query covers all running jobs
+    with open(tmp_path / "scheduler" / "queries") as f:
+        queries = f.read().splitlines()
+
+    assert len(queries[0].split(",")) == 4
+
+    evaluator.clean()
+    assert len(os.listdir(tmp_path / "simulations")) == 0
+
+@pytest.mark.parametrize("flags", [["completed"], ["purged"], ["delayed"]])
+def test_batch_simulator_states(tmp_path, flags):
+    # Finished jobs which are still listed or already purged, and exit codes which appear late
+    simulator = create_simulator(tmp_path, flags = flags)
+    evaluator = Evaluator(problem = BatchQuadraticProblem([2.0, 1.0]), simulator = simulator, parallel = 2, interval = 0.01)
+
+    identifiers = evaluator.submit_many([[float(k), 0.0] for k in range(4)])
+    objectives, states = evaluator.get_many(identifiers)
+
+    assert objectives == pytest.approx([(k - 2.0)**2 + 1.0 for k in range(4)])
+
+def test_batch_simulator_missing_exit_code(tmp_path):
+    simulator = create_simulator(tmp_path, [sys.executable, "-c", "import os; os.kill(os.getppid(), 9)"], exit_code_timeout = 0.2)
+    evaluator = Evaluator(problem = BatchQuadraticProblem([2.0, 1.0]), simulator = simulator, interval = 0.01)
+
+    with pytest.raises(RuntimeError, match = "exit code None"):
+        evaluator.get(evaluator.submit([0.0, 0.0]))
+
+def test_batch_simulator_error(tmp_path):
+    simulator = create_simulator(tmp_path, [sys.executable, "-c", "raise RuntimeError()"])
+    evaluator = Evaluator(problem = BatchQuadraticProblem([2.0, 1.0]), simulator = simulator, interval = 0.01)
+
+    with pytest.raises(RuntimeError):
+        evaluator.get(evaluator.submit([0.0, 0.0]))
+
+def test_batch_simulator_cancel(tmp_path):
+    simulator = create_simulator(tmp_path, [sys.executable, "-c", "import time; time.sleep(60)"])
+    evaluator = Evaluator(problem = BatchQuadraticProblem([2.0, 1.0]), simulator = simulator, interval = 0.01)
+
+    identifier = evaluator.submit([0.0, 0.0])
+    assert not evaluator.ready(identifier)
+
+    evaluator.cancel(identifier)
+
+    assert os.path.exists(tmp_path / "scheduler" / "1.done")
+    assert len(os.listdir(tmp_path / "simulations")) == 0
+
+class MATSimOutputProblem(QuadraticProblem):
+    def __init__(self, u):
+        super().__init__(u)
+        self.responses = []
+
+    def parameterize(self, x):
+        return {}
+
+    def evaluate(self, x, response):
+        self.responses.append(response)
+
+        with open("%s/result" % response) as f:
+            return float(f.read())
+
+def create_matsim(tmp_path):
+    # Stands in for the JVM and writes a result into the requested output directory
+    java = tmp_path / "java"
+
+    with open(java, "w+") as f:
+        f.write("#!/bin/sh\n")
+        f.write("while [ $# -gt 0 ]; do\n")
+        f.write("  if [ \"$1\" = \"--config:controler.outputDirectory\" ]; then mkdir -p \"$2\" && echo 3.0 > \"$2/result\"; fi\n")
+        f.write("  shift\n")
+        f.write("done\n")
+
+    os.chmod(java, os.stat(java).st_mode | stat.S_IEXEC)
+
+    return MATSimSimulator(tmp_path / "simulations", dict(
+        java = str(java), class_path = "", main_class = ""
+    ))
+
+def test_batch_simulator_matsim(tmp_path):
+    simulator = create_simulator(tmp_path)
+    matsim = create_matsim(tmp_path)
+
+    # Submits the MATSim command line through the scheduler
+    simulator.command, simulator.result = matsim.command, matsim.get
+
+    problem = MATSimOutputProblem([0.0])
+
+    # The problem receives the MATSim output path from either backend
+    for backend in (simulator, matsim):
+        evaluator = Evaluator(problem = problem, simulator = backend, interval = 0.01)
+        identifier = evaluator.submit([0.0])
+
+        assert evaluator.get(identifier)[0] == 3.0
+        assert problem.responses[-1] == "%s/%s/output" % (matsim.working_directory, identifier)
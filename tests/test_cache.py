@@ -0,0 +1,73 @@
+import pytest
+
+from .cases.quadratic import QuadraticSimulator, QuadraticProblem
+
+from octras import Evaluator
+from octras.cache import ResultCache
+
+class CountingSimulator(QuadraticSimulator):
+    def __init__(self):
+        super().__init__()
+        self.runs = 0
+
+    def run(self, identifier, parameters):
+        self.runs += 1
+        super().run(identifier, parameters)
+
+def test_cache_in_memory():
+    simulator = CountingSimulator()
+    problem = QuadraticProblem([2.0, 1.0])
+
+    evaluator = Evaluator(problem = problem, simulator = simulator, cache = ResultCache())
+
+    first = evaluator.get(evaluator.submit([1.0, 1.0]))
+    second = evaluator.get(evaluator.submit([1, 1])) # Same point, different type
+
+    assert first == second == (1.0, None)
+    assert simulator.runs == 1
+    assert evaluator.current_evaluations == 2
+    assert evaluator.current_cost == 1
+
+    evaluator.clean()
+
+    # Transient simulations are never served from the cache
+    evaluator.get(evaluator.submit([1.0, 1.0], transient = True))
+    assert simulator.runs == 2
+
+    # Different simulator parameters give a different key
+    evaluator.get(evaluator.submit([1.0, 1.0], { "u": [1.0, 1.0] }))
+    assert simulator.runs == 3
+
+def test_cache_on_disk(tmp_path):
+    problem = QuadraticProblem([2.0, 1.0])
+
+    simulator = CountingSimulator()
+    evaluator = Evaluator(problem = problem, simulator = simulator, cache = ResultCache(tmp_path))
+    evaluator.get([evaluator.submit([float(k), 0.0]) for k in range(4)])
+    assert simulator.runs == 4
+
+    # A new campaign reuses the stored results
+    simulator = CountingSimulator()
+    evaluator = Evaluator(problem = problem, simulator = simulator, cache = ResultCache(tmp_path))
+    results = evaluator.get([evaluator.submit([float(k), 0.0]) for k in range(5)])
+
+    assert simulator.runs == 1
+    assert [result[0] for result in results] == [(k - 2.0)**2 + 1.0 for k in range(5)]
+
+def test_cache_eviction(tmp_path):
+    cache = ResultCache(tmp_path, capacity = 2)
+
+    for k in range(4):
+        cache.put(str(k), dict(objective = float(k), state = None, information = None))
+
+    assert list(cache.memory.keys()) == ["2", "3"]
+    assert cache.get("0")["objective"] == 0.0
+
+    entry_size = cache.files["0"]
+    cache = ResultCache(tmp_path, maximum_size = 2 * entry_size)
+    cache.put("4", dict(objective = 4.0, state = None, information = None))
+
+    assert len(cache.files) == 2
+    assert cache.get("4")["objective"] == 4.0
+    assert cache.get("1") is None
+    assert len(list(tmp_path.glob("*.pickle"))) == 2
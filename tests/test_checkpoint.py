@@ -0,0 +1,51 @@
+import pytest
+
+from .cases.quadratic import QuadraticSimulator, QuadraticProblem
+
+from octras.algorithms import CMAES
+from octras.checkpoint import Checkpoint
+from octras import Loop, Evaluator
+
+def create(seed = 1000):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+    algorithm = CMAES(problem, initial_step_size = 0.1, seed = seed)
+    return evaluator, algorithm
+
+def test_resume_from_checkpoint(tmp_path):
+    evaluator, algorithm = create()
+    reference = Loop(maximum_evaluations = 60).run(evaluator, algorithm)
+
+    checkpoint = Checkpoint(tmp_path / "checkpoint.p")
+
+    evaluator, algorithm = create()
+    Loop(maximum_evaluations = 30).run(evaluator, algorithm, checkpoint = checkpoint)
+    assert checkpoint.exists()
+
+    # Fresh objects (even with a different seed) continue where the first run stopped
+    evaluator, algorithm = create(seed = 0)
+    result = Loop(maximum_evaluations = 60).run(evaluator, algorithm, checkpoint = checkpoint)
+
+    # The last generation is interrupted once the limit is exceeded
+    assert evaluator.current_evaluations == 61
+    assert result == pytest.approx(reference)
+
+def test_restore_pending_simulations():
+    problem = QuadraticProblem([2.0, 1.0])
+
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+    finished = evaluator.submit([2.0, 1.0])
+    evaluator.wait()
+    pending = evaluator.submit([0.0, 0.0])
+
+    state = evaluator.get_state()
+
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+    evaluator.set_state(state)
+
+    assert evaluator.get(pending) == (5.0, None)
+    assert evaluator.get(finished) == (0.0, None)
+    assert evaluator.submit([0.0, 0.0]) not in (pending, finished)
+
+    # The new simulator does not know the finished simulation anymore
+    evaluator.clean()
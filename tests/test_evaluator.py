@@ -1,9 +1,13 @@
-import pytest
+import pytest, asyncio, threading, time
+import numpy as np
 
 from .cases.rosenbrock import RosenbrockSimulator
 from .cases.rosenbrock import RosenbrockProblem
+from .cases.quadratic import QuadraticProblem, QuadraticSimulator
+from .cases.delayed import DelayedQuadraticSimulator
 
-from octras import Evaluator
+from octras import Evaluator, Loop
+from octras.algorithms import RandomWalk
 
 def test_rosenbrock_evaluation():
     simulator = RosenbrockSimulator()
@@ -23,3 +27,253 @@ def test_rosenbrock_evaluation():
 
     identifier2 = evaluator.submit([-1, 1, 2, 1])
     assert evaluator.get(identifier2)[0] != 4.0
+
+def test_event_driven_wait():
+    simulator = DelayedQuadraticSimulator()
+    problem = QuadraticProblem([2.0, 1.0])
+
+    evaluator = Evaluator(problem = problem, simulator = simulator, parallel = 4)
+    identifiers = [evaluator.submit([float(k), 0.0]) for k in range(8)]
+
+    evaluator.wait()
+
+    assert [evaluator.get(identifier)[0] for identifier in identifiers] == [
+        (k - 2.0)**2 + 1.0 for k in range(8)
+    ]
+
+    # Without events, the evaluator would have been polling all the time
+    assert simulator.ready_calls < 3 * len(identifiers)
+
+def test_asynchronous_evaluation():
+    simulator = DelayedQuadraticSimulator()
+    problem = QuadraticProblem([2.0, 1.0])
+
+    evaluator = Evaluator(problem = problem, simulator = simulator, parallel = 2)
+
+    future = evaluator.submit_future([2.0, 1.0])
+    identifiers = [evaluator.submit([float(k), 0.0]) for k in range(4)]
+
+    async def run():
+        completed = []
+
+        async for identifier in evaluator.as_completed(identifiers):
+            completed.append(identifier)
+
+            if len(completed) == 1:
+                # New submissions while others are still running
+                identifiers.append(evaluator.submit([0.0, 0.0]))
+
+        assert sorted(completed) == sorted(identifiers[:4])
+        assert await evaluator.get_async(identifiers[4]) == (5.0, None)
+
+        return await evaluator.gather(identifiers[:4])
+
+    results = asyncio.run(run())
+
+    assert [result[0] for result in results] == [(k - 2.0)**2 + 1.0 for k in range(4)]
+    assert future.result() == (0.0, None)
+
+def test_cancelled_async_wait():
+    simulator = DelayedQuadraticSimulator()
+    problem = QuadraticProblem([2.0, 1.0])
+
+    evaluator = Evaluator(problem = problem, simulator = simulator)
+
+    async def run():
+        task = asyncio.ensure_future(evaluator._block_async())
+        await asyncio.sleep(0.05)
+
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # An event arriving after the cancellation must remain available
+        evaluator.completions.put("abc")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+
+    assert evaluator.completions.qsize() == 1
+    assert evaluator.completions.get_nowait() == "abc"
+
+def test_batch_submission():
+    problem = QuadraticProblem([2.0, 1.0])
+    evaluator = Evaluator(problem = problem, simulator = QuadraticSimulator())
+
+    X = np.array([[float(k), 0.0] for k in range(5)])
+    identifiers = evaluator.submit_many(X, annotations = [{ "k": k } for k in range(5)])
+
+    objectives, states = evaluator.get_many(identifiers)
+
+    assert objectives == pytest.approx([(k - 2.0)**2 + 1.0 for k in range(5)])
+    assert states == [None] * 5
+    assert evaluator.simulations[identifiers[3]]["annotations"] == { "k": 3 }
+
+    with pytest.raises(RuntimeError):
+        evaluator.submit_many(np.zeros((3, 3)))
+
+class SlowQuadraticProblem(QuadraticProblem):
+    def __init__(self, *arguments, delay = 0.1):
+        super().__init__(*arguments)
+
+        self.delay = delay
+        self.threads = set()
+
+    def parameterize(self, x):
+        self.threads.add(threading.get_ident())
+        return super().parameterize(x)
+
+    def evaluate(self, x, response):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return response
+
+def test_evaluation_workers():
+    problem = SlowQuadraticProblem([2.0, 1.0])
+
+    evaluator = Evaluator(
+        problem = problem, simulator = DelayedQuadraticSimulator(delay = 0.01),
+        parallel = 2, workers = 4
+    )
+
+    start = time.time()
+
+    identifiers = [evaluator.submit([float(k), 0.0]) for k in range(4)]
+    identifiers += evaluator.submit_many([[float(k), 0.0] for k in range(4, 8)])
+    objectives, states = evaluator.get_many(identifiers)
+
+    # Evaluating sequentially on the main thread would take at least 0.8s
+    assert time.time() - start < 0.6
+    assert not threading.get_ident() in problem.threads
+
+    assert objectives == pytest.approx([(k - 2.0)**2 + 1.0 for k in range(8)])
+
+class FailingQuadraticProblem(QuadraticProblem):
+    def parameterize(self, x):
+        if x[0] < 0.0:
+            raise ValueError("Invalid parameterization")
+
+        return super().parameterize(x)
+
+    def evaluate(self, x, response):
+        if x[0] > 10.0:
+            raise ValueError("Invalid evaluation")
+
+        return response
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_evaluation_errors(workers):
+    simulator = DelayedQuadraticSimulator(delay = 0.01)
+    evaluator = Evaluator(problem = FailingQuadraticProblem([2.0]), simulator = simulator, parallel = 2, workers = workers)
+
+    if workers is None:
+        with pytest.raises(ValueError, match = "parameterization"):
+            evaluator.submit([-1.0])
+
+        assert len(evaluator.simulations) == 0
+
+    else:
+        failing = evaluator.submit([-1.0])
+        identifier = evaluator.submit([2.0])
+
+        # The other parameterizations are not lost
+        with pytest.raises(ValueError, match = "parameterization"):
+            evaluator.get(failing)
+
+        assert evaluator.get(identifier)[0] == pytest.approx(0.0)
+
+    failing = evaluator.submit([20.0])
+    identifier = evaluator.submit([3.0])
+
+    with pytest.raises(ValueError, match = "evaluation"):
+        evaluator.get(failing)
+
+    # The failed simulation is raised again instead of being waited for forever
+    with pytest.raises(ValueError, match = "evaluation"):
+        evaluator.get(failing)
+
+    assert evaluator.get(identifier)[0] == pytest.approx(1.0)
+    assert len(evaluator._unfinished()) == 0
+
+    evaluator.cancel(failing)
+    assert not failing in simulator.timers
+
+    evaluator.close()
+    assert evaluator.executor is None
+
+    # The workers are started again on demand
+    assert evaluator.get(evaluator.submit([4.0]))[0] == pytest.approx(4.0)
+    evaluator.close()
+
+def test_cancel_evaluating():
+    class CleaningSimulator(DelayedQuadraticSimulator):
+        def clean(self, identifier):
+            self.cleaned = time.time()
+            super().clean(identifier)
+
+    class EvaluatingProblem(SlowQuadraticProblem):
+        def evaluate(self, x, response):
+            response = super().evaluate(x, response)
+            self.evaluated = time.time()
+            return response
+
+    simulator = CleaningSimulator(delay = 0.01)
+    simulator.cleaned = None
+
+    evaluator = Evaluator(problem = EvaluatingProblem([2.0], delay = 0.2), simulator = simulator, workers = 1)
+    identifier = evaluator.submit([0.0])
+
+    while evaluator.simulations[identifier].status != "evaluating":
+        evaluator.ready(identifier)
+
+    time.sleep(0.05)
+    evaluator.cancel(identifier)
+
+    # The output is only cleaned once the problem has finished reading it
+    assert simulator.cleaned is None
+
+    time.sleep(0.3)
+    assert simulator.cleaned >= evaluator.problem.evaluated
+
+def test_cancel():
+    simulator = DelayedQuadraticSimulator(delay = 0.2)
+    evaluator = Evaluator(problem = QuadraticProblem([2.0]), simulator = simulator, parallel = 2)
+
+    identifiers = evaluator.submit_many([[0.0], [1.0], [2.0], [3.0]])
+    future = evaluator.future(identifiers[3])
+
+    evaluator.ready(identifiers[0]) # Starts the first two simulations
+    evaluator.cancel(identifiers[1:])
+
+    assert simulator.cancelled == [identifiers[1]]
+    assert future.cancelled()
+
+    assert evaluator.get(identifiers[0])[0] == pytest.approx(4.0)
+    evaluator.cancel(identifiers[0]) # Finished simulations are cleaned
+
+    assert len(evaluator.simulations) == 0
+    assert evaluator.current_evaluations == 1
+
+def test_loop_cancels_iteration():
+    problem = QuadraticProblem([2.0], [0.0])
+    simulator = DelayedQuadraticSimulator(delay = 0.01)
+    evaluator = Evaluator(problem = problem, simulator = simulator, parallel = 2)
+
+    Loop(maximum_evaluations = 3).run(evaluator, RandomWalk(problem, parallel = 20))
+
+    # The iteration is stopped once the limit is exceeded, the rest is cancelled
+    assert evaluator.current_evaluations < 8
+    assert len(simulator.cancelled) > 0
+    assert len(evaluator.running) + len(evaluator.pending) == 0
+
+def test_wait_any():
+    simulator = DelayedQuadraticSimulator(delay = 0.05)
+    evaluator = Evaluator(problem = QuadraticProblem([2.0]), simulator = simulator, parallel = 1)
+
+    identifiers = evaluator.submit_many([[0.0], [1.0], [2.0]])
+
+    assert evaluator.wait_any(identifiers) == identifiers[:1]
+    assert evaluator.wait_any(identifiers[1:]) == identifiers[1:2]
+    assert evaluator.wait_any() == identifiers[2:]
+    assert evaluator.wait_any() == []
@@ -0,0 +1,51 @@
+import pytest
+import numpy as np
+
+from .cases.quadratic import QuadraticSimulator, QuadraticProblem
+
+from octras import Loop, Evaluator
+from octras.algorithms import CMAES, SPSA
+from octras.history import History
+
+def test_history_cma_es(tmp_path):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+    algorithm = CMAES(problem, initial_step_size = 0.1, seed = 0)
+
+    history = History(capacity = 4)
+    Loop(maximum_evaluations = 60).run(evaluator, algorithm, tracker = history)
+
+    assert len(history) == evaluator.current_evaluations
+    assert history.column("x").shape == (len(history), 2)
+    assert np.all(np.diff(history.column("evaluator_evaluations")) == 1)
+
+    # The covariance matrix is stored once per generation
+    generations = int(np.max(history.annotation("iteration")))
+    assert len(history.rows(iteration = 2)) == algorithm.L
+    assert len(set(history.annotations["covariance"][:len(history)])) <= generations
+
+    best = history.best_so_far()
+    assert np.all(np.diff(best) <= 0.0)
+    assert best[-1] == pytest.approx(np.min(history.column("objective")))
+
+    path = tmp_path / "history.npz"
+    history.save(path)
+    loaded = History.load(path)
+
+    assert loaded.column("objective") == pytest.approx(history.column("objective"))
+    assert loaded.identifiers == history.identifiers
+    assert np.all(loaded.rows(iteration = 2) == history.rows(iteration = 2))
+    assert np.all(loaded.annotation("covariance", [0])[0] == history.annotation("covariance", [0])[0])
+
+def test_history_types():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+    algorithm = SPSA(problem, perturbation_factor = 2e-2, gradient_factor = 0.2, seed = 0)
+
+    history = History()
+    Loop(maximum_evaluations = 30).run(evaluator, algorithm, tracker = history)
+
+    objective_rows = history.rows(type = "objective")
+    assert len(objective_rows) > 0
+    assert len(history.rows(type = "positive_gradient")) == len(history.rows(type = "negative_gradient"))
+    assert len(history.rows(type = "unknown")) == 0
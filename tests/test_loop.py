@@ -0,0 +1,99 @@
+import pytest, time
+
+from .cases.quadratic import QuadraticSimulator, QuadraticProblem
+from .cases.delayed import DelayedQuadraticSimulator
+
+from octras import Loop, Evaluator
+from octras.algorithms import RandomWalk, CMAES, NelderMead
+
+@pytest.mark.parametrize("policy", ["cancel", "drain"])
+def test_deadline(policy):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    simulator = DelayedQuadraticSimulator(delay = 0.2)
+    evaluator = Evaluator(simulator = simulator, problem = problem, parallel = 4)
+
+    start_time = time.time()
+    Loop(maximum_time = 0.3, deadline_policy = policy).run(evaluator, RandomWalk(problem, parallel = 4))
+
+    assert time.time() - start_time < 1.0
+    assert len(evaluator.running) + len(evaluator.pending) == 0
+
+    if policy == "cancel":
+        assert evaluator.current_evaluations == 4
+        assert len(simulator.cancelled) == 4
+    else:
+        assert evaluator.current_evaluations == 8
+        assert len(simulator.cancelled) == 0
+
+class SlowParameterizationProblem(QuadraticProblem):
+    def parameterize(self, x):
+        time.sleep(0.2)
+        return super().parameterize(x)
+
+def test_deadline_drain_workers():
+    problem = SlowParameterizationProblem([2.0, 1.0], [0.0, 0.0])
+    simulator = DelayedQuadraticSimulator(delay = 0.01)
+    evaluator = Evaluator(simulator = simulator, problem = problem, parallel = 4, workers = 4)
+
+    Loop(maximum_time = 0.1, deadline_policy = "drain").run(evaluator, RandomWalk(problem, parallel = 4))
+
+    # Candidates which are still being parameterized at the deadline are not started
+    assert evaluator.current_evaluations == 0
+    assert len(simulator.timers) == 0
+    assert len(evaluator._unfinished()) == 0
+
+@pytest.mark.parametrize("policy", ["cancel", "drain"])
+def test_outside_submissions(policy):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    simulator = DelayedQuadraticSimulator(delay = 0.2)
+    evaluator = Evaluator(simulator = simulator, problem = problem, parallel = 5)
+
+    identifier = evaluator.submit([2.0, 1.0])
+    Loop(maximum_time = 0.1, deadline_policy = policy).run(evaluator, RandomWalk(problem, parallel = 4))
+
+    # Only the simulations of the loop are cancelled, while the other one is still running
+    assert not identifier in simulator.cancelled
+    assert evaluator.get(identifier)[0] == pytest.approx(0.0)
+    assert len(evaluator.running) + len(evaluator.pending) == 0
+
+def test_duck_typed_algorithm():
+    class Sampler:
+        # Only implements advance, as algorithms which do not derive from Algorithm
+        def __init__(self):
+            self.iterations = 0
+
+        def advance(self, evaluator):
+            self.iterations += 1
+            evaluator.get(evaluator.submit([2.0, float(self.iterations)]))
+
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+
+    algorithm = Sampler()
+    assert Loop(threshold = 1e-6).run(evaluator, algorithm) == pytest.approx((2.0, 1.0))
+    assert algorithm.iterations == 1
+
+def test_stagnation():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+
+    loop = Loop(stagnation_window = 50, stagnation_tolerance = 1e-3)
+    loop.run(evaluator, RandomWalk(problem, seed = 0))
+
+    assert evaluator.current_evaluations - loop.reference_evaluations == 50
+    assert evaluator.current_evaluations < 10000
+
+@pytest.mark.parametrize("algorithm", [
+    lambda problem: CMAES(problem, initial_step_size = 0.1, seed = 0, minimum_step_size = 1e-6),
+    lambda problem: NelderMead(problem, minimum_diameter = 1e-6)
+])
+def test_algorithm_convergence(algorithm):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+
+    algorithm = algorithm(problem)
+    result = Loop(threshold = -1.0, maximum_evaluations = 10000).run(evaluator, algorithm)
+
+    assert algorithm.converged()
+    assert evaluator.current_evaluations < 10000
+    assert result == pytest.approx((2.0, 1.0), 1e-3)
@@ -0,0 +1,57 @@
+import pytest, os, sys, time, signal, stat, textwrap
+import subprocess as sp
+
+from octras.matsim import MATSimSimulator
+
+def create_java(tmp_path):
+    # Stands in for the JVM and ignores all arguments
+    path = tmp_path / "java"
+
+    with open(path, "w+") as f:
+        f.write("#!/bin/sh\nsleep 60\n")
+
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return str(path)
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+
+    # Zombies of the sleep process are reaped by init
+    with open("/proc/%d/stat" % pid) as f:
+        return f.read().split(")")[-1].split()[0] != "Z"
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason = "Requires /proc")
+def test_matsim_cleanup(tmp_path):
+    driver = textwrap.dedent("""
+        import sys, time
+        from octras.matsim import MATSimSimulator
+
+        simulator = MATSimSimulator(sys.argv[1], dict(java = sys.argv[2], class_path = "", main_class = ""))
+        simulator.run("simulation", {})
+
+        print(simulator.simulations["simulation"]["process"].pid, flush = True)
+        time.sleep(60)
+    """)
+
+    os.mkdir(tmp_path / "simulations")
+
+    process = sp.Popen([sys.executable, "-c", driver, str(tmp_path / "simulations"), create_java(tmp_path)],
+        stdout = sp.PIPE, universal_newlines = True, env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)))
+
+    pid = int(process.stdout.readline())
+    assert alive(pid)
+
+    # The simulations of a terminated driver do not keep running
+    process.send_signal(signal.SIGTERM)
+    process.wait(10.0)
+
+    for attempt in range(50):
+        if not alive(pid):
+            break
+
+        time.sleep(0.1)
+
+    assert not alive(pid)
@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+
+from .cases.traffic import TrafficSimulator, TrafficProblem, simulate
+
+from octras import Evaluator
+from octras.pool import ProcessPoolSimulator
+
+def simulate_traffic(parameters):
+    capacities = parameters["capacities"]
+    result, selection, random = simulate([capacities[0], capacities[1], 100.0], 1.0, iterations = parameters["iterations"])
+    return result[:2]
+
+def simulate_large(parameters):
+    return dict(values = np.full((500, 500), parameters["value"]), value = parameters["value"])
+
+def test_process_pool_traffic():
+    problem = TrafficProblem(iterations = 40)
+    X = [[400.0 + 10.0 * k, 500.0] for k in range(6)]
+
+    simulator = ProcessPoolSimulator(simulate_traffic, processes = 3)
+    evaluator = Evaluator(problem = problem, simulator = simulator, parallel = 3)
+    objectives, states = evaluator.get_many(evaluator.submit_many(X))
+    evaluator.clean()
+    simulator.shutdown()
+
+    reference = Evaluator(problem = problem, simulator = TrafficSimulator())
+    reference_objectives, reference_states = reference.get_many(reference.submit_many(X))
+
+    assert objectives == pytest.approx(reference_objectives)
+    assert states == pytest.approx(reference_states)
+
+def test_process_pool_shared_memory():
+    simulator = ProcessPoolSimulator(simulate_large, processes = 2)
+
+    simulator.run("A", dict(value = 1.0))
+    simulator.run("B", dict(value = 2.0))
+
+    while not (simulator.ready("A") and simulator.ready("B")):
+        pass
+
+    result = simulator.get("A")
+    assert result["value"] == 1.0
+    assert result["values"].shape == (500, 500)
+    assert np.all(result["values"] == 1.0)
+
+    simulator.clean("A")
+    simulator.clean("B") # Never obtained, but shared memory is released
+    simulator.shutdown()
@@ -0,0 +1,81 @@
+import pytest, time
+import numpy as np
+
+from .cases.quadratic import QuadraticProblem
+from .cases.delayed import DelayedQuadraticSimulator
+
+from octras import Loop, Evaluator
+from octras.algorithms import CMAES, NelderMead
+from octras.history import History
+from octras.portfolio import Portfolio, PortfolioScheduler
+
+def test_portfolio():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = DelayedQuadraticSimulator(delay = 0.005), problem = problem, parallel = 4)
+
+    portfolio = Portfolio([
+        CMAES(problem, initial_step_size = 0.1, seed = 0),
+        CMAES(problem, initial_step_size = 0.1, seed = 1),
+        NelderMead(problem)
+    ])
+
+    history = History()
+    result = Loop(threshold = 1e-3, maximum_evaluations = 2000).run(evaluator, portfolio, tracker = history)
+
+    # The loop closes the portfolio
+    assert result == pytest.approx((2.0, 1.0), abs = 0.1)
+    assert evaluator.pending.__class__ != PortfolioScheduler
+    assert portfolio.threads is None
+
+    # Results are routed back to the instance which has submitted them
+    for instance in range(3):
+        assert len(history.rows(instance = instance)) > 0
+        assert portfolio.iterations[instance] > 0
+
+        rows = history.rows(include_transient = False, instance = instance)
+        assert portfolio.best[instance] == pytest.approx(np.min(history.column("objective")[rows]))
+
+def test_portfolio_stop():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+
+    for trial in range(10):
+        evaluator = Evaluator(simulator = DelayedQuadraticSimulator(delay = 0.001), problem = problem, parallel = 3)
+
+        portfolio = Portfolio([NelderMead(problem) for instance in range(4)] + [
+            CMAES(problem, initial_step_size = 0.1, seed = trial)
+        ])
+
+        Loop(maximum_evaluations = 60).run(evaluator, portfolio)
+
+        # No instance submits anything after the loop has cancelled the remaining simulations
+        time.sleep(0.01)
+        assert len(evaluator._unfinished()) == 0
+
+    # The portfolio is started again by the next run
+    Loop(maximum_evaluations = 120).run(evaluator, portfolio)
+    assert sum(portfolio.iterations) > 0
+    assert len(evaluator._unfinished()) == 0
+
+def test_portfolio_scheduler():
+    scheduler = PortfolioScheduler()
+    scheduler.weights = { 0: 3.0, 1: 1.0 }
+
+    for index in range(8):
+        scheduler.push(dict(identifier = "s%d" % index, annotations = dict(instance = index % 2)))
+
+    started = []
+
+    for index in range(4):
+        identifier = scheduler.pop()
+        scheduler.started(dict(identifier = identifier))
+        started.append(identifier)
+
+    # The better instance obtains three out of four slots
+    assert started == ["s0", "s2", "s4", "s1"]
+    assert len(scheduler) == 4
+
+    scheduler.finished(dict(identifier = "s0"))
+    scheduler.remove("s6")
+
+    assert scheduler.pop() == "s3"
+    assert set(scheduler) == set(["s5", "s7"])
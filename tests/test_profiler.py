@@ -0,0 +1,36 @@
+import pytest
+
+from .cases.quadratic import QuadraticSimulator, QuadraticProblem
+
+from octras import Loop, Evaluator
+from octras.algorithms import CMAES
+from octras.profiler import Profiler, section
+from octras.tracker import LogTracker
+
+def test_profiler():
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+    algorithm = CMAES(problem, initial_step_size = 0.1, seed = 0)
+
+    profiler = Profiler(cprofile = True, sampling_interval = 0.001)
+    Loop(maximum_evaluations = 120).run(evaluator, algorithm, tracker = LogTracker(), profiler = profiler)
+
+    summary = profiler.summary()
+
+    for name in ("algorithm.advance", "problem.parameterize_batch", "problem.evaluate",
+            "simulator.run", "simulator.ready", "simulator.get", "simulator.clean",
+            "tracker.notify", "cma_es.eigendecomposition"):
+        assert summary[name]["calls"] > 0
+
+    assert summary["simulator.run"]["calls"] >= evaluator.current_evaluations
+    assert summary["algorithm.advance"]["total"] <= profiler.wall_time
+
+    report = profiler.report()
+    assert "algorithm.advance" in report
+    assert profiler.stats().total_calls > 0
+
+    # Outside of the profiler, sections are not recorded
+    with section("algorithm.advance"):
+        pass
+
+    assert profiler.summary()["algorithm.advance"]["calls"] == summary["algorithm.advance"]["calls"]
@@ -0,0 +1,104 @@
+import pytest
+import threading
+import numpy as np
+
+from .cases.quadratic import QuadraticProblem, QuadraticSimulator
+
+from octras import Evaluator
+from octras.remote import RemoteSimulator, Worker
+
+class FailingQuadraticSimulator(QuadraticSimulator):
+    def run(self, identifier, parameters):
+        if parameters["x"][0] > 5.0:
+            raise RuntimeError("Parameter out of range")
+
+        super().run(identifier, parameters)
+
+def start_workers(simulator, count, problem = None, factory = QuadraticSimulator):
+    workers = []
+
+    for index in range(count):
+        worker = Worker(factory(), problem, slots = 2, interval = 0.01)
+        worker.connect(simulator.address, simulator.authkey)
+
+        thread = threading.Thread(target = worker.serve, daemon = True)
+        thread.start()
+
+        workers.append((worker, thread))
+
+    assert simulator.wait_for_workers(count, timeout = 10.0)
+    return workers
+
+@pytest.mark.parametrize("evaluate", [False, True])
+def test_remote_workers(evaluate):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    X = np.random.random_sample((20, 2)) * 4.0
+
+    simulator = RemoteSimulator(evaluate = evaluate)
+    workers = start_workers(simulator, 3, problem if evaluate else None)
+
+    evaluator = Evaluator(problem = problem, simulator = simulator, parallel = 6)
+    objectives, states = evaluator.get_many(evaluator.submit_many(X))
+    evaluator.clean()
+
+    assert objectives == pytest.approx(np.sum((X - np.array([2.0, 1.0]))**2, axis = 1))
+    assert sum(information["processed"] for information in simulator.workers.values()) == 20
+    assert all(information["processed"] > 0 for information in simulator.workers.values())
+
+    simulator.shutdown()
+
+    for worker, thread in workers:
+        thread.join(timeout = 10.0)
+        assert not thread.is_alive()
+
+def test_remote_worker_error():
+    problem = QuadraticProblem([2.0], [0.0])
+
+    simulator = RemoteSimulator()
+    workers = start_workers(simulator, 1, factory = FailingQuadraticSimulator)
+
+    evaluator = Evaluator(problem = problem, simulator = simulator)
+    assert evaluator.get(evaluator.submit([1.0]))[0] == pytest.approx(1.0)
+
+    with pytest.raises(RuntimeError, match = "out of range"):
+        evaluator.get(evaluator.submit([6.0]))
+
+    simulator.shutdown()
+
+def test_remote_worker_disconnect():
+    problem = QuadraticProblem([2.0], [0.0])
+
+    simulator = RemoteSimulator()
+    start_workers(simulator, 1)
+
+    # A worker which accepts simulations but never finishes them
+    blocked = Worker(QuadraticSimulator(), slots = 4)
+    blocked.connect(simulator.address, simulator.authkey)
+    assert simulator.wait_for_workers(2, timeout = 10.0)
+
+    evaluator = Evaluator(problem = problem, simulator = simulator, parallel = 6)
+    identifiers = evaluator.submit_many([[float(k)] for k in range(6)])
+
+    # The simulations of the lost worker are dispatched to the remaining one
+    blocked.connection.close()
+
+    objectives, states = evaluator.get_many(identifiers)
+    assert objectives == pytest.approx([(k - 2.0)**2 for k in range(6)])
+
+    simulator.shutdown()
+
+def test_remote_authkey():
+    with pytest.raises(RuntimeError, match = "explicit authkey"):
+        RemoteSimulator(address = ("0.0.0.0", 0))
+
+    simulator = RemoteSimulator()
+    assert simulator.authkey != RemoteSimulator().authkey
+
+    # Workers with another key are rejected
+    worker = Worker(QuadraticSimulator())
+
+    with pytest.raises(Exception):
+        worker.connect(simulator.address, b"octras")
+
+    start_workers(simulator, 1)
+    simulator.shutdown()
@@ -0,0 +1,52 @@
+import pytest
+
+from .cases.quadratic import QuadraticSimulator, QuadraticProblem
+
+from octras import Evaluator
+from octras.scheduler import PriorityScheduler, RuntimeModel
+
+class OrderSimulator(QuadraticSimulator):
+    def __init__(self):
+        super().__init__()
+        self.order = []
+
+    def run(self, identifier, parameters):
+        self.order.append(parameters["x"][0])
+        super().run(identifier, parameters)
+
+class CostProblem(QuadraticProblem):
+    def parameterize(self, x):
+        return dict(x = x, u = self.u), x[0]
+
+def run_order(scheduler, annotations = {}):
+    simulator = OrderSimulator()
+
+    evaluator = Evaluator(
+        problem = CostProblem([0.0]), simulator = simulator,
+        scheduler = scheduler
+    )
+
+    for cost in (1.0, 3.0, 2.0):
+        evaluator.submit([cost], annotations = annotations.get(cost, {}))
+
+    evaluator.wait()
+    return simulator.order
+
+def test_priority_scheduler():
+    assert run_order(PriorityScheduler("longest")) == [3.0, 2.0, 1.0]
+    assert run_order(PriorityScheduler("shortest")) == [1.0, 2.0, 3.0]
+
+    assert run_order(PriorityScheduler("longest"), {
+        1.0: { "priority": 1 }
+    }) == [1.0, 3.0, 2.0]
+
+def test_runtime_model():
+    model = RuntimeModel()
+    assert model.estimate(3.0) == 3.0
+
+    model.update(2.0, 10.0)
+    assert model.estimate(3.0) == pytest.approx(15.0)
+
+    model.update(4.0, 14.0)
+    assert model.estimate(3.0) == pytest.approx(12.0)
+    assert model.estimate(0.0) == pytest.approx(6.0)
@@ -0,0 +1,74 @@
+import pytest, pickle
+
+from .cases.quadratic import QuadraticSimulator, QuadraticProblem
+
+from octras import Evaluator
+from octras.record import SimulationRecord
+from octras.trace import Trace, DEFAULT_CAPACITY
+
+def test_simulation_record():
+    record = SimulationRecord(identifier = "A", objective = 1.0)
+
+    assert record["objective"] == record.objective == 1.0
+    assert "transient" in record and record["transient"] is None
+
+    record["status"] = "finished"
+    assert record.status == "finished"
+
+    with pytest.raises(KeyError):
+        record["unknown"] = 1.0
+
+    copy = pickle.loads(pickle.dumps(record))
+    assert copy.to_dict() == record.to_dict()
+
+def test_bounded_trace():
+    problem = QuadraticProblem([0.0])
+
+    evaluator = Evaluator(problem = problem, simulator = QuadraticSimulator(), trace_capacity = 3)
+    evaluator.get(evaluator.submit_many([[float(k)] for k in range(5)]))
+
+    trace = evaluator.fetch_trace()
+    assert [item["objective"] for item in trace] == [4.0, 9.0, 16.0]
+    assert evaluator.trace.dropped == 2
+    assert len(list(evaluator.fetch_trace())) == 0
+
+    # Results are only kept on request
+    assert all([simulation.result is None for simulation in evaluator.simulations.values()])
+
+    evaluator = Evaluator(problem = problem, simulator = QuadraticSimulator(), trace_capacity = 3, trace_policy = "raise")
+    evaluator.get(evaluator.submit_many([[float(k)] for k in range(3)]))
+
+    # Simulations are rejected before they are started, so no result is lost
+    with pytest.raises(RuntimeError):
+        evaluator.submit([3.0])
+
+    assert evaluator.current_evaluations == 3
+    assert len(evaluator.simulations) == 3
+
+    assert len(list(evaluator.fetch_trace())) == 3
+    evaluator.get(evaluator.submit([4.0]))
+    assert [item["objective"] for item in evaluator.fetch_trace()] == [16.0]
+
+    # Unfinished simulations count against the capacity as well
+    evaluator.submit_many([[float(k)] for k in range(3)])
+
+    with pytest.raises(RuntimeError):
+        evaluator.submit([3.0])
+
+    evaluator.wait()
+    assert len(list(evaluator.fetch_trace())) == 3
+
+def test_default_trace_capacity():
+    problem = QuadraticProblem([0.0])
+
+    # The trace is bounded unless it is explicitly requested otherwise
+    evaluator = Evaluator(problem = problem, simulator = QuadraticSimulator())
+    assert evaluator.trace.capacity == DEFAULT_CAPACITY
+    assert evaluator.trace.policy == "drop"
+
+    trace = Trace(capacity = None)
+
+    for k in range(DEFAULT_CAPACITY + 1):
+        trace.append(k)
+
+    assert len(trace) == DEFAULT_CAPACITY + 1 and trace.dropped == 0
@@ -0,0 +1,90 @@
+import pytest, json
+import numpy as np
+
+from .cases.quadratic import QuadraticSimulator, QuadraticProblem
+from .cases.delayed import DelayedQuadraticSimulator
+
+from octras import Loop, Evaluator
+from octras.algorithms import RandomWalk
+from octras.tracker import StreamTracker, StreamReader, ChromeTraceTracker
+
+def test_stream_tracker(tmp_path):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = QuadraticSimulator(), problem = problem)
+
+    path = tmp_path / "history.stream"
+    tracker = StreamTracker(path, sync_interval = 0.0)
+    reader = StreamReader(path)
+
+    Loop(maximum_evaluations = 10).run(evaluator, RandomWalk(problem, parallel = 4), tracker = tracker)
+    records = reader.read()
+
+    assert len(records) == evaluator.current_evaluations
+    assert [record["evaluator_evaluations"] for record in records] == list(range(1, len(records) + 1))
+    assert isinstance(records[0]["x"], np.ndarray)
+
+    # The reader only returns new records
+    Loop(maximum_evaluations = 4).run(evaluator, RandomWalk(problem, parallel = 4), tracker = tracker)
+    assert len(reader.read()) == evaluator.current_evaluations - len(records)
+
+    tracker.close()
+
+def test_stream_tracker_partial_frame(tmp_path):
+    path = tmp_path / "history.stream"
+
+    tracker = StreamTracker(path)
+    tracker.notify(dict(objective = 1.0))
+    tracker.notify(dict(objective = 2.0))
+    tracker.close()
+
+    # Simulate a crash in the middle of writing a frame
+    with open(path, "ab") as f:
+        f.write(b"\x20\x00\x00\x00\x00\x00\x00\x00\x01\x02")
+
+    assert [record["objective"] for record in StreamReader(path).read()] == [1.0, 2.0]
+
+    tracker = StreamTracker(path)
+    tracker.notify(dict(objective = 3.0))
+    tracker.close()
+
+    assert [record["objective"] for record in StreamReader(path).read()] == [1.0, 2.0, 3.0]
+
+def test_stream_tracker_foreign_file(tmp_path):
+    path = tmp_path / "history.p"
+
+    with open(path, "wb") as f:
+        f.write(b"not a stream of simulations")
+
+    with pytest.raises(RuntimeError):
+        StreamTracker(path)
+
+class ProgressQuadraticSimulator(DelayedQuadraticSimulator):
+    def run(self, identifier, parameters):
+        super().run(identifier, parameters)
+        self.report(identifier, "iteration", iteration = 0)
+
+def test_chrome_trace_tracker(tmp_path):
+    problem = QuadraticProblem([2.0, 1.0], [0.0, 0.0])
+    evaluator = Evaluator(simulator = ProgressQuadraticSimulator(delay = 0.02), problem = problem, parallel = 3)
+
+    tracker = ChromeTraceTracker(tmp_path / "trace.json")
+    Loop(maximum_evaluations = 11).run(evaluator, RandomWalk(problem, parallel = 6), tracker = tracker)
+
+    summary = tracker.write()
+    assert summary["slots"] == 3
+    assert summary["simulations"] == len(tracker.simulations)
+    assert 0.0 < summary["utilization"] <= 1.0
+
+    with open(tmp_path / "trace.json") as f:
+        events = json.load(f)["traceEvents"]
+
+    simulations = [event for event in events if event["ph"] == "X"]
+    assert len(simulations) == summary["simulations"]
+    assert set(event["tid"] for event in simulations) == { 0, 1, 2 }
+
+    # Simulations in one slot never overlap
+    for slot in range(3):
+        spans = sorted([(event["ts"], event["ts"] + event["dur"]) for event in simulations if event["tid"] == slot])
+        assert all(spans[k][1] <= spans[k + 1][0] for k in range(len(spans) - 1))
+
+    assert len([event for event in events if event["name"] == "iteration"]) == summary["simulations"]